@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from bench import fixtures
+
+if TYPE_CHECKING:
+    from starlette.requests import Request
+
+
+class FakeMFL:
+    """A stand-in for the MyFantasyLeague export API that replays fixtures.
+
+    Every export is answered with the fixture recorded for its TYPE (or an empty
+    document, for types without one) after a configurable latency with jitter. A
+    configurable share of requests fail with a 503, like MyFantasyLeague does under
+    load.
+    """
+
+    def __init__(  # noqa: PLR0913 one parameter per setting of the server
+        self,
+        documents: dict[str, bytes],
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        self.documents = documents
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls: Counter[str] = Counter()
+        self._random = random.Random(seed)  # noqa: S311 not used for anything secret
+
+    def body(self, request_type: str) -> bytes:
+        """Get the body for an export."""
+        body = self.documents.get(request_type)
+        if body is None:
+            empty = {request_type: {}, "version": "1.0", "encoding": "utf-8"}
+            body = json.dumps(empty).encode()
+        return body
+
+    async def export(self, request: Request) -> Response:
+        """Answer an export request."""
+        request_type = request.query_params.get("TYPE", "")
+        self.calls[request_type] += 1
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(delay, 0))
+        if self._random.random() < self.error_rate:
+            return Response(status_code=503, content=b"Service Unavailable")
+        return Response(self.body(request_type), media_type="application/json")
+
+    async def stats(self, _request: Request) -> Response:
+        """Get the number of calls made for each TYPE."""
+        return JSONResponse(dict(self.calls))
+
+    def app(self) -> Starlette:
+        """Build the ASGI app."""
+        return Starlette(
+            routes=[
+                Route("/{year:int}/export", self.export),
+                Route("/calls", self.stats),
+            ],
+        )
+
+
+def main() -> None:
+    """Serve the fake MyFantasyLeague export API."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--fixtures", type=Path, default=fixtures.FIXTURES_DIR)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Seconds, +/-.")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=fixtures.SEED)
+    args = parser.parse_args()
+    fake = FakeMFL(
+        fixtures.load(args.fixtures),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(fake.app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
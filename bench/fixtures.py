@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Fixed so the generated fixtures, and so the benchmark, are the same on every run.
+SEED = 2024
+TIMESTAMP = 1727740800
+LEAGUE_ID = "43000"
+FRANCHISES = 12
+CURRENT_WEEK = 9
+LAST_REGULAR_SEASON_WEEK = 14
+ROSTER_SIZE = 22
+STARTER_COUNT = 9
+
+NFL_TEAMS = (
+    "ARI", "ATL", "BAL", "BUF", "CAR", "CHI", "CIN", "CLE", "DAL", "DEN", "DET", "GBP",
+    "HOU", "IND", "JAC", "KCC", "LAC", "LAR", "LVR", "MIA", "MIN", "NEP", "NOS", "NYG",
+    "NYJ", "PHI", "PIT", "SEA", "SFO", "TBB", "TEN", "WAS",
+)
+# Players in the pool per position, roughly in the proportions of the real database.
+POSITIONS = {"QB": 70, "RB": 140, "WR": 200, "TE": 90, "PK": 40, "Def": 32}
+STARTERS = {"QB": "1", "RB": "2-3", "WR": "3-4", "TE": "1-2", "PK": "1", "Def": "1"}
+FIRST_NAMES = (
+    "Aaron", "Brandon", "Caleb", "Derrick", "Elijah", "Frank", "Garrett", "Hunter",
+    "Isaiah", "Jalen", "Kyle", "Logan", "Marcus", "Nolan", "Owen", "Patrick", "Quentin",
+    "Russell", "Samuel", "Tyler", "Victor", "Wesley", "Xavier", "Zach",
+)
+LAST_NAMES = (
+    "Adams", "Brooks", "Carter", "Davis", "Edwards", "Foster", "Griffin", "Hayes",
+    "Irving", "Jackson", "Knight", "Lewis", "Mitchell", "Nelson", "Owens", "Parker",
+    "Quinn", "Reed", "Simmons", "Turner", "Underwood", "Vaughn", "Walker", "Young",
+)
+
+# Exports served by the NFL host rather than the league host, for recording.
+NFL_TYPES = {"injuries", "nflSchedule", "nflByeWeeks"}
+
+
+def _document(request_type: str, content: dict[str, Any]) -> dict[str, Any]:
+    return {request_type: content, "version": "1.0", "encoding": "utf-8"}
+
+
+def _score(rng: random.Random, mean: float) -> str:
+    return f"{max(rng.gauss(mean, mean / 3), 0):.2f}"
+
+
+def _players(rng: random.Random) -> list[dict[str, str]]:
+    players = []
+    player_id = 10000
+    for position, count in POSITIONS.items():
+        for index in range(count):
+            player_id += rng.randint(1, 40)
+            if position == "Def":
+                team = NFL_TEAMS[index]
+                name = f"{team}, Defense"
+            else:
+                team = rng.choice(NFL_TEAMS)
+                name = f"{rng.choice(LAST_NAMES)}, {rng.choice(FIRST_NAMES)}"
+            players.append(
+                {
+                    "id": str(player_id),
+                    "name": name,
+                    "position": position,
+                    "team": team,
+                    "status": rng.choice(["", "", "", "R"]),
+                    "birthdate": str(rng.randint(631152000, 946684800)),
+                    "draft_year": str(rng.randint(2012, 2024)),
+                    "height": str(rng.randint(68, 78)),
+                    "weight": str(rng.randint(180, 320)),
+                },
+            )
+    return players
+
+
+def _rosters(
+    rng: random.Random,
+    players: list[dict[str, str]],
+) -> list[list[dict[str, str]]]:
+    by_position: dict[str, list[dict[str, str]]] = {}
+    for player in players:
+        by_position.setdefault(player["position"], []).append(player)
+    for pool in by_position.values():
+        rng.shuffle(pool)
+    per_franchise = {"QB": 3, "RB": 6, "WR": 7, "TE": 3, "PK": 1, "Def": 2}
+    rosters = []
+    for _ in range(FRANCHISES):
+        roster = [
+            by_position[position].pop()
+            for position, count in per_franchise.items()
+            for _ in range(count)
+        ]
+        rosters.append(roster)
+    return rosters
+
+
+def _franchise_id(index: int) -> str:
+    return str(index + 1).zfill(4)
+
+
+def _schedule(rng: random.Random) -> list[dict[str, Any]]:
+    weeks = []
+    ids = [_franchise_id(index) for index in range(FRANCHISES)]
+    for week in range(1, LAST_REGULAR_SEASON_WEEK + 1):
+        # Round robin: rotate everyone but the first franchise each week.
+        shift = (week - 1) % (FRANCHISES - 1)
+        order = [ids[0], *ids[1 + shift :], *ids[1 : 1 + shift]]
+        matchups = []
+        for home, away in zip(order[: FRANCHISES // 2], order[::-1], strict=False):
+            teams = [{"id": home, "isHome": "1"}, {"id": away, "isHome": "0"}]
+            if week < CURRENT_WEEK:
+                scores = [float(_score(rng, 110)), float(_score(rng, 110))]
+                for team, score, other in zip(teams, scores, scores[::-1], strict=True):
+                    team["score"] = f"{score:.2f}"
+                    team["result"] = "W" if score > other else "L"
+            matchups.append({"franchise": teams})
+        weeks.append({"week": str(week), "matchup": matchups})
+    return weeks
+
+
+def _standings(schedule: list[dict[str, Any]]) -> list[dict[str, str]]:
+    records: dict[str, dict[str, float]] = {}
+    for week in schedule:
+        for matchup in week["matchup"]:
+            home, away = matchup["franchise"]
+            for team, other in ((home, away), (away, home)):
+                if "score" not in team:
+                    continue
+                record = records.setdefault(
+                    team["id"],
+                    {"h2hw": 0, "h2hl": 0, "pf": 0.0, "pa": 0.0},
+                )
+                record["h2hw" if team["result"] == "W" else "h2hl"] += 1
+                record["pf"] += float(team["score"])
+                record["pa"] += float(other["score"])
+    return [
+        {
+            "id": franchise_id,
+            "h2hw": str(int(record["h2hw"])),
+            "h2hl": str(int(record["h2hl"])),
+            "h2ht": "0",
+            "pf": f"{record['pf']:.2f}",
+            "pa": f"{record['pa']:.2f}",
+        }
+        for franchise_id, record in sorted(records.items())
+    ]
+
+
+def _live_scoring(
+    rng: random.Random,
+    schedule: list[dict[str, Any]],
+    rosters: list[list[dict[str, str]]],
+) -> dict[str, Any]:
+    matchups = []
+    for matchup in schedule[CURRENT_WEEK - 1]["matchup"]:
+        franchises = []
+        for team in matchup["franchise"]:
+            roster = rosters[int(team["id"]) - 1]
+            players = [
+                {
+                    "id": player["id"],
+                    "score": _score(rng, 8.0),
+                    "gameSecondsRemaining": str(rng.choice([0, 0, 1800, 3600])),
+                    "status": "starter" if index < STARTER_COUNT else "nonstarter",
+                }
+                for index, player in enumerate(roster)
+            ]
+            starters = [float(player["score"]) for player in players[:STARTER_COUNT]]
+            franchises.append(
+                {
+                    "id": team["id"],
+                    "isHome": team["isHome"],
+                    "score": f"{sum(starters):.2f}",
+                    "gameSecondsRemaining": str(rng.randint(0, 4) * 3600),
+                    "playersYetToPlay": str(rng.randint(0, 4)),
+                    "playersCurrentlyPlaying": str(rng.randint(0, 3)),
+                    "players": {"player": players},
+                },
+            )
+        matchups.append({"franchise": franchises})
+    return {"week": str(CURRENT_WEEK), "matchup": matchups}
+
+
+def _transactions(
+    rng: random.Random,
+    players: list[dict[str, str]],
+) -> list[dict[str, str]]:
+    transactions = []
+    for index in range(300):
+        franchise = _franchise_id(rng.randrange(FRANCHISES))
+        added, dropped = rng.sample(players, 2)
+        timestamp = str(TIMESTAMP - index * 1800)
+        kind = rng.choice(["FREE_AGENT", "FREE_AGENT", "BBID_WAIVER", "TRADE", "IR"])
+        if kind == "TRADE":
+            other = _franchise_id(rng.randrange(FRANCHISES))
+            transactions.append(
+                {
+                    "type": kind,
+                    "franchise": franchise,
+                    "franchise2": other,
+                    "franchise1_gave_up": f"{dropped['id']},",
+                    "franchise2_gave_up": f"{added['id']},",
+                    "timestamp": timestamp,
+                },
+            )
+        elif kind == "BBID_WAIVER":
+            bid = f"{rng.randint(0, 40)}.00"
+            transactions.append(
+                {
+                    "type": kind,
+                    "franchise": franchise,
+                    "transaction": f"{added['id']},|{bid}|{dropped['id']},",
+                    "timestamp": timestamp,
+                },
+            )
+        elif kind == "IR":
+            transactions.append(
+                {
+                    "type": kind,
+                    "franchise": franchise,
+                    "activated": "",
+                    "deactivated": f"{dropped['id']},",
+                    "timestamp": timestamp,
+                },
+            )
+        else:
+            transactions.append(
+                {
+                    "type": kind,
+                    "franchise": franchise,
+                    "transaction": f"{added['id']},|{dropped['id']},",
+                    "timestamp": timestamp,
+                },
+            )
+    return transactions
+
+
+def _nfl_schedule(rng: random.Random) -> dict[str, Any]:
+    teams = list(NFL_TEAMS)
+    rng.shuffle(teams)
+    matchups = [
+        {
+            "kickoff": str(TIMESTAMP + index * 3600),
+            "gameSecondsRemaining": "3600",
+            "team": [
+                {"id": home, "isHome": "1", "score": "", "spread": "-3.5"},
+                {"id": away, "isHome": "0", "score": "", "spread": "3.5"},
+            ],
+        }
+        for index, (home, away) in enumerate(zip(teams[::2], teams[1::2], strict=True))
+    ]
+    return {"week": str(CURRENT_WEEK), "matchup": matchups}
+
+
+def generate(seed: int = SEED) -> dict[str, dict[str, Any]]:
+    """Build a consistent, made-up league as a set of export documents by TYPE."""
+    rng = random.Random(seed)  # noqa: S311 not used for anything secret
+    players = _players(rng)
+    rosters = _rosters(rng, players)
+    schedule = _schedule(rng)
+    rostered = {player["id"] for roster in rosters for player in roster}
+    franchises = [
+        {"id": _franchise_id(index), "name": f"Franchise {index + 1}", "division": "00"}
+        for index in range(FRANCHISES)
+    ]
+    documents = {
+        "league": {
+            "id": LEAGUE_ID,
+            "name": "Benchmark League",
+            "rosterSize": str(ROSTER_SIZE),
+            "startWeek": "1",
+            "endWeek": "17",
+            "lastRegularSeasonWeek": str(LAST_REGULAR_SEASON_WEEK),
+            "franchises": {"count": str(FRANCHISES), "franchise": franchises},
+            "starters": {
+                "count": str(STARTER_COUNT),
+                "position": [
+                    {"name": position, "limit": limit}
+                    for position, limit in STARTERS.items()
+                ],
+            },
+        },
+        "rules": {
+            "positionRules": [
+                {
+                    "positions": position,
+                    "rule": [
+                        {"event": {"$t": "#P"}, "points": {"$t": "*.04"}},
+                        {"event": {"$t": "#R"}, "points": {"$t": "*.1"}},
+                    ],
+                }
+                for position in POSITIONS
+            ],
+        },
+        "players": {
+            "timestamp": str(TIMESTAMP),
+            "player": players,
+        },
+        "rosters": {
+            "franchise": [
+                {
+                    "id": _franchise_id(index),
+                    "week": str(CURRENT_WEEK),
+                    "player": [
+                        {"id": player["id"], "status": "ROSTER", "salary": ""}
+                        for player in roster
+                    ],
+                }
+                for index, roster in enumerate(rosters)
+            ],
+        },
+        "freeAgents": {
+            "leagueUnit": {
+                "unit": "LEAGUE",
+                "player": [
+                    {"id": player["id"], "shortStatus": "FA"}
+                    for player in players
+                    if player["id"] not in rostered
+                ],
+            },
+        },
+        "schedule": {"weeklySchedule": schedule},
+        "leagueStandings": {"franchise": _standings(schedule)},
+        "liveScoring": _live_scoring(rng, schedule, rosters),
+        "transactions": {"transaction": _transactions(rng, players)},
+        "injuries": {
+            "timestamp": str(TIMESTAMP),
+            "week": str(CURRENT_WEEK),
+            "injury": [
+                {
+                    "id": player["id"],
+                    "status": rng.choice(["Questionable", "Doubtful", "Out", "IR"]),
+                    "details": rng.choice(["Ankle", "Knee", "Hamstring", "Concussion"]),
+                    "exp_return": "",
+                }
+                for player in rng.sample(players, 60)
+            ],
+        },
+        "nflSchedule": _nfl_schedule(rng),
+        "nflByeWeeks": {
+            "team": [
+                {"id": team, "bye_week": str(5 + index % 10)}
+                for index, team in enumerate(NFL_TEAMS)
+            ],
+        },
+        "calendar": {
+            "event": [
+                {
+                    "type": "DRAFT_START",
+                    "start_time": str(TIMESTAMP - 60 * 86400),
+                    "end_time": str(TIMESTAMP - 59 * 86400),
+                },
+            ],
+        },
+    }
+    return {
+        request_type: _document(request_type, content)
+        for request_type, content in documents.items()
+    }
+
+
+def save(documents: dict[str, dict[str, Any]], directory: Path = FIXTURES_DIR) -> None:
+    """Save export documents as fixtures, one file per TYPE."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for request_type, document in documents.items():
+        path = directory / f"{request_type}.json"
+        path.write_text(json.dumps(document, separators=(",", ":")), encoding="utf-8")
+
+
+def load(directory: Path = FIXTURES_DIR) -> dict[str, bytes]:
+    """Load the fixtures in a directory, as raw bodies by TYPE."""
+    return {path.stem: path.read_bytes() for path in sorted(directory.glob("*.json"))}
+
+
+def record(
+    request_types: list[str],
+    league_host: str,
+    nfl_host: str,
+    league_id: str,
+    api_key: str,
+) -> dict[str, dict[str, Any]]:
+    """Fetch real export documents to use as fixtures.
+
+    The API key is only sent, it never ends up in a fixture.
+    """
+    documents = {}
+    with httpx.Client(timeout=30) as client:
+        for request_type in request_types:
+            host = nfl_host if request_type in NFL_TYPES else league_host
+            params = {"TYPE": request_type, "L": league_id, "JSON": 1}
+            resp = client.get(host, params=params | {"APIKEY": api_key})
+            resp.raise_for_status()
+            documents[request_type] = resp.json()
+    return documents
+
+
+def main() -> None:
+    """Generate the fixtures, or record them from MyFantasyLeague."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--output", type=Path, default=FIXTURES_DIR)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Record real exports instead (needs network access and credentials).",
+    )
+    parser.add_argument("--league-host")
+    parser.add_argument("--nfl-host")
+    parser.add_argument("--league-id")
+    parser.add_argument("--api-key", default="")
+    args = parser.parse_args()
+    if args.record:
+        # Only recording needs the app's settings.
+        from src import utils
+
+        documents = record(
+            list(generate(args.seed)),
+            args.league_host or utils.LEAGUE_HOST,
+            args.nfl_host or utils.NFL_HOST,
+            args.league_id or str(utils.LEAGUE_ID),
+            args.api_key or utils.API_KEY,
+        )
+    else:
+        documents = generate(args.seed)
+    save(documents, args.output)
+
+
+if __name__ == "__main__":
+    main()
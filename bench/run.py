@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import httpx
+
+from bench import fixtures
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+ROOT = Path(__file__).resolve().parent.parent
+STARTUP_TIMEOUT = 30.0
+
+
+@dataclass
+class Scenario:
+    """A request the benchmark sends over and over."""
+
+    name: str
+    path: str
+    method: str = "GET"
+    json: dict[str, Any] | None = None
+
+
+SCENARIOS = [
+    Scenario("league", "/league"),
+    Scenario("rules", "/rules"),
+    Scenario("rosters", "/rosters"),
+    Scenario("free_agents", "/free_agents"),
+    Scenario("schedule", "/schedule"),
+    Scenario("league_standings", "/league_standings"),
+    Scenario("live_scoring", "/live_scoring?details=true"),
+    Scenario("transactions", "/transactions?transaction_type=*"),
+    Scenario("players", "/players?details=true"),
+    Scenario("players_by_position", "/players?position=WR"),
+    Scenario("injuries", "/injuries"),
+    Scenario("nfl_schedule", "/nfl_schedule"),
+    Scenario(
+        "batch",
+        "/batch",
+        method="POST",
+        json={
+            "requests": [
+                {"route": "league"},
+                {"route": "rosters"},
+                {"route": "league_standings"},
+                {"route": "live_scoring"},
+            ],
+        },
+    ),
+]
+
+
+@dataclass
+class Result:
+    """The measurements for one scenario."""
+
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    # Requests that got no response at all, such as dropped connections.
+    failed: int = 0
+    elapsed: float = 0.0
+    response_bytes: int = 0
+
+    def summary(self) -> dict[str, Any]:
+        """Get the measurements as JSON."""
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "requests": count + self.failed,
+            "errors": self.errors + self.failed,
+            "failed": self.failed,
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items())},
+            "throughput_rps": round(count / self.elapsed, 2) if self.elapsed else 0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / count * 1000, 3) if count else None,
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": round(latencies[-1] * 1000, 3) if count else None,
+            },
+            "mean_response_bytes": round(self.response_bytes / count) if count else 0,
+        }
+
+
+def percentile(latencies: list[float], percent: float) -> float | None:
+    """Get a percentile of sorted latencies in milliseconds, by nearest rank."""
+    if not latencies:
+        return None
+    rank = max(int(len(latencies) * percent / 100 + 0.5), 1)
+    return round(latencies[min(rank, len(latencies)) - 1] * 1000, 3)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url: str, process: subprocess.Popen[bytes]) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            msg = f"{process.args} exited with {process.returncode}"
+            raise RuntimeError(msg)
+        with contextlib.suppress(httpx.TransportError):
+            httpx.get(url, timeout=1)
+            return
+        time.sleep(0.1)
+    msg = f"{url} did not come up within {STARTUP_TIMEOUT}s"
+    raise RuntimeError(msg)
+
+
+@contextlib.contextmanager
+def _process(args: list[str], env: dict[str, str], url: str) -> Iterator[int]:
+    process = subprocess.Popen(args, cwd=ROOT, env=env)  # noqa: S603 our own commands
+    try:
+        _wait_until_up(url, process)
+        yield process.pid
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def memory(pid: int) -> dict[str, int | None]:
+    """Get the current and peak resident memory of a process, in bytes."""
+    usage: dict[str, int | None] = {"rss_bytes": None, "peak_rss_bytes": None}
+    with contextlib.suppress(OSError):
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            name, _, value = line.partition(":")
+            if name == "VmRSS":
+                usage["rss_bytes"] = int(value.split()[0]) * 1024
+            elif name == "VmHWM":
+                usage["peak_rss_bytes"] = int(value.split()[0]) * 1024
+    return usage
+
+
+async def _send(client: httpx.AsyncClient, scenario: Scenario, result: Result) -> None:
+    started = time.perf_counter()
+    try:
+        resp = await client.request(scenario.method, scenario.path, json=scenario.json)
+    except httpx.HTTPError:
+        result.failed += 1
+        return
+    result.latencies.append(time.perf_counter() - started)
+    result.statuses[resp.status_code] = result.statuses.get(resp.status_code, 0) + 1
+    result.response_bytes += len(resp.content)
+    if resp.is_error:
+        result.errors += 1
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Result:
+    """Send a scenario's request a number of times, a number at a time."""
+    for _ in range(warmup):
+        await _send(client, scenario, Result())
+    result = Result()
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            await _send(client, scenario, result)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def run(
+    base_url: str,
+    scenarios: list[Scenario],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict[str, Result]:
+    """Run every scenario, one after the other."""
+    limits = httpx.Limits(max_connections=concurrency)
+    headers = {"Accept-Encoding": "gzip, br"}
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        limits=limits,
+        headers=headers,
+        timeout=60,
+    ) as client:
+        return {
+            scenario.name: await run_scenario(
+                client,
+                scenario,
+                requests,
+                concurrency,
+                warmup,
+            )
+            for scenario in scenarios
+        }
+
+
+def _git_revision() -> str | None:
+    with contextlib.suppress(OSError, subprocess.CalledProcessError):
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],  # noqa: S603, S607 fixed git command from PATH
+            cwd=ROOT,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    return None
+
+
+def main() -> None:
+    """Benchmark the service against a local fake of MyFantasyLeague."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--requests", type=int, default=500, help="Per scenario.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10, help="Per scenario.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream, s.")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Upstream, +/- s.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Upstream.")
+    parser.add_argument(
+        "--cold",
+        action="store_true",
+        help="Disable the cache, so every request goes upstream.",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=[scenario.name for scenario in SCENARIOS],
+        help="Only run these scenarios. Can be given more than once.",
+    )
+    parser.add_argument("--fixtures", type=Path, default=fixtures.FIXTURES_DIR)
+    parser.add_argument("--output", type=Path, help="Write the results here.")
+    args = parser.parse_args()
+
+    scenarios = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.scenario or scenario.name in args.scenario
+    ]
+    fake_port, app_port = _free_port(), _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+    data_dir = tempfile.TemporaryDirectory()
+    # Anything set in the environment (MFL_* settings, for one) is passed on to the
+    # app, except where the benchmark has to override it.
+    env = {
+        "MYFANTASYLEAGUE_API_KEY": "bench",
+        "MYFANTASYLEAGUE_LEAGUE_ID": fixtures.LEAGUE_ID,
+        "MFL_REFRESH_ENABLED": "0",
+        "MFL_PLAYERS_SYNC_ENABLED": "0",
+        **os.environ,
+        "MFL_LEAGUE_HOST": f"{fake_url}/2024/export",
+        "MFL_NFL_HOST": f"{fake_url}/2024/export",
+        "MFL_DATA_DIR": data_dir.name,
+    }
+    if args.cold:
+        env["MFL_CACHE_MAX_ENTRIES"] = "0"
+    fake_args = [
+        sys.executable,
+        "-m",
+        "bench.fake_mfl",
+        f"--port={fake_port}",
+        f"--fixtures={args.fixtures}",
+        f"--latency={args.latency}",
+        f"--jitter={args.jitter}",
+        f"--error-rate={args.error_rate}",
+    ]
+    app_args = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "src.main:app",
+        f"--port={app_port}",
+        "--log-level=warning",
+    ]
+    with (
+        data_dir,
+        _process(fake_args, env, f"{fake_url}/calls"),
+        _process(app_args, env, f"{app_url}/openapi.json") as app_pid,
+    ):
+        started = time.perf_counter()
+        results = asyncio.run(
+            run(app_url, scenarios, args.requests, args.concurrency, args.warmup),
+        )
+        elapsed = time.perf_counter() - started
+        app_memory = memory(app_pid)
+        upstream_calls = httpx.get(f"{fake_url}/calls").json()
+
+    total = sum(
+        len(result.latencies) + result.failed for result in results.values()
+    )
+    report = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "cold": args.cold,
+        },
+        "routes": {name: result.summary() for name, result in results.items()},
+        "total": {
+            "requests": total,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2),
+        },
+        "memory": app_memory,
+        "upstream_calls": upstream_calls,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)  # noqa: T201 the report is the output
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,601 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import orjson
+from decouple import Csv, config
+
+from src.cache import get_cache
+from src.database import Database
+from src.utils import (
+    CURRENT_SEASON,
+    DATA_DIR,
+    LEAGUE_HOST,
+    LEAGUE_ID,
+    api_params,
+    as_list,
+    current_week,
+    fetch_export,
+    season_host,
+)
+
+if TYPE_CHECKING:
+    import sqlite3
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_ENABLED: bool = config("MFL_ARCHIVE_ENABLED", default=False, cast=bool)
+ARCHIVE_PATH: Path = config(
+    "MFL_ARCHIVE_PATH",
+    default=str(DATA_DIR / "archive.sqlite3"),
+    cast=Path,
+)
+# Past seasons to archive, on top of the current one.
+ARCHIVE_SEASONS: list[int] = config("MFL_ARCHIVE_SEASONS", default="", cast=Csv(int))
+ARCHIVE_INTERVAL: float = config("MFL_ARCHIVE_INTERVAL", default=6 * 3600.0, cast=float)
+ARCHIVE_LEASE = "archive|run"
+
+# Fields of a transaction that list the players it moved, as comma or pipe separated
+# ids mixed with bid amounts and draft pick ids.
+TRANSACTION_PLAYER_FIELDS = (
+    "transaction",
+    "activated",
+    "deactivated",
+    "added",
+    "dropped",
+    "franchise1_gave_up",
+    "franchise2_gave_up",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seasons (
+    season INTEGER PRIMARY KEY,
+    complete INTEGER NOT NULL DEFAULT 0,
+    start_week INTEGER,
+    end_week INTEGER,
+    archived_at REAL
+);
+CREATE TABLE IF NOT EXISTS franchises (
+    season INTEGER,
+    franchise_id TEXT,
+    name TEXT,
+    PRIMARY KEY (season, franchise_id)
+);
+CREATE TABLE IF NOT EXISTS weekly_results (
+    season INTEGER,
+    week INTEGER,
+    franchise_id TEXT,
+    opponent_id TEXT,
+    score REAL,
+    result TEXT,
+    is_home INTEGER,
+    PRIMARY KEY (season, week, franchise_id)
+);
+CREATE INDEX IF NOT EXISTS weekly_results_franchise
+    ON weekly_results (franchise_id, season, week);
+CREATE TABLE IF NOT EXISTS player_scores (
+    season INTEGER,
+    week INTEGER,
+    franchise_id TEXT,
+    player_id TEXT,
+    score REAL,
+    status TEXT,
+    PRIMARY KEY (season, week, franchise_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS player_scores_player
+    ON player_scores (player_id, season, week);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    season INTEGER,
+    timestamp INTEGER,
+    type TEXT,
+    franchise_id TEXT,
+    payload TEXT,
+    UNIQUE (season, payload)
+);
+CREATE INDEX IF NOT EXISTS transactions_season ON transactions (season, timestamp);
+CREATE INDEX IF NOT EXISTS transactions_franchise
+    ON transactions (franchise_id, timestamp);
+CREATE TABLE IF NOT EXISTS transaction_players (
+    player_id TEXT,
+    transaction_id INTEGER,
+    PRIMARY KEY (player_id, transaction_id)
+);
+CREATE TABLE IF NOT EXISTS draft_picks (
+    season INTEGER,
+    unit TEXT,
+    round INTEGER,
+    pick INTEGER,
+    franchise_id TEXT,
+    player_id TEXT,
+    timestamp INTEGER,
+    PRIMARY KEY (season, unit, round, pick)
+);
+CREATE INDEX IF NOT EXISTS draft_picks_player ON draft_picks (player_id);
+CREATE INDEX IF NOT EXISTS draft_picks_franchise ON draft_picks (franchise_id, season);
+CREATE TABLE IF NOT EXISTS auction_results (
+    season INTEGER,
+    unit TEXT,
+    player_id TEXT,
+    franchise_id TEXT,
+    winning_bid REAL,
+    timestamp INTEGER,
+    PRIMARY KEY (season, unit, player_id)
+);
+CREATE INDEX IF NOT EXISTS auction_results_player ON auction_results (player_id);
+CREATE INDEX IF NOT EXISTS auction_results_franchise
+    ON auction_results (franchise_id, season);
+CREATE TABLE IF NOT EXISTS documents (
+    season INTEGER,
+    type TEXT,
+    key TEXT,
+    payload TEXT,
+    PRIMARY KEY (season, type, key)
+);
+"""
+
+
+def _number(value: str | None) -> float | None:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def transaction_franchises(transaction: dict[str, Any]) -> set[str]:
+    """Get the ids of the franchises taking part in a transaction, both sides of it."""
+    return {
+        value
+        for key in ("franchise", "franchise2")
+        if (value := transaction.get(key))
+    }
+
+
+def transaction_players(transaction: dict[str, Any]) -> set[str]:
+    """Get the ids of the players a transaction moved."""
+    players = set()
+    for field in TRANSACTION_PLAYER_FIELDS:
+        for token in str(transaction.get(field, "")).replace("|", ",").split(","):
+            # Bid amounts have a decimal point and draft picks a prefix, so every
+            # token made of digits only is a player.
+            if token.isdigit():
+                players.add(token)
+    return players
+
+
+async def _fetch(season: int, request_type: str, **kwargs: Any) -> dict[str, Any]:  # noqa: ANN401 export parameters
+    """Get an export of a season, failing on MyFantasyLeague's errors."""
+    document = await fetch_export(
+        season_host(LEAGUE_HOST, season),
+        api_params(request_type, L=LEAGUE_ID, **kwargs),
+    )
+    if "error" in document:
+        msg = f"Archiving {request_type} of {season} failed: {document['error']}"
+        raise RuntimeError(msg)
+    return document
+
+
+class SeasonArchive:
+    """Immutable league history, kept in a local SQLite database.
+
+    Completed weeks of results (with every player's score), transactions, draft and
+    auction results, and the final standings and playoff brackets of finished seasons
+    are pulled once and never again. History queries by season, week, franchise or
+    player are answered from indexed tables and never go upstream.
+    """
+
+    def __init__(self, path: Path = ARCHIVE_PATH) -> None:
+        self.seasons = sorted({*ARCHIVE_SEASONS, CURRENT_SEASON})
+        self.archived_at: float | None = None
+        self.db = Database(path, SCHEMA)
+        self._task: asyncio.Task[None] | None = None
+
+    @staticmethod
+    def _store_transactions(
+        db: sqlite3.Connection,
+        season: int,
+        document: dict[str, Any],
+    ) -> None:
+        for transaction in as_list(document.get("transactions", {}).get("transaction")):
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO transactions "
+                "(season, timestamp, type, franchise_id, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    season,
+                    int(transaction.get("timestamp") or 0),
+                    transaction.get("type"),
+                    transaction.get("franchise"),
+                    orjson.dumps(transaction, option=orjson.OPT_SORT_KEYS).decode(),
+                ),
+            )
+            if cursor.rowcount:
+                db.executemany(
+                    "INSERT OR IGNORE INTO transaction_players VALUES (?, ?)",
+                    [
+                        (player_id, cursor.lastrowid)
+                        for player_id in transaction_players(transaction)
+                    ],
+                )
+
+    async def archive_season(self, season: int) -> None:
+        """Pull whatever of a season is final and not archived yet."""
+        done = await self.db.query(
+            "SELECT complete FROM seasons WHERE season = :season",
+            {"season": season},
+        )
+        if done and done[0]["complete"]:
+            return
+        league = (await _fetch(season, "league")).get("league", {})
+        start_week = int(league.get("startWeek") or 1)
+        end_week = int(league.get("endWeek") or 17)
+        complete = season < CURRENT_SEASON
+        last_week = end_week if complete else min(end_week, await current_week() - 1)
+
+        await self.db.write(_franchises(season, league))
+        await self._archive_weeks(season, range(start_week, last_week + 1))
+        transactions = await _fetch(season, "transactions", TRANS_TYPE="*")
+        await self.db.transact(
+            lambda db: self._store_transactions(db, season, transactions),
+        )
+        draft = await _fetch(season, "draftResults")
+        await self.db.write(_draft_picks(season, draft))
+        auction = await _fetch(season, "auctionResults")
+        await self.db.write(_auction_results(season, auction))
+        if complete:
+            await self._archive_final(season)
+
+        await self.db.write(
+            [
+                (
+                    "INSERT OR REPLACE INTO seasons VALUES (?, ?, ?, ?, ?)",
+                    (season, int(complete), start_week, end_week, time.time()),
+                ),
+            ],
+        )
+        logger.info("Archived season %s up to week %s", season, last_week)
+
+    async def _archive_weeks(self, season: int, weeks: range) -> None:
+        """Pull the results of the weeks of a season that are not archived yet."""
+        stored = await self.db.query(
+            "SELECT DISTINCT week FROM weekly_results WHERE season = :season",
+            {"season": season},
+        )
+        stored_weeks = {row["week"] for row in stored}
+        for week in weeks:
+            if week not in stored_weeks:
+                document = await _fetch(season, "weeklyResults", W=week)
+                await self.db.write(_weekly_results(season, week, document))
+
+    async def _archive_final(self, season: int) -> None:
+        """Pull the final standings and playoff brackets of a season that is over."""
+        documents = {("leagueStandings", ""): await _fetch(season, "leagueStandings")}
+        brackets = await _fetch(season, "playoffBrackets")
+        documents["playoffBrackets", ""] = brackets
+        bracket_list = brackets.get("playoffBrackets", {}).get("playoffBracket")
+        for bracket in as_list(bracket_list):
+            documents["playoffBracket", bracket["id"]] = await _fetch(
+                season,
+                "playoffBracket",
+                BRACKET_ID=bracket["id"],
+            )
+        await self.db.write(
+            [
+                (
+                    "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                    (season, request_type, key, orjson.dumps(document).decode()),
+                )
+                for (request_type, key), document in documents.items()
+            ],
+        )
+
+    async def _archive_logged(self, season: int) -> None:
+        try:
+            await self.archive_season(season)
+        except Exception:
+            logger.exception("Archiving season %s failed", season)
+
+    async def archive(self) -> None:
+        """Archive every configured season."""
+        # A season that fails is retried on the next run, and does not hold up the
+        # others.
+        for season in self.seasons:
+            await self._archive_logged(season)
+        self.archived_at = time.time()
+
+    async def start(self) -> None:
+        """Keep the archive up to date in the background."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop archiving and close the database."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self.db.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Workers sharing a cache elect one of them to write the archive.
+                if await get_cache().lease(ARCHIVE_LEASE, ARCHIVE_INTERVAL * 1.5):
+                    await self.archive()
+            except Exception:
+                logger.exception("Archiving failed")
+            await asyncio.sleep(ARCHIVE_INTERVAL)
+
+    async def archived_seasons(self) -> list[dict[str, Any]]:
+        """Get the seasons in the archive and how far each was archived."""
+        return await self.db.query(
+            "SELECT s.*, MAX(w.week) AS last_week FROM seasons AS s "
+            "LEFT JOIN weekly_results AS w USING (season) "
+            "GROUP BY s.season ORDER BY s.season",
+        )
+
+    async def weekly_results(
+        self,
+        season: int,
+        week: int | None = None,
+        franchise_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Get the results of a season, optionally for one week or franchise."""
+        return await self.db.query(
+            "SELECT week, franchise_id, opponent_id, score, result, is_home "
+            "FROM weekly_results WHERE season = :season "
+            "AND (:week IS NULL OR week = :week) "
+            "AND (:franchise IS NULL OR franchise_id = :franchise) "
+            "ORDER BY week, franchise_id",
+            {"season": season, "week": week, "franchise": franchise_id},
+        )
+
+    async def player_scores(
+        self,
+        season: int,
+        week: int | None = None,
+        franchise_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Get every rostered player's score in a season, by week and franchise."""
+        return await self.db.query(
+            "SELECT week, franchise_id, player_id, score, status "
+            "FROM player_scores WHERE season = :season "
+            "AND (:week IS NULL OR week = :week) "
+            "AND (:franchise IS NULL OR franchise_id = :franchise) "
+            "ORDER BY week, franchise_id, score DESC",
+            {"season": season, "week": week, "franchise": franchise_id},
+        )
+
+    async def franchise_history(self, franchise_id: str) -> list[dict[str, Any]]:
+        """Get a franchise's record and points in every archived season."""
+        return await self.db.query(
+            "SELECT w.season, f.name, "
+            "SUM(w.result = 'W') AS wins, SUM(w.result = 'L') AS losses, "
+            "SUM(w.result = 'T') AS ties, ROUND(SUM(w.score), 2) AS points_for, "
+            "ROUND(SUM(o.score), 2) AS points_against "
+            "FROM weekly_results AS w "
+            "LEFT JOIN weekly_results AS o ON o.season = w.season "
+            "AND o.week = w.week AND o.franchise_id = w.opponent_id "
+            "LEFT JOIN franchises AS f ON f.season = w.season "
+            "AND f.franchise_id = w.franchise_id "
+            "WHERE w.franchise_id = :franchise GROUP BY w.season ORDER BY w.season",
+            {"franchise": franchise_id},
+        )
+
+    async def player_history(self, player_id: str) -> dict[str, Any]:
+        """Get a player's weekly scores, transactions, draft picks and auctions."""
+        params = {"player": player_id}
+        return {
+            "scores": await self.db.query(
+                "SELECT season, week, franchise_id, score, status FROM player_scores "
+                "WHERE player_id = :player ORDER BY season, week",
+                params,
+            ),
+            "transactions": await self.transactions(player_id=player_id),
+            "draft_picks": await self.db.query(
+                "SELECT season, unit, round, pick, franchise_id, timestamp "
+                "FROM draft_picks WHERE player_id = :player ORDER BY season",
+                params,
+            ),
+            "auctions": await self.db.query(
+                "SELECT season, unit, franchise_id, winning_bid, timestamp "
+                "FROM auction_results WHERE player_id = :player ORDER BY season",
+                params,
+            ),
+        }
+
+    async def transactions(
+        self,
+        season: int | None = None,
+        franchise_id: str | None = None,
+        player_id: str | None = None,
+        transaction_type: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Get the archived transactions matching every filter that is given."""
+        rows = await self.db.query(
+            "SELECT season, payload FROM transactions "
+            "WHERE (:season IS NULL OR season = :season) "
+            "AND (:franchise IS NULL OR franchise_id = :franchise) "
+            "AND (:type IS NULL OR type = :type) "
+            "AND (:player IS NULL OR id IN (SELECT transaction_id "
+            "FROM transaction_players WHERE player_id = :player)) "
+            "ORDER BY timestamp DESC",
+            {
+                "season": season,
+                "franchise": franchise_id,
+                "player": player_id,
+                "type": transaction_type,
+            },
+        )
+        return [
+            {"season": row["season"], **orjson.loads(row["payload"])} for row in rows
+        ]
+
+    async def draft_picks(
+        self,
+        season: int,
+        franchise_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Get the draft picks of a season, optionally of one franchise."""
+        return await self.db.query(
+            "SELECT unit, round, pick, franchise_id, player_id, timestamp "
+            "FROM draft_picks WHERE season = :season "
+            "AND (:franchise IS NULL OR franchise_id = :franchise) "
+            "ORDER BY unit, round, pick",
+            {"season": season, "franchise": franchise_id},
+        )
+
+    async def auction_results(
+        self,
+        season: int,
+        franchise_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Get the auctions won in a season, optionally by one franchise."""
+        return await self.db.query(
+            "SELECT unit, player_id, franchise_id, winning_bid, timestamp "
+            "FROM auction_results WHERE season = :season "
+            "AND (:franchise IS NULL OR franchise_id = :franchise) "
+            "ORDER BY winning_bid DESC",
+            {"season": season, "franchise": franchise_id},
+        )
+
+    async def document(
+        self,
+        season: int,
+        request_type: str,
+        key: str = "",
+    ) -> dict[str, Any] | None:
+        """Get a final document of a finished season, like its standings."""
+        rows = await self.db.query(
+            "SELECT payload FROM documents "
+            "WHERE season = :season AND type = :type AND key = :key",
+            {"season": season, "type": request_type, "key": key},
+        )
+        return orjson.loads(rows[0]["payload"]) if rows else None
+
+    def stats(self) -> dict[str, Any]:
+        """Get the seasons being archived and when the archive last ran."""
+        return {
+            "enabled": ARCHIVE_ENABLED,
+            "seasons": self.seasons,
+            "archived_at": self.archived_at,
+        }
+
+
+def _franchises(
+    season: int,
+    league: dict[str, Any],
+) -> list[tuple[str, tuple[Any, ...]]]:
+    return [
+        (
+            "INSERT OR REPLACE INTO franchises VALUES (?, ?, ?)",
+            (season, franchise["id"], franchise.get("name")),
+        )
+        for franchise in as_list(league.get("franchises", {}).get("franchise"))
+    ]
+
+
+def _weekly_results(
+    season: int,
+    week: int,
+    document: dict[str, Any],
+) -> list[tuple[str, tuple[Any, ...]]]:
+    results = document.get("weeklyResults", {})
+    # Franchises on a bye are listed outside of the matchups.
+    pairs = [
+        as_list(matchup.get("franchise")) for matchup in as_list(results.get("matchup"))
+    ]
+    pairs += [[franchise] for franchise in as_list(results.get("franchise"))]
+    statements = []
+    for franchises in pairs:
+        for franchise in franchises:
+            opponents = [other["id"] for other in franchises if other is not franchise]
+            statements.append(
+                (
+                    "INSERT OR REPLACE INTO weekly_results "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        season,
+                        week,
+                        franchise["id"],
+                        opponents[0] if opponents else None,
+                        _number(franchise.get("score")),
+                        franchise.get("result"),
+                        int(franchise.get("isHome") or 0),
+                    ),
+                ),
+            )
+            statements.extend(
+                (
+                    "INSERT OR REPLACE INTO player_scores VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        season,
+                        week,
+                        franchise["id"],
+                        player["id"],
+                        _number(player.get("score")),
+                        player.get("status"),
+                    ),
+                )
+                for player in as_list(franchise.get("player"))
+            )
+    return statements
+
+
+def _draft_picks(
+    season: int,
+    document: dict[str, Any],
+) -> list[tuple[str, tuple[Any, ...]]]:
+    statements: list[tuple[str, tuple[Any, ...]]] = [
+        ("DELETE FROM draft_picks WHERE season = ?", (season,)),
+    ]
+    for unit in as_list(document.get("draftResults", {}).get("draftUnit")):
+        statements.extend(
+            (
+                "INSERT OR REPLACE INTO draft_picks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    season,
+                    unit.get("unit"),
+                    int(pick["round"]),
+                    int(pick["pick"]),
+                    pick.get("franchise"),
+                    pick.get("player") or None,
+                    int(pick.get("timestamp") or 0),
+                ),
+            )
+            for pick in as_list(unit.get("draftPick"))
+        )
+    return statements
+
+
+def _auction_results(
+    season: int,
+    document: dict[str, Any],
+) -> list[tuple[str, tuple[Any, ...]]]:
+    statements: list[tuple[str, tuple[Any, ...]]] = [
+        ("DELETE FROM auction_results WHERE season = ?", (season,)),
+    ]
+    for unit in as_list(document.get("auctionResults", {}).get("auctionUnit")):
+        statements.extend(
+            (
+                "INSERT OR REPLACE INTO auction_results VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    season,
+                    unit.get("unit"),
+                    auction.get("player"),
+                    auction.get("franchise"),
+                    _number(auction.get("winningBid")),
+                    int(auction.get("lastBidTime") or 0),
+                ),
+            )
+            for auction in as_list(unit.get("auction"))
+        )
+    return statements
+
+
+season_archive = SeasonArchive()
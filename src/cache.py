@@ -0,0 +1,571 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import socket
+import sqlite3
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
+
+import orjson
+from decouple import config
+
+from src.metrics import DECODE_SECONDS, record_phase
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+CACHE_BACKEND: str = config("MFL_CACHE_BACKEND", default="memory")
+CACHE_URL: str = config("MFL_CACHE_URL", default="redis://localhost:6379/0")
+CACHE_PATH: Path = config("MFL_CACHE_PATH", default="data/cache.sqlite3", cast=Path)
+CACHE_MAX_ENTRIES: int = config("MFL_CACHE_MAX_ENTRIES", default=2048, cast=int)
+CACHE_MAX_BYTES: int = config("MFL_CACHE_MAX_BYTES", default=128 * 1024**2, cast=int)
+CACHE_DEFAULT_TTL: float = config("MFL_CACHE_DEFAULT_TTL", default=300.0, cast=float)
+# How long a document is kept around after it stops being fresh, so that it can still
+# be served while a newer copy is being fetched.
+CACHE_STALE_TTL: float = config("MFL_CACHE_STALE_TTL", default=6 * 3600.0, cast=float)
+# How long a worker sharing the cache may hold on to fetching a document before the
+# others stop waiting for it and fetch it themselves.
+CACHE_LEASE_TTL: float = config("MFL_CACHE_LEASE_TTL", default=30.0, cast=float)
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# How long, in seconds, a document of each export TYPE stays fresh. Setup-style data
+# that changes a few times a season gets hours, roster-style data gets minutes and
+# in-game data gets seconds. A TTL of zero means the export is never cached.
+TTL_POLICY: dict[str, float] = {
+    # Common league info
+    "league": 6 * HOUR,
+    "rules": 6 * HOUR,
+    "rosters": 5 * MINUTE,
+    "freeAgents": 5 * MINUTE,
+    "schedule": 6 * HOUR,
+    "calendar": 6 * HOUR,
+    "playoffBrackets": 6 * HOUR,
+    "playoffBracket": 10 * MINUTE,
+    # Transactions
+    "transactions": 2 * MINUTE,
+    "pendingWaivers": 0,
+    "pendingTrades": 0,
+    "tradeBait": 5 * MINUTE,
+    "assets": 5 * MINUTE,
+    # Scoring and results
+    "leagueStandings": 15 * MINUTE,
+    "weeklyResults": 5 * MINUTE,
+    "liveScoring": 10,
+    "playerScores": 5 * MINUTE,
+    "projectedScores": HOUR,
+    # Draft and auction
+    "draftResults": 5 * MINUTE,
+    "auctionResults": 5 * MINUTE,
+    "selectedKeepers": 5 * MINUTE,
+    "myDraftList": MINUTE,
+    # Communications
+    "messageBoard": MINUTE,
+    "messageBoardThread": MINUTE,
+    "polls": 10 * MINUTE,
+    # League players
+    "playerRosterStatus": 5 * MINUTE,
+    "myWatchList": MINUTE,
+    "contestPlayers": 5 * MINUTE,
+    "salaries": HOUR,
+    "salaryAdjustments": HOUR,
+    # Other league info
+    "futureDraftPicks": HOUR,
+    "accounting": HOUR,
+    "pool": 10 * MINUTE,
+    "survivorPool": 10 * MINUTE,
+    "abilities": HOUR,
+    # User functions
+    "myLeagues": HOUR,
+    "leagueSearch": HOUR,
+    # Fantasy content
+    "players": 12 * HOUR,
+    "playerProfile": HOUR,
+    "allRules": DAY,
+    "playerRanks": 6 * HOUR,
+    "adp": 6 * HOUR,
+    "aav": 6 * HOUR,
+    "topAdds": HOUR,
+    "topDrops": HOUR,
+    "topStarters": HOUR,
+    "topTrades": HOUR,
+    "topOwns": HOUR,
+    "whoShouldIStart": 30 * MINUTE,
+    # NFL content
+    "injuries": 30 * MINUTE,
+    "nflSchedule": 5 * MINUTE,
+    "nflByeWeeks": DAY,
+    "pointsAllowed": 6 * HOUR,
+}
+
+# Export TYPEs whose cached documents can be dropped before their TTL runs out (see
+# `src.invalidation`). Clients cannot tell when that happens, so they are told to
+# revalidate responses built from them every time.
+REVALIDATED_TYPES: set[str] = set()
+
+# Parameters that say nothing about the document being requested. The API key in
+# particular must never end up in a cache key.
+_IGNORED_KEY_PARAMS = frozenset({"APIKEY", "JSON"})
+
+
+def ttl_for(request_type: str) -> float:
+    """Get the freshness lifetime, in seconds, for an export TYPE."""
+    return TTL_POLICY.get(request_type, CACHE_DEFAULT_TTL)
+
+
+def cache_key(host: str, params: dict[str, Any]) -> str:
+    """Build the cache key for an export request.
+
+    The key leads with the export TYPE so that every document of one TYPE shares a
+    prefix, followed by the host and the remaining parameters in sorted order.
+    """
+    query = urlencode(
+        sorted(
+            (key, str(value))
+            for key, value in params.items()
+            if key not in _IGNORED_KEY_PARAMS and key != "TYPE"
+        ),
+    )
+    return f"{params['TYPE']}|{host}?{query}"
+
+
+@dataclass
+class Document:
+    """An export document exactly as it was received from MyFantasyLeague."""
+
+    request_type: str
+    body: bytes
+    fetched_at: float = field(default_factory=time.time)
+    # Compressed copies of the body, by content encoding, so they are not compressed
+    # again every time the document is sent.
+    variants: dict[str, bytes] = field(default_factory=dict)
+
+    @cached_property
+    def data(self) -> dict[str, Any]:
+        """Get the decoded document, decoding it only the first time it is needed."""
+        started = time.perf_counter()
+        data = orjson.loads(self.body)
+        elapsed = time.perf_counter() - started
+        DECODE_SECONDS.labels(self.request_type).observe(elapsed)
+        record_phase("decode", elapsed)
+        return data
+
+    @cached_property
+    def etag(self) -> str:
+        """Get a strong validator for the document, a hash of its exact bytes."""
+        return hashlib.blake2b(self.body, digest_size=16).hexdigest()
+
+    @property
+    def age(self) -> float:
+        """Get the number of seconds since the document was fetched."""
+        return time.time() - self.fetched_at
+
+    @property
+    def size(self) -> int:
+        """Get the size of the document body and its compressed variants in bytes."""
+        return len(self.body) + sum(len(variant) for variant in self.variants.values())
+
+    def dumps(self) -> bytes:
+        """Serialize the document for a backend that stores plain bytes."""
+        variants = self.variants
+        header = orjson.dumps(
+            {
+                "request_type": self.request_type,
+                "fetched_at": self.fetched_at,
+                "variants": {name: len(body) for name, body in variants.items()},
+            },
+        )
+        return b"".join(
+            [struct.pack("!I", len(header)), header, self.body, *variants.values()],
+        )
+
+    @classmethod
+    def loads(cls, payload: bytes) -> Document:
+        """Rebuild a document serialized with `dumps`."""
+        (header_size,) = struct.unpack_from("!I", payload)
+        header = orjson.loads(payload[4 : 4 + header_size])
+        body_end = len(payload) - sum(header.get("variants", {}).values())
+        variants = {}
+        offset = body_end
+        for encoding, length in header.get("variants", {}).items():
+            variants[encoding] = payload[offset : offset + length]
+            offset += length
+        return cls(
+            request_type=header["request_type"],
+            body=payload[4 + header_size : body_end],
+            fetched_at=header["fetched_at"],
+            variants=variants,
+        )
+
+
+class CacheBackend(ABC):
+    """Storage for upstream documents, keyed by `cache_key`.
+
+    Backends only decide how long a document is retained. Whether a retained document
+    is still fresh is up to the caller, based on its `age`.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Document | None:
+        """Get a retained document, or None."""
+
+    @abstractmethod
+    async def set(self, key: str, document: Document, ttl: float) -> None:
+        """Retain a document for `ttl` seconds."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove a document."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Remove every document."""
+
+    @abstractmethod
+    async def keys(self, prefix: str) -> list[str]:
+        """Get the keys of the retained documents that start with a prefix."""
+
+    async def lease(self, key: str, ttl: float) -> bool:  # noqa: ARG002 for shared backends
+        """Claim a piece of work for this process for `ttl` seconds.
+
+        Backends shared by several processes hand a lease to one of them at a time, so
+        that a document is fetched, or an export refreshed, by a single worker while
+        the others read the result from the cache. The holder can renew its lease. A
+        cache held in a single process always grants it.
+        """
+        return True
+
+    async def release(self, key: str) -> None:  # noqa: B027 only for shared backends
+        """Give up a lease before it runs out."""
+
+    async def close(self) -> None:  # noqa: B027 closing is optional for backends
+        """Release any resources held by the backend."""
+
+
+def lease_owner() -> str:
+    """Identify this process to the other processes sharing the cache."""
+    # Looked up on every call, as workers forked from a preloaded app share the module.
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU cache bounded by both entry count and total body size."""
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, Document]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Get the number of documents held."""
+        return len(self._entries)
+
+    async def get(self, key: str) -> Document | None:
+        """Get a retained document, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, document = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return document
+
+    async def set(self, key: str, document: Document, ttl: float) -> None:
+        """Retain a document for `ttl` seconds, evicting the least recently used."""
+        self._remove(key)
+        if document.size > self.max_bytes:
+            return
+        self._entries[key] = (time.time() + ttl, document)
+        self.size += document.size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    async def delete(self, key: str) -> None:
+        """Remove a document."""
+        self._remove(key)
+
+    async def clear(self) -> None:
+        """Remove every document."""
+        self._entries.clear()
+        self.size = 0
+
+    async def keys(self, prefix: str) -> list[str]:
+        """Get the keys of the retained documents that start with a prefix."""
+        return [key for key in self._entries if key.startswith(prefix)]
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1].size
+
+
+class RedisBackend(CacheBackend):
+    """Cache stored in anything that speaks the Redis protocol.
+
+    Expiry is delegated to Redis, and eviction is left to the server's
+    `maxmemory-policy` (`allkeys-lru` is the natural fit). Any client compatible with
+    `redis.asyncio.Redis` can be passed in, which makes it easy to point the backend at
+    a local stand-in such as `fakeredis`.
+    """
+
+    prefix = "mfl:"
+
+    def __init__(self, client: Redis | None = None, url: str = CACHE_URL) -> None:
+        if client is None:
+            from redis.asyncio import Redis
+
+            client = Redis.from_url(url)
+        self.client = client
+
+    async def get(self, key: str) -> Document | None:
+        """Get a retained document, or None."""
+        payload = await self.client.get(self.prefix + key)
+        if payload is None:
+            return None
+        return Document.loads(payload)
+
+    async def set(self, key: str, document: Document, ttl: float) -> None:
+        """Retain a document for `ttl` seconds."""
+        await self.client.set(
+            self.prefix + key,
+            document.dumps(),
+            px=max(int(ttl * 1000), 1),
+        )
+
+    async def delete(self, key: str) -> None:
+        """Remove a document."""
+        await self.client.delete(self.prefix + key)
+
+    async def clear(self) -> None:
+        """Remove every document."""
+        keys = [key async for key in self.client.scan_iter(match=f"{self.prefix}*")]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def keys(self, prefix: str) -> list[str]:
+        """Get the keys of the retained documents that start with a prefix."""
+        match = f"{self.prefix}{prefix}*"
+        return [
+            key.decode().removeprefix(self.prefix)
+            async for key in self.client.scan_iter(match=match)
+        ]
+
+    async def lease(self, key: str, ttl: float) -> bool:
+        """Claim a piece of work for this process for `ttl` seconds."""
+        lease_key = f"{self.prefix}lease:{key}"
+        owner = lease_owner()
+        px = max(int(ttl * 1000), 1)
+        if await self.client.set(lease_key, owner, px=px, nx=True):
+            return True
+        holder = await self.client.get(lease_key)
+        if holder is not None and holder.decode() == owner:
+            await self.client.pexpire(lease_key, px)
+            return True
+        return False
+
+    async def release(self, key: str) -> None:
+        """Give up a lease before it runs out."""
+        lease_key = f"{self.prefix}lease:{key}"
+        holder = await self.client.get(lease_key)
+        if holder is not None and holder.decode() == lease_owner():
+            await self.client.delete(lease_key)
+
+    async def close(self) -> None:
+        """Close the connection to the Redis server."""
+        await self.client.aclose()
+
+
+class SQLiteBackend(CacheBackend):
+    """Cache kept in a SQLite database shared by every worker on a host.
+
+    The database runs in WAL mode, so readers never block the writer or each other,
+    and is memory mapped, so reading a document is a copy out of the OS page cache
+    rather than a read from disk. Each worker still gets its own copy of every
+    document it reads, and decodes it itself. Only one worker fetches a given document
+    at a time (see `lease`). Expired documents are dropped as new ones are written,
+    and the documents closest to expiring are dropped first when the database grows
+    past `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        path: Path = CACHE_PATH,
+        max_bytes: int = CACHE_MAX_BYTES,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            timeout=5.0,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(f"PRAGMA mmap_size={max_bytes * 2}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "key TEXT PRIMARY KEY, expires_at REAL, size INTEGER, payload BLOB)",
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS documents_expiry ON documents (expires_at)",
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)",
+        )
+
+    def _run(self, sql: str, *params: Any) -> list[tuple[Any, ...]]:  # noqa: ANN401 SQL parameters
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    async def _execute(self, sql: str, *params: Any) -> list[tuple[Any, ...]]:  # noqa: ANN401 SQL parameters
+        return await asyncio.to_thread(self._run, sql, *params)
+
+    async def get(self, key: str) -> Document | None:
+        """Get a retained document, or None."""
+        rows = await self._execute(
+            "SELECT payload FROM documents WHERE key = ? AND expires_at > ?",
+            key,
+            time.time(),
+        )
+        return Document.loads(rows[0][0]) if rows else None
+
+    async def set(self, key: str, document: Document, ttl: float) -> None:
+        """Retain a document for `ttl` seconds, dropping expired ones."""
+        if document.size > self.max_bytes:
+            await self.delete(key)
+            return
+        await asyncio.to_thread(self._set, key, document.dumps(), time.time() + ttl)
+
+    def _set(self, key: str, payload: bytes, expires_at: float) -> None:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                    (key, expires_at, len(payload), payload),
+                )
+                self._db.execute(
+                    "DELETE FROM documents WHERE expires_at <= ?",
+                    (time.time(),),
+                )
+                (size,) = self._db.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM documents",
+                ).fetchone()
+                if size > self.max_bytes:
+                    self._evict(size - self.max_bytes)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _evict(self, excess: int) -> None:
+        rows = self._db.execute(
+            "SELECT key, size FROM documents ORDER BY expires_at",
+        ).fetchall()
+        for key, size in rows:
+            if excess <= 0:
+                break
+            self._db.execute("DELETE FROM documents WHERE key = ?", (key,))
+            excess -= size
+
+    async def delete(self, key: str) -> None:
+        """Remove a document."""
+        await self._execute("DELETE FROM documents WHERE key = ?", key)
+
+    async def clear(self) -> None:
+        """Remove every document."""
+        await self._execute("DELETE FROM documents")
+
+    async def keys(self, prefix: str) -> list[str]:
+        """Get the keys of the retained documents that start with a prefix."""
+        rows = await self._execute(
+            "SELECT key FROM documents WHERE substr(key, 1, ?) = ? AND expires_at > ?",
+            len(prefix),
+            prefix,
+            time.time(),
+        )
+        return [key for (key,) in rows]
+
+    async def lease(self, key: str, ttl: float) -> bool:
+        """Claim a piece of work for this process for `ttl` seconds."""
+        now = time.time()
+        owner = lease_owner()
+        # Taken when nobody holds the lease, it ran out, or this process holds it.
+        rows = await self._execute(
+            "INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE "
+            "SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.expires_at <= ? OR leases.owner = excluded.owner "
+            "RETURNING owner",
+            key,
+            owner,
+            now + ttl,
+            now,
+        )
+        return bool(rows)
+
+    async def release(self, key: str) -> None:
+        """Give up a lease before it runs out."""
+        await self._execute(
+            "DELETE FROM leases WHERE key = ? AND owner = ?",
+            key,
+            lease_owner(),
+        )
+
+    async def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+
+_BACKENDS: dict[str, type[CacheBackend]] = {
+    "memory": MemoryBackend,
+    "redis": RedisBackend,
+    "sqlite": SQLiteBackend,
+}
+
+_cache: CacheBackend | None = None
+
+
+def get_cache() -> CacheBackend:
+    """Get the configured cache backend, creating it on first use."""
+    global _cache  # noqa: PLW0603 module level cache shared by the app
+    if _cache is None:
+        _cache = _BACKENDS[CACHE_BACKEND]()
+    return _cache
+
+
+def set_cache(backend: CacheBackend) -> None:
+    """Replace the cache backend, for example with one using a custom client."""
+    global _cache  # noqa: PLW0603 module level cache shared by the app
+    _cache = backend
+
+
+async def close_cache() -> None:
+    """Close the cache backend."""
+    global _cache  # noqa: PLW0603 module level cache shared by the app
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import gzip
+import hashlib
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+import orjson
+
+from src.cache import Document, cache_key, ttl_for
+from src.responses import precompress
+from src.upstream import UpstreamError
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from src.cache import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class CassetteMode(str, enum.Enum):
+    """What the cassette does with upstream traffic."""
+
+    # Exports are fetched from MyFantasyLeague and nothing is stored.
+    off = "off"
+    # Exports are fetched from MyFantasyLeague and every response is stored.
+    record = "record"
+    # Exports are only ever served from the cassette; MyFantasyLeague is never called.
+    replay = "replay"
+    # The cache is filled from the cassette on startup, then exports are fetched from
+    # MyFantasyLeague as usual once they expire.
+    prime = "prime"
+
+
+class CassetteMissError(UpstreamError):
+    """An export was requested in replay mode that was never recorded."""
+
+
+class Cassette:
+    """Recorded MyFantasyLeague responses, kept on disk.
+
+    Bodies are stored gzipped under the SHA-256 of their bytes, so identical documents
+    are only stored once however often they were recorded. An append-only index maps
+    each request, keyed like the cache (by TYPE and parameters, never the API key), to
+    the body last recorded for it. A cassette is a plain directory, so a snapshot of
+    one can be copied to a new replica, a CI job or a load test as is.
+    """
+
+    def __init__(self, path: Path, mode: CassetteMode = CassetteMode.off) -> None:
+        self.path = path
+        self.mode = mode
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._index: dict[str, dict[str, Any]] | None = None
+        self._write_lock = threading.Lock()
+
+    @property
+    def index_path(self) -> Path:
+        """Get the path of the index file."""
+        return self.path / "index.jsonl"
+
+    def object_path(self, digest: str) -> Path:
+        """Get the path of a stored body."""
+        return self.path / "objects" / digest[:2] / f"{digest}.json.gz"
+
+    def load_index(self) -> dict[str, dict[str, Any]]:
+        """Read the index from disk, the last entry recorded for a request winning."""
+        index: dict[str, dict[str, Any]] = {}
+        if self.index_path.exists():
+            with self.index_path.open("rb") as fp:
+                for line in fp:
+                    if line.strip():
+                        entry = orjson.loads(line)
+                        index[entry["key"]] = entry
+        return index
+
+    async def index(self) -> dict[str, dict[str, Any]]:
+        """Get the index, reading it from disk the first time."""
+        if self._index is None:
+            self._index = await asyncio.to_thread(self.load_index)
+        return self._index
+
+    def _write(self, entry: dict[str, Any], body: bytes) -> None:
+        path = self.object_path(entry["object"])
+        with self._write_lock:
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_bytes(gzip.compress(body, mtime=0))
+                tmp_path.replace(path)
+            with self.index_path.open("ab") as fp:
+                fp.write(orjson.dumps(entry) + b"\n")
+
+    def _read(self, digest: str) -> bytes:
+        return gzip.decompress(self.object_path(digest).read_bytes())
+
+    async def record(self, host: str, params: dict[str, Any], body: bytes) -> None:
+        """Store the body MyFantasyLeague answered a request with."""
+        index = await self.index()
+        entry = {
+            "key": cache_key(host, params),
+            "type": params["TYPE"],
+            "object": hashlib.sha256(body).hexdigest(),
+            "recorded_at": time.time(),
+        }
+        if index.get(entry["key"], {}).get("object") == entry["object"]:
+            return
+        await asyncio.to_thread(self._write, entry, body)
+        index[entry["key"]] = entry
+        self.recorded += 1
+
+    async def replay(self, host: str, params: dict[str, Any]) -> Document:
+        """Get the document recorded for a request, as if it was just fetched."""
+        entry = (await self.index()).get(cache_key(host, params))
+        if entry is None:
+            self.misses += 1
+            msg = f"{params['TYPE']} was not recorded in the cassette"
+            raise CassetteMissError(msg)
+        body = await asyncio.to_thread(self._read, entry["object"])
+        self.replayed += 1
+        return Document(request_type=entry["type"], body=body)
+
+    async def prime(self, cache: CacheBackend, stale_ttl: float) -> int:
+        """Fill the cache with every recorded document that can be cached.
+
+        The documents are treated as just fetched, so a new replica answers from them
+        straight away and only goes to MyFantasyLeague as they expire.
+        """
+        primed = 0
+        for key, entry in (await self.index()).items():
+            ttl = ttl_for(entry["type"])
+            if ttl <= 0:
+                continue
+            try:
+                body = await asyncio.to_thread(self._read, entry["object"])
+            except OSError:
+                logger.warning("Recorded body of %s is missing", key)
+                continue
+            document = Document(request_type=entry["type"], body=body)
+            if "error" in document.data:
+                continue
+            precompress(document)
+            await cache.set(key, document, ttl + stale_ttl)
+            primed += 1
+        logger.info("Primed the cache with %d recorded documents", primed)
+        return primed
+
+    def stats(self) -> dict[str, Any]:
+        """Get the mode of the cassette and what it has done."""
+        return {
+            "mode": self.mode.value,
+            "path": str(self.path),
+            "requests": None if self._index is None else len(self._index),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import importlib.util
+
+import httpx
+from decouple import config
+
+# Connection pool and timeout settings for the shared upstream client. The defaults
+# are sized for a single uvicorn worker talking to the two MyFantasyLeague hosts.
+POOL_MAX_CONNECTIONS: int = config("MFL_POOL_MAX_CONNECTIONS", default=100, cast=int)
+POOL_MAX_KEEPALIVE: int = config("MFL_POOL_MAX_KEEPALIVE", default=20, cast=int)
+POOL_KEEPALIVE_EXPIRY: float = config(
+    "MFL_POOL_KEEPALIVE_EXPIRY",
+    default=30.0,
+    cast=float,
+)
+CONNECT_TIMEOUT: float = config("MFL_CONNECT_TIMEOUT", default=5.0, cast=float)
+READ_TIMEOUT: float = config("MFL_READ_TIMEOUT", default=10.0, cast=float)
+POOL_TIMEOUT: float = config("MFL_POOL_TIMEOUT", default=5.0, cast=float)
+HTTP2: bool = config("MFL_HTTP2", default=True, cast=bool)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    """Check whether the optional `h2` package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        READ_TIMEOUT,
+        connect=CONNECT_TIMEOUT,
+        pool=POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(
+        http2=HTTP2 and _http2_available(),
+        limits=limits,
+        timeout=timeout,
+    )
+
+
+async def open_client() -> httpx.AsyncClient:
+    """Open the shared upstream client.
+
+    This is called from the application lifespan so that every request made to
+    MyFantasyLeague reuses the same pool of keep-alive connections.
+    """
+    global _client  # noqa: PLW0603 module level client shared by the app
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared upstream client and release its pooled connections."""
+    global _client  # noqa: PLW0603 module level client shared by the app
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get the shared upstream client.
+
+    The client is normally opened by the application lifespan, but it is created
+    lazily here as well so that the helpers keep working outside of the app (in a
+    shell, for example).
+    """
+    global _client  # noqa: PLW0603 module level client shared by the app
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from src.cache import Document
+
+
+@dataclass
+class RequestContext:
+    """What went into answering the current request.
+
+    The middleware opens one of these for every request, and the upstream helpers
+    record the documents they hand out into it, so the response can be described
+    (validators, freshness) without each route having to do anything.
+    """
+
+    documents: list[Document] = field(default_factory=list)
+    # Versions of local data (the player database, for one) the response was built
+    # from, alongside any upstream documents.
+    versions: list[str] = field(default_factory=list)
+    # Documents that were served past their TTL because MyFantasyLeague was failing.
+    stale: list[Document] = field(default_factory=list)
+    # Seconds spent in each phase of handling the request, see `src.metrics`.
+    timings: dict[str, float] = field(default_factory=dict)
+    # The exports fetched for the request: TYPE, parameters, how the cache answered
+    # and how long it took.
+    exports: list[dict[str, Any]] = field(default_factory=list)
+    finished: bool = False
+
+    @property
+    def versioned(self) -> bool:
+        """Check whether every input to the response was recorded."""
+        return bool(self.documents or self.versions)
+
+
+_current: ContextVar[RequestContext | None] = ContextVar(
+    "request_context",
+    default=None,
+)
+
+
+def current_context() -> RequestContext | None:
+    """Get the context of the request being handled, if any."""
+    context = _current.get()
+    # Background tasks started during a request inherit its context, but must not
+    # keep adding to it once the request is over.
+    if context is None or context.finished:
+        return None
+    return context
+
+
+def open_context() -> RequestContext:
+    """Start a context for the request being handled."""
+    context = RequestContext()
+    _current.set(context)
+    return context
+
+
+def track_document(document: Document, *, stale: bool = False) -> None:
+    """Record that a document was used to answer the current request."""
+    context = current_context()
+    if context is not None:
+        context.documents.append(document)
+        if stale:
+            context.stale.append(document)
+
+
+def track_version(version: str) -> None:
+    """Record that a version of some local data was used to answer the request."""
+    context = current_context()
+    if context is not None:
+        context.versions.append(version)
+
+
+def track_export(params: dict[str, Any], result: str, seconds: float) -> None:
+    """Record an export fetched for the current request."""
+    context = current_context()
+    if context is not None:
+        context.exports.append(
+            {"params": params, "cache": result, "ms": round(seconds * 1000, 3)},
+        )
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+T = TypeVar("T")
+
+
+class Database:
+    """A local SQLite database, used from the event loop without blocking it.
+
+    Every call runs in a worker thread, one at a time. The database runs in WAL mode,
+    so several worker processes can read it while one of them writes.
+    """
+
+    def __init__(self, path: Path, schema: str) -> None:
+        self.path = path
+        self.schema = schema
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(
+                self.path,
+                isolation_level=None,
+                check_same_thread=False,
+                timeout=5.0,
+            )
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(self.schema)
+        return self._db
+
+    def _rows(self, sql: str, params: dict[str, Any]) -> list[dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._connect().execute(sql, params)]
+
+    async def query(
+        self,
+        sql: str,
+        params: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Run a query, with named parameters."""
+        return await asyncio.to_thread(self._rows, sql, params or {})
+
+    def _transact(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(db)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            return result
+
+    async def transact(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Run a function against the database in a single transaction."""
+        return await asyncio.to_thread(self._transact, func)
+
+    async def write(self, statements: list[tuple[str, tuple[Any, ...]]]) -> None:
+        """Run statements in a single transaction."""
+
+        def run(db: sqlite3.Connection) -> None:
+            for sql, params in statements:
+                db.execute(sql, params)
+
+        await self.transact(run)
+
+    def close(self) -> None:
+        """Close the database. It is opened again on next use."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
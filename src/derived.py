@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+from src.singleflight import SingleFlight
+from src.utils import LEAGUE_HOST, LEAGUE_ID, NFL_HOST, api_params, fetch_document
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable
+
+    from src.cache import Document
+
+T = TypeVar("T")
+
+# An export to fetch: the host it comes from and its parameters.
+Export = tuple[str, dict[str, Any]]
+
+
+def league_export(request_type: str, **params: Any) -> Export:  # noqa: ANN401 any parameter
+    """Describe an export of the league."""
+    return LEAGUE_HOST, api_params(request_type, L=LEAGUE_ID, **params)
+
+
+def api_export(request_type: str, **params: Any) -> Export:  # noqa: ANN401 any parameter
+    """Describe an export that is not about the league, such as ADP or rankings."""
+    return LEAGUE_HOST, api_params(request_type, **params)
+
+
+def nfl_export(request_type: str, **params: Any) -> Export:  # noqa: ANN401 any parameter
+    """Describe an export of NFL data, which takes no league or API key."""
+    return NFL_HOST, {"JSON": 1, "TYPE": request_type, **params}
+
+
+async def fetch_documents(exports: dict[str, Export]) -> dict[str, Document]:
+    """Fetch several exports at once, by name."""
+    documents = await asyncio.gather(
+        *(fetch_document(host, params) for host, params in exports.values()),
+    )
+    return dict(zip(exports, documents, strict=True))
+
+
+def contents(documents: dict[str, Document]) -> dict[str, dict[str, Any]]:
+    """Get the content of documents, with MyFantasyLeague's errors left out as empty."""
+    return {
+        name: {} if "error" in document.data else document.data
+        for name, document in documents.items()
+    }
+
+
+def version_key(documents: Iterable[Document], *parts: Any) -> str:  # noqa: ANN401 any key part
+    """Build a key that changes whenever one of the documents, or a part, does."""
+    return "|".join([*map(str, parts), *(document.etag for document in documents)])
+
+
+class DerivedCache(Generic[T]):
+    """Values computed from upstream documents, kept per version of the documents.
+
+    A value is only computed once for a key (see `version_key`). Callers asking for it
+    while it is computed wait on that computation, and later callers get the same
+    value until a document it came from changes, and so does the key.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._values: OrderedDict[str, T] = OrderedDict()
+        self._computing: SingleFlight[T] = SingleFlight()
+
+    def __len__(self) -> int:
+        """Get the number of values kept."""
+        return len(self._values)
+
+    async def get(self, key: str, compute: Callable[[], Awaitable[T]]) -> T:
+        """Get the value for a key, computing it if it is not kept yet."""
+        if key in self._values:
+            self._values.move_to_end(key)
+            return self._values[key]
+
+        async def run() -> T:
+            value = await compute()
+            self._values[key] = value
+            while len(self._values) > self.size:
+                self._values.popitem(last=False)
+            return value
+
+        return await self._computing.do(key, run)
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import importlib.util
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+from decouple import config
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from src.cache import Document
+
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# How many documents are kept converted to another format, dropping the least recently
+# used first. Converting a large export takes longer than sending it, so it is done
+# once per version of it.
+FORMAT_CACHE_SIZE: int = config("MFL_FORMAT_CACHE_SIZE", default=32, cast=int)
+
+# The exports that can be sent as Arrow tables, by TYPE: the column their records' ids
+# go in and where the records are. Every element a record is nested in adds its id
+# (as `<element>_id`) and its week to the record.
+TABLES: dict[str, tuple[str, list[tuple[str, ...]]]] = {
+    "players": ("player_id", [("players", "player")]),
+    "playerScores": ("player_id", [("playerScores", "playerScore")]),
+    "adp": ("player_id", [("adp", "player")]),
+    "weeklyResults": (
+        "player_id",
+        [
+            ("weeklyResults", "matchup", "franchise", "player"),
+            ("weeklyResults", "franchise", "player"),
+            ("allWeeklyResults", "weeklyResults", "matchup", "franchise", "player"),
+            ("allWeeklyResults", "weeklyResults", "franchise", "player"),
+        ],
+    ),
+}
+# MyFantasyLeague sends every value as a string. These fields are numbers in tables,
+# and every other field is a string.
+INTEGER_FIELDS = frozenset(
+    {
+        "week",
+        "birthdate",
+        "draft_year",
+        "draft_round",
+        "draft_pick",
+        "height",
+        "weight",
+        "rank",
+        "draftsSelectedIn",
+        "isAvailable",
+        "shouldStart",
+        "gameSecondsRemaining",
+    },
+)
+FLOAT_FIELDS = frozenset(
+    {"score", "averagePick", "minPick", "maxPick", "draftSelPct"},
+)
+
+
+def _as_list(value: Any) -> list[Any]:  # noqa: ANN401 documents hold any JSON value
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _carry(carried: dict[str, Any], name: str, element: Any) -> dict[str, Any]:  # noqa: ANN401 any JSON value
+    if not isinstance(element, dict):
+        return carried
+    carried = dict(carried)
+    if "id" in element:
+        carried[f"{name}_id"] = element["id"]
+    if "week" in element:
+        carried["week"] = element["week"]
+    return carried
+
+
+def table_rows(content: dict[str, Any], request_type: str) -> list[dict[str, Any]]:
+    """Flatten the records of an export into rows, see `TABLES`."""
+    id_column, paths = TABLES[request_type]
+    rows = []
+    for path in paths:
+        found = [({}, element) for element in _as_list(content.get(path[0]))]
+        for parent, name in zip(path, path[1:], strict=False):
+            found = [
+                (_carry(carried, parent, element), child)
+                for carried, element in found
+                if isinstance(element, dict)
+                for child in _as_list(element.get(name))
+            ]
+        rows += [
+            {
+                **carried,
+                **{
+                    id_column if field == "id" else field: value
+                    for field, value in record.items()
+                    if not isinstance(value, dict | list)
+                },
+            }
+            for carried, record in found
+            if isinstance(record, dict)
+        ]
+    return rows
+
+
+def _typed(field: str, value: Any) -> Any:  # noqa: ANN401 any JSON value
+    if value is None or value == "":
+        return None
+    try:
+        if field in INTEGER_FIELDS:
+            return int(value)
+        if field in FLOAT_FIELDS:
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def _arrow(content: Any, request_type: str | None) -> bytes:  # noqa: ANN401 any JSON content
+    import pyarrow as pa
+
+    types = {field: pa.int64() for field in INTEGER_FIELDS} | {
+        field: pa.float64() for field in FLOAT_FIELDS
+    }
+    rows = table_rows(content, request_type or "")
+    columns = list(dict.fromkeys(field for row in rows for field in row))
+    table = pa.table(
+        {
+            column: pa.array(
+                [_typed(column, row.get(column)) for row in rows],
+                type=types.get(column, pa.string()),
+            )
+            for column in columns
+        },
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _msgpack(content: Any, request_type: str | None) -> bytes:  # noqa: ANN401, ARG001 any JSON content
+    import msgpack
+
+    return msgpack.packb(content, use_bin_type=True, default=str)
+
+
+SERIALIZERS: dict[str, Callable[[Any, str | None], bytes]] = {}
+if importlib.util.find_spec("msgpack") is not None:
+    SERIALIZERS[MSGPACK] = _msgpack
+if importlib.util.find_spec("pyarrow") is not None:
+    SERIALIZERS[ARROW] = _arrow
+
+
+def available_formats(request_type: str | None) -> list[str]:
+    """Get the formats, other than JSON, that an export can be sent in."""
+    return [
+        media_type
+        for media_type in SERIALIZERS
+        if media_type != ARROW or request_type in TABLES
+    ]
+
+
+def serialize(content: Any, request_type: str | None, media_type: str) -> bytes:  # noqa: ANN401 any JSON content
+    """Convert the content of a response to another format."""
+    return SERIALIZERS[media_type](content, request_type)
+
+
+_converted: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+
+def serialize_document(document: Document, media_type: str) -> bytes:
+    """Convert an upstream document to another format, once per version of it."""
+    key = (document.etag, media_type)
+    if key in _converted:
+        _converted.move_to_end(key)
+        return _converted[key]
+    body = serialize(document.data, document.request_type, media_type)
+    _converted[key] = body
+    while len(_converted) > FORMAT_CACHE_SIZE:
+        _converted.popitem(last=False)
+    return body
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qs
+
+import httpx
+from decouple import config
+
+from src.archive import transaction_franchises, transaction_players
+from src.cache import HOUR, REVALIDATED_TYPES, TTL_POLICY, get_cache
+from src.refresh import scheduler
+from src.upstream import UpstreamError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from src.cache import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+# Freshness lifetime given to the exports below while the transaction feed is watched.
+# Transactions are what changes them, so they can be kept much longer than their
+# default TTL; this only bounds how long a change made some other way (by the
+# commissioner, say) can go unnoticed.
+INVALIDATED_TTL: float = config("MFL_INVALIDATED_TTL", default=HOUR, cast=float)
+
+# Exports that players moving between franchises and the free agent pool change.
+ROSTER_MOVES = (
+    "rosters",
+    "freeAgents",
+    "playerRosterStatus",
+    "salaries",
+    "assets",
+    "tradeBait",
+)
+
+# The exports each type of transaction changes.
+AFFECTED_EXPORTS: dict[str, tuple[str, ...]] = {
+    "TRADE": (*ROSTER_MOVES, "futureDraftPicks"),
+    "FREE_AGENT": ROSTER_MOVES,
+    "WAIVER": ROSTER_MOVES,
+    "BBID_WAIVER": ROSTER_MOVES,
+    "AUCTION_WON": (*ROSTER_MOVES, "auctionResults"),
+    # Moves within a roster only change the status of the players moved.
+    "IR": ("rosters", "playerRosterStatus"),
+    "TAXI": ("rosters", "playerRosterStatus"),
+}
+
+# Parameters that limit an export to some franchises or players. A cached export
+# limited to others is not changed by a transaction.
+FRANCHISE_PARAMS = ("FRANCHISE", "FRANCHISE_ID", "F")
+PLAYER_PARAMS = ("P", "PLAYERS")
+
+
+def extend_ttls() -> None:
+    """Keep the exports that transactions change fresh for longer.
+
+    Clients are told to revalidate them every time instead, as they cannot know when
+    a copy is invalidated.
+    """
+    for request_type in ROSTER_MOVES:
+        TTL_POLICY[request_type] = max(TTL_POLICY.get(request_type, 0), INVALIDATED_TTL)
+        REVALIDATED_TYPES.add(request_type)
+
+
+def _affected(key: str, franchises: set[str], players: set[str]) -> bool:
+    """Check whether a cached export could be changed by the given moves."""
+    query = parse_qs(key.partition("?")[2])
+    for param in FRANCHISE_PARAMS:
+        if param in query and not {
+            str(value).zfill(4) for value in query[param][0].split(",")
+        } & franchises:
+            return False
+    for param in PLAYER_PARAMS:
+        if param in query and not set(query[param][0].split(",")) & players:
+            return False
+    return True
+
+
+def _touched(
+    transactions: Iterable[dict[str, Any]],
+) -> dict[str, tuple[set[str], set[str]]]:
+    """Get the franchises and players moved, by the export TYPE they change."""
+    touched: dict[str, tuple[set[str], set[str]]] = {}
+    for transaction in transactions:
+        for request_type in AFFECTED_EXPORTS.get(transaction.get("type", ""), ()):
+            franchises, players = touched.setdefault(request_type, (set(), set()))
+            franchises.update(transaction_franchises(transaction))
+            players.update(transaction_players(transaction))
+    return touched
+
+
+async def _invalidate_key(cache: CacheBackend, key: str) -> bool:
+    """Refresh a cached export if it is kept warm, or drop it otherwise."""
+    try:
+        refreshed = await scheduler.refresh(key)
+    except (UpstreamError, httpx.HTTPError):
+        # The refresher keeps retrying on its own schedule, and the current copy is
+        # still what gets served if MyFantasyLeague is failing.
+        logger.warning("Refreshing %s after new transactions failed", key)
+        return False
+    if not refreshed:
+        await cache.delete(key)
+    return True
+
+
+async def invalidate(transactions: Iterable[dict[str, Any]]) -> list[str]:
+    """Drop, or refresh, the cached exports a set of new transactions changed.
+
+    Every cached document of an affected export TYPE is dropped, unless it is limited
+    to franchises or players the transactions did not touch. Exports kept warm are
+    refreshed instead, so their readers never have to wait on MyFantasyLeague.
+    """
+    cache = get_cache()
+    invalidated = [
+        key
+        for request_type, (franchises, players) in _touched(transactions).items()
+        for key in await cache.keys(f"{request_type}|")
+        if _affected(key, franchises, players) and await _invalidate_key(cache, key)
+    ]
+    if invalidated:
+        logger.info("New transactions invalidated %d cached exports", len(invalidated))
+    return invalidated
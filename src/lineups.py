@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import heapq
+from typing import TYPE_CHECKING, Any
+
+from src.context import track_version
+from src.derived import (
+    DerivedCache,
+    contents,
+    fetch_documents,
+    league_export,
+    nfl_export,
+    version_key,
+)
+from src.players import player_store
+from src.upstream import UpstreamError
+from src.utils import as_list, current_week
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Players with these injury statuses are not expected to play.
+UNAVAILABLE_STATUSES = frozenset({"Out", "IR", "Suspended"})
+# Roster statuses of players who can be in a starting lineup, as opposed to those on
+# the taxi squad or injured reserve.
+ACTIVE_STATUSES = frozenset({"ROSTER"})
+# Sets of lineups kept, by the documents they were built from.
+LINEUPS_SIZE = 8
+
+lineups: DerivedCache[dict[str, Any]] = DerivedCache(LINEUPS_SIZE)
+
+# A player who could start: id, position and projected score.
+Candidate = tuple[str, str, float]
+
+
+def requirements(league: dict[str, Any]) -> tuple[int, dict[str, tuple[int, int]]]:
+    """Get the number of starters, and how few and how many of each position start.
+
+    MyFantasyLeague gives a range ("2-3") for positions that can fill flex slots, so a
+    superflex is a quarterback range of "1-2".
+    """
+    starters = league.get("starters", {})
+    limits = {}
+    for position in as_list(starters.get("position")):
+        low, _, high = str(position.get("limit") or "0").partition("-")
+        limits[position["name"]] = (int(low), int(high or low))
+    count = int(starters.get("count") or sum(low for low, _ in limits.values()))
+    return count, limits
+
+
+def optimal_lineup(
+    candidates: list[Candidate],
+    count: int,
+    limits: dict[str, tuple[int, int]],
+) -> tuple[list[Candidate], dict[str, int]]:
+    """Pick the starters with the highest projected total, within the position limits.
+
+    Every position starts its best players, so only how many start at each position
+    has to be decided. Each position's minimum is filled first, then each remaining
+    slot goes to the best player left at a position with room for one more. Players of
+    a position only get worse, so that is the best lineup, found without trying any
+    others.
+
+    Returns the starters, and the number of slots at each position that could not be
+    filled for want of players.
+    """
+    by_position: dict[str, list[tuple[float, str]]] = {}
+    for player_id, position, points in candidates:
+        if position in limits:
+            by_position.setdefault(position, []).append((points, player_id))
+    for players in by_position.values():
+        players.sort(reverse=True)
+
+    rooms = {
+        position: min(high, len(by_position.get(position, [])))
+        for position, (_, high) in limits.items()
+    }
+    taken = {
+        position: min(low, rooms[position]) for position, (low, _) in limits.items()
+    }
+    unfilled = {
+        position: low - taken[position]
+        for position, (low, _) in limits.items()
+        if low > taken[position]
+    }
+    slots = count - sum(taken.values()) - sum(unfilled.values())
+    _fill_slots(by_position, rooms, taken, slots)
+    starters = [
+        (player_id, position, points)
+        for position, number in taken.items()
+        for points, player_id in by_position.get(position, [])[:number]
+    ]
+    return starters, unfilled
+
+
+def _fill_slots(
+    by_position: dict[str, list[tuple[float, str]]],
+    rooms: dict[str, int],
+    taken: dict[str, int],
+    slots: int,
+) -> None:
+    """Give each slot to the best player left at a position with room for one more."""
+    best_left = [
+        (-by_position[position][taken[position]][0], position)
+        for position in rooms
+        if taken[position] < rooms[position]
+    ]
+    heapq.heapify(best_left)
+    for _ in range(slots):
+        if not best_left:
+            break
+        _, position = heapq.heappop(best_left)
+        taken[position] += 1
+        if taken[position] < rooms[position]:
+            next_best = by_position[position][taken[position]][0]
+            heapq.heappush(best_left, (-next_best, position))
+
+
+def build_lineups(
+    documents: dict[str, dict[str, Any]],
+    week: int,
+    player: Callable[[str], dict[str, Any] | None],
+) -> dict[str, Any]:
+    """Build the best lineup of every franchise for a week.
+
+    The projections, injuries and bye weeks are indexed by player and NFL team once,
+    and looked up for every rostered player.
+    """
+    count, limits = requirements(documents["league"].get("league", {}))
+    projections = {
+        score["id"]: float(score.get("score") or 0)
+        for score in as_list(
+            documents["projectedScores"].get("projectedScores", {}).get("playerScore"),
+        )
+    }
+    injuries = {
+        injury["id"]: injury.get("status")
+        for injury in as_list(documents["injuries"].get("injuries", {}).get("injury"))
+    }
+    on_bye = {
+        team["id"]
+        for team in as_list(documents["nflByeWeeks"].get("nflByeWeeks", {}).get("team"))
+        if str(team.get("bye_week")) == str(week)
+    }
+
+    franchises = []
+    for franchise in as_list(documents["rosters"].get("rosters", {}).get("franchise")):
+        candidates, out = [], []
+        for rostered in as_list(franchise.get("player")):
+            if rostered.get("status", "ROSTER") not in ACTIVE_STATUSES:
+                continue
+            details = player(rostered["id"]) or {}
+            position, team = details.get("position", ""), details.get("team", "")
+            if injuries.get(rostered["id"]) in UNAVAILABLE_STATUSES:
+                out.append({"id": rostered["id"], "reason": injuries[rostered["id"]]})
+            elif team in on_bye:
+                out.append({"id": rostered["id"], "reason": "bye"})
+            else:
+                points = projections.get(rostered["id"], 0.0)
+                candidates.append((rostered["id"], position, points))
+        starters, unfilled = optimal_lineup(candidates, count, limits)
+        franchises.append(
+            {
+                "id": franchise["id"],
+                "projected": round(sum(points for _, _, points in starters), 2),
+                "starters": [
+                    {
+                        "id": player_id,
+                        "name": (player(player_id) or {}).get("name"),
+                        "position": position,
+                        "projected": points,
+                    }
+                    for player_id, position, points in starters
+                ],
+                "unfilled": unfilled,
+                "unavailable": out,
+            },
+        )
+    return {"week": week, "starters": count, "franchises": franchises}
+
+
+async def optimal_lineups(week: int | None = None) -> dict[str, Any]:
+    """Get the best lineup of every franchise for a week, the current one by default.
+
+    Lineups are built from the league's starter requirements, the rosters, the
+    projected scores, the injury report and the NFL bye weeks. Players who are out or
+    on a bye do not start. They are rebuilt only when one of those changes.
+    """
+    # Without a week, the rosters and injury report are the current ones, which are
+    # the documents kept warm.
+    weekly = {} if week is None else {"W": week}
+    week = week or await current_week()
+    exports = {
+        "league": league_export("league"),
+        "rosters": league_export("rosters", **weekly),
+        "projectedScores": league_export("projectedScores", W=week),
+        "injuries": nfl_export("injuries", **weekly),
+        "nflByeWeeks": nfl_export("nflByeWeeks"),
+    }
+    if player_store.loaded:
+        track_version(f"players:{player_store.synced_at}")
+        versions = [week, player_store.synced_at]
+    else:
+        exports["players"] = league_export("players")
+        versions = [week]
+    fetched = await fetch_documents(exports)
+    error = fetched["league"].data.get("error") or fetched["rosters"].data.get("error")
+    if error is not None:
+        msg = f"No lineups to build: {error}"
+        raise UpstreamError(msg)
+
+    async def build() -> dict[str, Any]:
+        documents = contents(fetched)
+        if "players" not in documents:
+            return build_lineups(documents, week, player_store.get)
+        players = documents["players"].get("players", {})
+        by_id = {details["id"]: details for details in as_list(players.get("player"))}
+        return build_lineups(documents, week, by_id.get)
+
+    return await lineups.get(version_key(fetched.values(), *versions), build)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any
+
+from decouple import config
+
+from src.utils import as_list, request_api_with_league
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+LIVE_POLL_INTERVAL: float = config("MFL_LIVE_POLL_INTERVAL", default=10.0, cast=float)
+LIVE_HEARTBEAT: float = config("MFL_LIVE_HEARTBEAT", default=15.0, cast=float)
+# Events queued for a viewer that is not keeping up. Past this, its queue is replaced
+# with a fresh snapshot rather than growing without bound.
+LIVE_QUEUE_SIZE = 32
+
+FRANCHISE_FIELDS = (
+    "score",
+    "gameSecondsRemaining",
+    "playersYetToPlay",
+    "playersCurrentlyPlaying",
+)
+PLAYER_FIELDS = ("score", "gameSecondsRemaining", "status")
+
+State = dict[str, dict[str, Any]]
+
+
+def flatten(document: dict[str, Any]) -> State:
+    """Reduce a liveScoring document to the per-franchise and per-player fields."""
+    live = document.get("liveScoring", {})
+    franchises = [
+        franchise
+        for matchup in as_list(live.get("matchup"))
+        for franchise in as_list(matchup.get("franchise"))
+    ]
+    # Franchises without a matchup this week are listed on their own.
+    franchises += as_list(live.get("franchise"))
+    state: State = {"franchises": {}, "players": {}}
+    for franchise in franchises:
+        franchise_id = franchise["id"]
+        state["franchises"][franchise_id] = {
+            field: franchise[field] for field in FRANCHISE_FIELDS if field in franchise
+        }
+        players = as_list((franchise.get("players") or {}).get("player"))
+        state["players"][franchise_id] = {
+            player["id"]: {
+                field: player[field] for field in PLAYER_FIELDS if field in player
+            }
+            for player in players
+        }
+    return state
+
+
+def _changes(
+    old: dict[str, dict[str, Any]],
+    new: dict[str, dict[str, Any]],
+) -> dict[str, dict[str, Any] | None]:
+    """Get the changed fields of each entry, with None for entries that went away."""
+    changes: dict[str, dict[str, Any] | None] = dict.fromkeys(old.keys() - new.keys())
+    for key, fields in new.items():
+        previous = old.get(key, {})
+        changed = {
+            field: value
+            for field, value in fields.items()
+            if previous.get(field) != value
+        }
+        if changed:
+            changes[key] = changed
+    return changes
+
+
+def diff(old: State, new: State) -> State:
+    """Get what changed between two flattened liveScoring snapshots."""
+    delta: State = {}
+    franchises = _changes(old["franchises"], new["franchises"])
+    if franchises:
+        delta["franchises"] = franchises
+    players = {}
+    for franchise_id, roster in new["players"].items():
+        changes = _changes(old["players"].get(franchise_id, {}), roster)
+        if changes:
+            players[franchise_id] = changes
+    if players:
+        delta["players"] = players
+    return delta
+
+
+class LiveScoringFeed:
+    """A single upstream poller for one week of live scoring, shared by every viewer.
+
+    The first viewer starts the poller and the last one to leave stops it, so the load
+    on MyFantasyLeague is one liveScoring call per interval no matter how many viewers
+    are connected. Viewers get a full snapshot when they join and only the changes
+    after that.
+    """
+
+    def __init__(self, week: int | None, details: bool) -> None:
+        self.week = week
+        self.details = details
+        self.state: State | None = None
+        self.subscribers: set[asyncio.Queue[dict[str, Any]]] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    def snapshot(self) -> dict[str, Any]:
+        """Get the full current state as an event."""
+        return {"type": "snapshot", "week": self.week, **(self.state or {})}
+
+    def subscribe(self) -> asyncio.Queue[dict[str, Any]]:
+        """Add a viewer, starting the poller if it is not running."""
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(LIVE_QUEUE_SIZE)
+        if self.state is not None:
+            queue.put_nowait(self.snapshot())
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+        return queue
+
+    async def unsubscribe(self, queue: asyncio.Queue[dict[str, Any]]) -> None:
+        """Remove a viewer, stopping the poller once nobody is left."""
+        self.subscribers.discard(queue)
+        if not self.subscribers:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """Stop polling."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def publish(self, event: dict[str, Any]) -> None:
+        """Send an event to every viewer."""
+        for queue in self.subscribers:
+            if not queue.full():
+                queue.put_nowait(event)
+                continue
+            # A viewer this far behind gets the current state instead of the backlog
+            # of changes it missed.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(self.snapshot())
+
+    def update(self, document: dict[str, Any]) -> None:
+        """Take in a new liveScoring document and publish what changed."""
+        state = flatten(document)
+        if self.state is None:
+            self.state = state
+            self.publish(self.snapshot())
+            return
+        delta = diff(self.state, state)
+        self.state = state
+        if delta:
+            self.publish({"type": "delta", "week": self.week, **delta})
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                document = await request_api_with_league(
+                    "liveScoring",
+                    W=self.week,
+                    DETAILS=int(self.details),
+                )
+                self.update(document)
+            except Exception:
+                logger.exception("Polling live scoring for week %s failed", self.week)
+            await asyncio.sleep(LIVE_POLL_INTERVAL)
+
+
+class LiveScoringHub:
+    """The live scoring feeds, one per (week, details)."""
+
+    def __init__(self) -> None:
+        self.feeds: dict[tuple[int | None, bool], LiveScoringFeed] = {}
+
+    @asynccontextmanager
+    async def subscription(
+        self,
+        week: int | None,
+        details: bool,
+    ) -> AsyncIterator[asyncio.Queue[dict[str, Any]]]:
+        """Follow live scoring for a week for as long as the context is open."""
+        feed = self.feeds.get((week, details))
+        if feed is None:
+            feed = self.feeds[week, details] = LiveScoringFeed(week, details)
+        queue = feed.subscribe()
+        try:
+            yield queue
+        finally:
+            await feed.unsubscribe(queue)
+            if not feed.subscribers:
+                self.feeds.pop((week, details), None)
+
+    async def stop(self) -> None:
+        """Stop every feed."""
+        feeds = list(self.feeds.values())
+        self.feeds.clear()
+        for feed in feeds:
+            await feed.stop()
+
+    def stats(self) -> dict[str, Any]:
+        """Get the number of viewers of each feed."""
+        return {
+            f"{week}:{int(details)}": len(feed.subscribers)
+            for (week, details), feed in self.feeds.items()
+        }
+
+
+live_scoring_hub = LiveScoringHub()
@@ -1,19 +1,88 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
 
+from fastapi import FastAPI, Request
+
+from src.archive import ARCHIVE_ENABLED, season_archive
+from src.cache import CACHE_STALE_TTL, close_cache, get_cache
+from src.cassette import CassetteMode
+from src.client import close_client, open_client
+from src.invalidation import extend_ttls
+from src.live import live_scoring_hub
+from src.middleware import conditional_requests, instrument_requests
+from src.players import PLAYERS_SYNC_ENABLED, player_store
+from src.playoff_odds import close_pool, open_pool
+from src.profiling import PROFILER_ENABLED, profiler
+from src.refresh import REFRESH_ENABLED, scheduler
+from src.responses import JSONResponse
+from src.routers.admin import admin_router
+from src.routers.batch import batch_router
 from src.routers.common_info import common_info_router
 from src.routers.communications import communications_router
 from src.routers.draft_and_auction import draft_auction_router
 from src.routers.fantasy_content import fantasy_router
+from src.routers.history import history_router
 from src.routers.league_players import players_router
+from src.routers.metrics import metrics_router
 from src.routers.nfl_content import nfl_router
 from src.routers.other_league_info import other_info_router
 from src.routers.scoring_and_results import scoring_router
 from src.routers.transactions import transactions_router
 from src.routers.user_functions import user_router
+from src.transaction_log import TRANSACTIONS_SYNC_ENABLED, transaction_log
+from src.upstream import UpstreamError
+from src.utils import cassette
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Open shared resources on startup and release them on shutdown."""
+    await open_client()
+    if cassette.mode is CassetteMode.prime:
+        await cassette.prime(get_cache(), CACHE_STALE_TTL)
+    if REFRESH_ENABLED:
+        await scheduler.start()
+    if PLAYERS_SYNC_ENABLED:
+        await player_store.start()
+    if TRANSACTIONS_SYNC_ENABLED:
+        extend_ttls()
+        await transaction_log.start()
+    if ARCHIVE_ENABLED:
+        await season_archive.start()
+    if PROFILER_ENABLED:
+        profiler.start()
+    open_pool()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        await live_scoring_hub.stop()
+        await player_store.stop()
+        await season_archive.stop()
+        await transaction_log.stop()
+        await scheduler.stop()
+        close_pool()
+        await close_client()
+        await close_cache()
+
+
+async def upstream_error(_request: Request, exc: Exception) -> JSONResponse:
+    """Answer with a 502, or a 503 while calls upstream are suspended."""
+    status_code = getattr(exc, "status_code", 502)
+    retry_after = getattr(exc, "retry_after", None)
+    headers = {"Retry-After": str(round(retry_after))} if retry_after else None
+    return JSONResponse({"detail": str(exc)}, status_code=status_code, headers=headers)
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=JSONResponse)
+app.middleware("http")(conditional_requests)
+app.middleware("http")(instrument_requests)
+app.exception_handler(UpstreamError)(upstream_error)
 
 app.include_router(common_info_router)
 app.include_router(transactions_router)
@@ -25,3 +94,7 @@ app.include_router(other_info_router)
 app.include_router(user_router)
 app.include_router(fantasy_router)
 app.include_router(nfl_router)
+app.include_router(history_router)
+app.include_router(batch_router)
+app.include_router(admin_router)
+app.include_router(metrics_router)
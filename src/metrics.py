@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.context import current_context
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from src.context import RequestContext
+
+# Latency buckets in seconds, from a cache hit up to a slow MyFantasyLeague export.
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = tuple(2**power for power in range(8, 25, 2))
+
+UPSTREAM_SECONDS = Histogram(
+    "mfl_upstream_request_seconds",
+    "Time taken by each call to MyFantasyLeague, retries counted separately.",
+    ["type", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_BYTES = Histogram(
+    "mfl_upstream_response_bytes",
+    "Size of the documents returned by MyFantasyLeague.",
+    ["type"],
+    buckets=SIZE_BUCKETS,
+)
+UPSTREAM_RETRIES = Counter(
+    "mfl_upstream_retries",
+    "Calls to MyFantasyLeague that were retried.",
+    ["type"],
+)
+CACHE_LOOKUPS = Counter(
+    "mfl_cache_lookups",
+    "Documents requested, by whether they were fresh in the cache (hit), missing "
+    "(miss), expired (expired) or served expired because upstream failed (stale).",
+    ["type", "result"],
+)
+COALESCED_CALLS = Counter(
+    "mfl_coalesced_calls",
+    "Upstream calls that joined an identical call already in flight.",
+    ["type"],
+)
+DECODE_SECONDS = Histogram(
+    "mfl_json_decode_seconds",
+    "Time spent decoding upstream documents.",
+    ["type"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "mfl_http_request_seconds",
+    "Time taken to handle each request, up to its response being started.",
+    ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_BYTES = Histogram(
+    "mfl_http_response_bytes",
+    "Size of the responses sent, as sent (compressed or not).",
+    ["route"],
+    buckets=SIZE_BUCKETS,
+)
+REQUEST_PHASE_SECONDS = Histogram(
+    "mfl_http_request_phase_seconds",
+    "Time spent in each phase of handling a request.",
+    ["phase"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "mfl_http_requests_in_flight",
+    "Requests being handled.",
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "mfl_upstream_calls_in_flight",
+    "Calls to MyFantasyLeague in flight.",
+)
+
+# Phases of a request, as reported in the Server-Timing header. Whatever is not spent
+# waiting on upstream documents, decoding them or serializing the response is counted
+# as transform.
+PHASES = ("upstream", "decode", "transform", "serialize")
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Add the time spent in the block to a phase of the current request.
+
+    Time recorded for other phases while the block runs (decoding a document while
+    waiting on upstream, say) is not counted twice.
+    """
+    context = current_context()
+    recorded = sum(context.timings.values()) if context is not None else 0.0
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if context is not None:
+            elapsed -= sum(context.timings.values()) - recorded
+            record_phase(phase, max(elapsed, 0.0))
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """Add time to a phase of the current request."""
+    context = current_context()
+    if context is not None:
+        context.timings[phase] = context.timings.get(phase, 0.0) + seconds
+
+
+def phases(context: RequestContext, total: float) -> dict[str, float]:
+    """Split the time taken by a request into its phases, in seconds."""
+    timings = {phase: context.timings.get(phase, 0.0) for phase in PHASES}
+    measured = sum(timings.values())
+    timings["transform"] = max(total - measured, 0.0)
+    return timings
+
+
+def server_timing(timings: dict[str, float], total: float) -> str:
+    """Format phase timings as a Server-Timing header."""
+    entries = [
+        f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in timings.items()
+    ]
+    return ", ".join([*entries, f"total;dur={total * 1000:.2f}"])
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+from fastapi import Response
+
+from src.cache import REVALIDATED_TYPES, ttl_for
+from src.context import current_context, open_context
+from src.metrics import (
+    REQUEST_PHASE_SECONDS,
+    REQUEST_SECONDS,
+    REQUESTS_IN_FLIGHT,
+    RESPONSE_BYTES,
+    phases,
+    server_timing,
+)
+from src.profiling import redact, slow_requests
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from fastapi import Request
+
+    from src.context import RequestContext
+
+# Responses that are never given validators, because they are streams or not data.
+UNCACHEABLE_TYPES = ("text/event-stream", "application/x-ndjson")
+# Set, to the age in seconds of the oldest document used, on responses built from
+# documents that could not be refreshed because MyFantasyLeague was failing.
+STALE_HEADER = "X-Upstream-Stale"
+
+
+def _etag(
+    request: Request,
+    response: Response,
+    context: RequestContext,
+    body: bytes | None,
+) -> str:
+    """Build a strong validator for a response.
+
+    A response built from upstream documents (and versioned local data) is fully
+    determined by the request, the format and content encoding it is sent in and the
+    exact data behind it, so their hashes stand in for hashing the body.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if context.versioned:
+        digest.update(str(request.url.path).encode())
+        digest.update(str(request.url.query).encode())
+        # The format is only picked when the response is sent, from the Accept header.
+        digest.update(request.headers.get("accept", "").encode())
+        digest.update(response.headers.get("content-encoding", "").encode())
+        for document in context.documents:
+            digest.update(document.etag.encode())
+        for version in context.versions:
+            digest.update(version.encode())
+    else:
+        digest.update(body or b"")
+    return f'"{digest.hexdigest()}"'
+
+
+def _cache_control(context: RequestContext) -> str:
+    """Get the Cache-Control header from the freshness of the documents used.
+
+    A response is only fresh for as long as the least fresh document behind it. Data
+    that does not come only from upstream documents, or from documents that can be
+    invalidated early, has to be revalidated every time.
+    """
+    types = {document.request_type for document in context.documents}
+    if not types or context.versions or context.stale or types & REVALIDATED_TYPES:
+        return "private, no-cache"
+    max_age = min(
+        ttl_for(document.request_type) - document.age for document in context.documents
+    )
+    return f"private, max-age={max(int(max_age), 0)}"
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against a validator, using weak comparison."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+async def conditional_requests(
+    request: Request,
+    call_next: Callable[[Request], Awaitable[Response]],
+) -> Response:
+    """Add ETag and Cache-Control headers to responses, and answer with 304s.
+
+    This applies to every GET route without it having to opt in. When the client
+    already holds the current version of a response (`If-None-Match`), it gets an
+    empty 304 instead of the body. Responses served from stale documents are marked
+    with an `X-Upstream-Stale` header, whatever the method.
+    """
+    context = current_context() or open_context()
+    response = await call_next(request)
+    headers = {}
+    if context.stale:
+        age = max(document.age for document in context.stale)
+        headers[STALE_HEADER] = str(int(age))
+        response.headers.update(headers)
+    content_type = response.headers.get("content-type", "")
+    if (
+        request.method != "GET"
+        or response.status_code != HTTPStatus.OK
+        or content_type.startswith(UNCACHEABLE_TYPES)
+    ):
+        return response
+
+    body = None
+    if not context.versioned:
+        body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = _etag(request, response, context, body)
+    headers |= {"ETag": etag, "Cache-Control": _cache_control(context)}
+    if _matches(request.headers.get("if-none-match", ""), etag):
+        # A 304 carries the same Vary as the 200, so caches key it the same way.
+        if "vary" in response.headers:
+            headers["Vary"] = response.headers["vary"]
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    if body is None:
+        return response
+    return Response(
+        content=body,
+        status_code=response.status_code,
+        headers=dict(response.headers),
+    )
+
+
+async def instrument_requests(
+    request: Request,
+    call_next: Callable[[Request], Awaitable[Response]],
+) -> Response:
+    """Record metrics for every request and add a Server-Timing header.
+
+    The header splits the time taken into waiting on upstream documents (`upstream`,
+    cache lookups included), decoding them (`decode`), serializing and compressing the
+    response (`serialize`) and everything else the route did (`transform`).
+    """
+    context = open_context()
+    started = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        context.finished = True
+    total = time.perf_counter() - started
+    timings = phases(context, total)
+    response.headers["Server-Timing"] = server_timing(timings, total)
+
+    route = request.scope.get("route")
+    # Requests that matched no route are counted together, so made-up paths do not
+    # each get their own series.
+    path = route.path if route is not None else "unmatched"
+    REQUEST_SECONDS.labels(path, request.method, response.status_code).observe(total)
+    if "content-length" in response.headers:
+        RESPONSE_BYTES.labels(path).observe(int(response.headers["content-length"]))
+    for phase, seconds in timings.items():
+        REQUEST_PHASE_SECONDS.labels(phase).observe(seconds)
+    if slow_requests.admits(total):
+        slow_requests.record(total, _slow_request(request, response, context, total))
+    return response
+
+
+def _slow_request(
+    request: Request,
+    response: Response,
+    context: RequestContext,
+    total: float,
+) -> dict[str, Any]:
+    """Describe a request for the slow request log, with credentials hidden."""
+    return {
+        "at": time.time(),
+        "method": request.method,
+        "path": request.url.path,
+        "query": redact(dict(request.query_params)),
+        "status": response.status_code,
+        "duration_ms": round(total * 1000, 3),
+        "phases_ms": {
+            phase: round(seconds * 1000, 3)
+            for phase, seconds in phases(context, total).items()
+        },
+        "upstream": [
+            {**export, "params": redact(export["params"])}
+            for export in context.exports
+        ],
+    }
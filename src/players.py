@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import gzip
+import json
+import logging
+import sys
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any
+
+from decouple import config
+
+from src.cache import get_cache
+from src.context import track_version
+from src.streaming import stream_records
+from src.utils import (
+    DATA_DIR,
+    LEAGUE_HOST,
+    LEAGUE_ID,
+    api_params,
+    as_list,
+    fetch_export,
+)
+
+logger = logging.getLogger(__name__)
+
+PLAYERS_SYNC_ENABLED: bool = config(
+    "MFL_PLAYERS_SYNC_ENABLED",
+    default=True,
+    cast=bool,
+)
+PLAYERS_SYNC_INTERVAL: float = config(
+    "MFL_PLAYERS_SYNC_INTERVAL",
+    default=3600.0,
+    cast=float,
+)
+PLAYERS_FILE: Path = config(
+    "MFL_PLAYERS_FILE",
+    default=str(DATA_DIR / "players.json.gz"),
+    cast=Path,
+)
+
+# The fields MyFantasyLeague returns for each player when DETAILS is not requested.
+BASIC_FIELDS = ("id", "name", "position", "team")
+
+# How often a worker that shares its cache with others, and is not the one syncing,
+# checks the saved store for the changes the syncing worker pulled.
+PLAYERS_FOLLOW_INTERVAL = 60.0
+SYNC_LEASE = "players|sync"
+
+# Delta pulls overlap the previous one slightly, so changes made while a sync was in
+# flight are not missed. Seeing a change twice is harmless.
+SYNC_OVERLAP = 60
+
+
+def player_key(player_id: int | str) -> str:
+    """Get the id of a player as MyFantasyLeague formats it (at least four digits)."""
+    return str(player_id).zfill(4)
+
+
+def _name_keys(name: str) -> set[str]:
+    """Get the searchable forms of a "Last, First" player name."""
+    name = name.lower()
+    last, _, first = name.partition(", ")
+    return {name, f"{first} {last}".strip()}
+
+
+def name_matches(name: str, prefix: str) -> bool:
+    """Check whether either form of a "Last, First" name starts with `prefix`."""
+    prefix = prefix.lower()
+    return any(name_key.startswith(prefix) for name_key in _name_keys(name))
+
+
+class PlayerStore:
+    """Local copy of the MyFantasyLeague player database.
+
+    The store is loaded once with every player's details and then kept current by
+    pulling only the players that changed since the last sync. Lookups by id, position,
+    NFL team and name prefix are answered from in-memory indexes, and the store is
+    saved to disk after every change so a restart only needs a delta pull.
+    """
+
+    def __init__(self, path: Path = PLAYERS_FILE) -> None:
+        self.path = path
+        self.version = "1.0"
+        # When the last successful sync started, and when the store was fully loaded.
+        # Changes can only be answered locally from `loaded_at` onwards.
+        self.synced_at = 0
+        self.loaded_at = 0
+        self._players: dict[str, dict[str, str]] = {}
+        self._updated_at: dict[str, int] = {}
+        self._by_position: dict[str, set[str]] = {}
+        self._by_team: dict[str, set[str]] = {}
+        self._names: list[tuple[str, str]] = []
+        self._saved_at = 0
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        """Get the number of players in the store."""
+        return len(self._players)
+
+    @property
+    def loaded(self) -> bool:
+        """Check whether the store holds the full player database."""
+        return self.loaded_at > 0
+
+    def can_serve(self, since: int | None = None) -> bool:
+        """Check whether a players request (for changes since a time) can be served."""
+        return self.loaded and (since is None or since >= self.loaded_at)
+
+    def get(self, player_id: int | str) -> dict[str, str] | None:
+        """Get a player by id."""
+        return self._players.get(player_key(player_id))
+
+    def find(  # noqa: PLR0913 one parameter per filter
+        self,
+        *,
+        ids: list[int | str] | None = None,
+        position: str | None = None,
+        team: str | None = None,
+        name: str | None = None,
+        since: int | None = None,
+    ) -> list[dict[str, str]]:
+        """Find the players matching every filter that is given.
+
+        `name` matches the start of either the "Last, First" or the "First Last" form of
+        a player's name, ignoring case.
+        """
+        candidates: set[str] | None = None
+        if ids is not None:
+            candidates = {player_key(player_id) for player_id in ids}
+        if position is not None:
+            by_position = self._by_position.get(position, set())
+            candidates = self._narrow(candidates, by_position)
+        if team is not None:
+            candidates = self._narrow(candidates, self._by_team.get(team, set()))
+        if name is not None:
+            candidates = self._narrow(candidates, self._match_name(name))
+        if since is not None:
+            changed = {key for key, at in self._updated_at.items() if at >= since}
+            candidates = self._narrow(candidates, changed)
+        if candidates is None:
+            return list(self._players.values())
+        return [
+            self._players[key] for key in sorted(candidates) if key in self._players
+        ]
+
+    def document(
+        self,
+        players: list[dict[str, str]],
+        *,
+        details: bool = False,
+    ) -> dict[str, Any]:
+        """Build a players export document, in the upstream format, from the store."""
+        track_version(f"players:{self.synced_at}")
+        if not details:
+            players = [
+                {field: player[field] for field in BASIC_FIELDS if field in player}
+                for player in players
+            ]
+        return {
+            "players": {"timestamp": str(self.synced_at), "player": players},
+            "version": self.version,
+            "encoding": "utf-8",
+        }
+
+    def merge(self, document: dict[str, Any], synced_at: int) -> int:
+        """Merge the players from a players export document into the store."""
+        self.version = document.get("version", self.version)
+        players = as_list(document.get("players", {}).get("player"))
+        names_changed = False
+        for player in players:
+            names_changed |= self._add(player, synced_at)
+        self._merged(synced_at, names_changed=names_changed)
+        return len(players)
+
+    async def _stream(self, params: dict[str, Any], synced_at: int) -> int:
+        """Merge the players of a players export into the store as they are decoded.
+
+        The full player database with details is the biggest export there is. It is
+        never held whole: every player goes into the store as soon as it arrives.
+        """
+        count, names_changed = 0, False
+        players = stream_records(
+            LEAGUE_HOST,
+            params,
+            ("players", "player"),
+            refresh=True,
+        )
+        async for player in players:
+            names_changed |= self._add(player, synced_at)
+            count += 1
+        self._merged(synced_at, names_changed=names_changed)
+        return count
+
+    def _add(self, player: dict[str, str], synced_at: int) -> bool:
+        """Add or update a player, and tell whether its name might have changed."""
+        key = player["id"]
+        previous = self._players.get(key)
+        if previous is not None:
+            self._unindex(key, previous)
+        # Positions, teams and statuses repeat across thousands of players, so the
+        # strings are interned to share a single copy of each.
+        interned = {field: sys.intern(value) for field, value in player.items()}
+        self._players[key] = interned
+        self._updated_at[key] = synced_at
+        self._by_position.setdefault(interned.get("position", ""), set()).add(key)
+        self._by_team.setdefault(interned.get("team", ""), set()).add(key)
+        return previous is None or previous.get("name") != player.get("name")
+
+    def _merged(self, synced_at: int, *, names_changed: bool) -> None:
+        if names_changed:
+            self._names = sorted(
+                (name_key, key)
+                for key, player in self._players.items()
+                for name_key in _name_keys(player.get("name", ""))
+            )
+        self.synced_at = synced_at
+
+    async def sync(self) -> int:
+        """Pull the full player database, or only the changes since the last sync.
+
+        The full database is streamed into the store (see `src.streaming`), while the
+        changes, which are few, are fetched as any other export.
+        """
+        started = int(time.time())
+        params = api_params("players", L=LEAGUE_ID, DETAILS=1)
+        if self.loaded:
+            params["SINCE"] = self.synced_at - SYNC_OVERLAP
+            document = await fetch_export(LEAGUE_HOST, params, refresh=True)
+            if "error" in document:
+                msg = f"Player sync failed: {document['error']}"
+                raise RuntimeError(msg)
+            changed = self.merge(document, started)
+        else:
+            changed = await self._stream(params, started)
+        if not self.loaded and changed:
+            self.loaded_at = started
+        if changed:
+            await asyncio.to_thread(self.save)
+        return changed
+
+    def save(self) -> None:
+        """Save the store to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": self.version,
+            "synced_at": self.synced_at,
+            "loaded_at": self.loaded_at,
+            "updated_at": self._updated_at,
+            "players": list(self._players.values()),
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as fp:
+            json.dump(payload, fp, separators=(",", ":"))
+        tmp_path.replace(self.path)
+        self._saved_at = self.path.stat().st_mtime_ns
+
+    def reload(self) -> bool:
+        """Load the store from disk if another worker saved it since it was loaded."""
+        if not self.path.exists() or self.path.stat().st_mtime_ns == self._saved_at:
+            return False
+        return self.load()
+
+    def load(self) -> bool:
+        """Load the store from disk, if it was saved before."""
+        if not self.path.exists():
+            return False
+        self._saved_at = self.path.stat().st_mtime_ns
+        with gzip.open(self.path, "rt", encoding="utf-8") as fp:
+            payload = json.load(fp)
+        self.merge(
+            {"version": payload["version"], "players": {"player": payload["players"]}},
+            payload["synced_at"],
+        )
+        self._updated_at.update(payload["updated_at"])
+        self.loaded_at = payload["loaded_at"]
+        return True
+
+    async def start(self) -> None:
+        """Load the store from disk, then keep it in sync in the background."""
+        try:
+            await asyncio.to_thread(self.load)
+        except (OSError, ValueError, KeyError):
+            logger.exception("Could not load the player database from %s", self.path)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop syncing."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        tick = min(PLAYERS_SYNC_INTERVAL, PLAYERS_FOLLOW_INTERVAL)
+        while True:
+            try:
+                # Workers sharing a cache elect one of them to sync, and the others
+                # follow along by loading the store it saves.
+                if await get_cache().lease(SYNC_LEASE, tick * 3):
+                    if time.time() - self.synced_at >= PLAYERS_SYNC_INTERVAL:
+                        await self.sync()
+                else:
+                    await asyncio.to_thread(self.reload)
+            except Exception:
+                logger.exception("Syncing the player database failed")
+            await asyncio.sleep(tick)
+
+    def _unindex(self, key: str, player: dict[str, str]) -> None:
+        self._by_position.get(player.get("position", ""), set()).discard(key)
+        self._by_team.get(player.get("team", ""), set()).discard(key)
+
+    def _match_name(self, prefix: str) -> set[str]:
+        prefix = prefix.lower()
+        matches = set()
+        for name_key, key in self._names[bisect_left(self._names, (prefix, "")) :]:
+            if not name_key.startswith(prefix):
+                break
+            matches.add(key)
+        return matches
+
+    @staticmethod
+    def _narrow(candidates: set[str] | None, matches: set[str]) -> set[str]:
+        return set(matches) if candidates is None else candidates & matches
+
+
+player_store = PlayerStore()
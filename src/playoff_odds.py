@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from decouple import config
+
+from src.derived import (
+    DerivedCache,
+    contents,
+    fetch_documents,
+    league_export,
+    version_key,
+)
+from src.simulation import COUNTS, Season, simulate
+from src.upstream import UpstreamError
+from src.utils import as_list
+
+if TYPE_CHECKING:
+    from src.derived import Export
+
+PLAYOFF_ODDS_WORKERS: int = config(
+    "MFL_PLAYOFF_ODDS_WORKERS",
+    default=os.cpu_count() or 1,
+    cast=int,
+)
+# Runs smaller than this are done in a thread. Starting them in other processes would
+# take longer than running them.
+PLAYOFF_ODDS_POOL_MIN: int = config(
+    "MFL_PLAYOFF_ODDS_POOL_MIN",
+    default=50_000,
+    cast=int,
+)
+# Used when the playoff brackets do not say how many teams make the playoffs.
+PLAYOFF_TEAMS: int = config("MFL_PLAYOFF_TEAMS", default=6, cast=int)
+
+# How many weeks of scores a franchise's projection is worth, next to the scores it
+# actually put up, when estimating what it will score.
+PROJECTION_WEIGHT = 3
+# Weekly scores a franchise needs before its own spread is used, rather than the
+# spread of the whole league.
+MIN_SCORES = 3
+DEFAULT_MEAN = 100.0
+DEFAULT_STD = 20.0
+# Runs kept, by the documents they were run from and their number of simulations.
+RESULTS_SIZE = 16
+
+# The exports a run is made from.
+INPUTS: dict[str, Export] = {
+    "league": league_export("league"),
+    "schedule": league_export("schedule"),
+    "leagueStandings": league_export("leagueStandings"),
+    "weeklyResults": league_export("weeklyResults", W="YTD"),
+    "projectedScores": league_export("projectedScores"),
+    "rosters": league_export("rosters"),
+    "playoffBrackets": league_export("playoffBrackets"),
+}
+
+# There is nothing to simulate without these. The others only sharpen the estimates,
+# and there are no brackets before they are set up.
+REQUIRED = ("league", "schedule", "leagueStandings")
+
+_pool: ProcessPoolExecutor | None = None
+runs: DerivedCache[dict[str, Any]] = DerivedCache(RESULTS_SIZE)
+
+
+def _number(value: Any, default: float = 0.0) -> float:  # noqa: ANN401 any JSON value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _weekly_scores(results: dict[str, Any]) -> dict[str, list[float]]:
+    """Get the scores of every franchise, week after week, from the weekly results."""
+    weeks = as_list(results.get("allWeeklyResults", {}).get("weeklyResults"))
+    if "weeklyResults" in results:
+        weeks.append(results["weeklyResults"])
+    scores: dict[str, list[float]] = {}
+    for week in weeks:
+        franchises = as_list(week.get("franchise")) + [
+            franchise
+            for matchup in as_list(week.get("matchup"))
+            for franchise in as_list(matchup.get("franchise"))
+        ]
+        for franchise in franchises:
+            if franchise.get("score") not in (None, ""):
+                score = _number(franchise["score"])
+                scores.setdefault(franchise["id"], []).append(score)
+    return scores
+
+
+def _projections(
+    projected: dict[str, Any],
+    rosters: dict[str, Any],
+    starters: int,
+) -> dict[str, float]:
+    """Get the projected score of every franchise: that of its best players."""
+    scores = {
+        player["id"]: _number(player.get("score"))
+        for player in as_list(projected.get("projectedScores", {}).get("playerScore"))
+    }
+    if not scores or not starters:
+        return {}
+    projections = {}
+    for franchise in as_list(rosters.get("rosters", {}).get("franchise")):
+        players = as_list(franchise.get("player"))
+        projected = sorted(
+            (scores.get(player["id"], 0.0) for player in players),
+            reverse=True,
+        )
+        projections[franchise["id"]] = sum(projected[:starters])
+    return projections
+
+
+def _games_left(
+    schedule: dict[str, Any],
+    franchises: list[str],
+    last_week: int,
+) -> list[tuple[int, str, str]]:
+    """Get the week and franchises of every regular season game not played yet."""
+    games = []
+    for week in as_list(schedule.get("schedule", {}).get("weeklySchedule")):
+        number = int(_number(week.get("week")))
+        for matchup in as_list(week.get("matchup")):
+            teams = as_list(matchup.get("franchise"))
+            ids = [franchise.get("id") for franchise in teams]
+            if (
+                number <= last_week
+                and len(ids) == 2  # noqa: PLR2004 the two sides of a game
+                and all(franchise in franchises for franchise in ids)
+                and not any("result" in franchise for franchise in teams)
+            ):
+                games.append((number, *ids))
+    return games
+
+
+def _scoring(
+    documents: dict[str, dict[str, Any]],
+    franchises: list[str],
+) -> tuple[list[float], list[float]]:
+    """Estimate the mean and spread of every franchise's weekly score."""
+    league = documents["league"].get("league", {})
+    scores = _weekly_scores(documents["weeklyResults"])
+    every_score = [score for history in scores.values() for score in history]
+    league_mean = statistics.fmean(every_score) if every_score else DEFAULT_MEAN
+    league_std = statistics.pstdev(every_score) if len(every_score) > 1 else DEFAULT_STD
+    projections = _projections(
+        documents["projectedScores"],
+        documents["rosters"],
+        int(_number(league.get("starters", {}).get("count"))),
+    )
+    mean, std = [], []
+    for franchise in franchises:
+        history = scores.get(franchise, [])
+        total, weight = sum(history), len(history)
+        if franchise in projections:
+            total += projections[franchise] * PROJECTION_WEIGHT
+            weight += PROJECTION_WEIGHT
+        mean.append(total / weight if weight else league_mean)
+        enough = len(history) >= MIN_SCORES
+        std.append(statistics.pstdev(history) if enough else league_std)
+    return mean, std
+
+
+def season_from(documents: dict[str, dict[str, Any]]) -> Season:
+    """Build the season to simulate from the exports in `INPUTS`, by TYPE."""
+    league = documents["league"].get("league", {})
+    franchises = [
+        franchise["id"]
+        for franchise in as_list(league.get("franchises", {}).get("franchise"))
+    ]
+    index = {franchise: position for position, franchise in enumerate(franchises)}
+    standings = {
+        franchise["id"]: franchise
+        for franchise in as_list(
+            documents["leagueStandings"].get("leagueStandings", {}).get("franchise"),
+        )
+    }
+    last_week = league.get("lastRegularSeasonWeek") or league.get("endWeek")
+    games = _games_left(documents["schedule"], franchises, int(_number(last_week)))
+    weeks = sorted({week for week, _, _ in games})
+    mean, std = _scoring(documents, franchises)
+    brackets = as_list(
+        documents["playoffBrackets"].get("playoffBrackets", {}).get("playoffBracket"),
+    )
+    teams = brackets[0].get("teamsInvolved") if brackets else None
+    return Season(
+        franchises=franchises,
+        wins=np.array(
+            [
+                _number(standings.get(franchise, {}).get("h2hw"))
+                + _number(standings.get(franchise, {}).get("h2ht")) / 2
+                for franchise in franchises
+            ],
+        ),
+        points=np.array(
+            [
+                _number(standings.get(franchise, {}).get("pf"))
+                for franchise in franchises
+            ],
+        ),
+        mean=np.array(mean),
+        # A franchise that scored the same every week is not certain to again.
+        std=np.maximum(np.array(std), 1.0),
+        home=np.array([index[home] for _, home, _ in games], dtype=int),
+        away=np.array([index[away] for _, _, away in games], dtype=int),
+        week=np.array([weeks.index(week) for week, _, _ in games], dtype=int),
+        weeks=len(weeks),
+        playoff_teams=min(max(int(_number(teams, PLAYOFF_TEAMS)), 1), len(franchises)),
+    )
+
+
+def open_pool() -> None:
+    """Start the worker processes that large runs are spread over."""
+    global _pool  # noqa: PLW0603 module level pool shared by every run
+    if _pool is not None or PLAYOFF_ODDS_WORKERS <= 1:
+        return
+    # Spawned rather than forked, as the app runs threads. Workers only import
+    # `src.simulation`.
+    _pool = ProcessPoolExecutor(
+        PLAYOFF_ODDS_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    # Workers are only started as work is handed out. Hand each of them something
+    # now, so the first large run does not wait on them starting.
+    for _ in range(PLAYOFF_ODDS_WORKERS):
+        _pool.submit(int)
+
+
+def close_pool() -> None:
+    """Stop the worker processes, if any were started."""
+    global _pool  # noqa: PLW0603 module level pool shared by every run
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def _simulate(season: Season, simulations: int, seed: int) -> np.ndarray:
+    """Run the simulations in a thread, or spread them over the worker processes."""
+    pool = _pool
+    if simulations < PLAYOFF_ODDS_POOL_MIN or pool is None:
+        return await asyncio.to_thread(simulate, season, simulations, seed)
+    loop = asyncio.get_running_loop()
+    shares = [
+        simulations // PLAYOFF_ODDS_WORKERS
+        + (worker < simulations % PLAYOFF_ODDS_WORKERS)
+        for worker in range(PLAYOFF_ODDS_WORKERS)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(PLAYOFF_ODDS_WORKERS)
+    counts = await asyncio.gather(
+        *(
+            loop.run_in_executor(pool, simulate, season, share, child)
+            for share, child in zip(shares, seeds, strict=True)
+            if share
+        ),
+    )
+    return sum(counts)
+
+
+def _odds(
+    season: Season,
+    names: dict[str, str],
+    counts: np.ndarray,
+    simulations: int,
+) -> dict[str, Any]:
+    rows = dict(zip(COUNTS, counts / simulations, strict=True))
+    franchises = [
+        {
+            "id": franchise,
+            "name": names.get(franchise),
+            "playoffs": round(float(rows["playoffs"][position]), 4),
+            "bye": round(float(rows["byes"][position]), 4),
+            "title": round(float(rows["titles"][position]), 4),
+            "average_seed": round(float(rows["seeds"][position]), 2),
+            "average_wins": round(float(rows["wins"][position]), 2),
+        }
+        for position, franchise in enumerate(season.franchises)
+    ]
+    franchises.sort(key=lambda franchise: (-franchise["playoffs"], -franchise["title"]))
+    return {
+        "simulations": simulations,
+        "games_left": len(season.home),
+        "playoff_teams": season.playoff_teams,
+        "byes": season.bracket_size - season.playoff_teams,
+        "franchises": franchises,
+    }
+
+
+async def estimate_playoff_odds(simulations: int) -> dict[str, Any]:
+    """Get every franchise's chances of making the playoffs, a bye, and the title.
+
+    The rest of the regular season is simulated from each franchise's weekly scores so
+    far, weighed against the projections of its best players, then the playoffs from
+    the resulting seeding. Teams are seeded by record, then by points scored.
+
+    A run depends only on the documents it is made from, so it is computed once per
+    version of them (and number of simulations), by a single caller at a time.
+    """
+    fetched = await fetch_documents(INPUTS)
+    for request_type in REQUIRED:
+        error = fetched[request_type].data.get("error")
+        if error is not None:
+            msg = f"No {request_type} to simulate from: {error}"
+            raise UpstreamError(msg)
+    key = version_key(fetched.values(), simulations)
+
+    async def run() -> dict[str, Any]:
+        documents = contents(fetched)
+        season = season_from(documents)
+        league = documents["league"].get("league", {})
+        names = {
+            franchise["id"]: franchise.get("name")
+            for franchise in as_list(league.get("franchises", {}).get("franchise"))
+        }
+        # Seeded from the inputs, so a run can be reproduced.
+        seed = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest())
+        counts = await _simulate(season, simulations, seed)
+        return _odds(season, names, counts, simulations)
+
+    return await runs.get(key, run)
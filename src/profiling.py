@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from decouple import config
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+PROFILER_ENABLED: bool = config("MFL_PROFILER_ENABLED", default=False, cast=bool)
+PROFILER_INTERVAL: float = config("MFL_PROFILER_INTERVAL", default=0.005, cast=float)
+# Distinct stacks kept by the profiler. Past this, samples of new stacks are counted
+# as dropped, so a long session cannot grow without bound.
+PROFILER_MAX_STACKS = 20000
+SLOW_REQUESTS: int = config("MFL_SLOW_REQUESTS", default=50, cast=int)
+# How long a slow request is remembered for, so the log shows recent slowness rather
+# than the worst request since startup.
+SLOW_REQUESTS_WINDOW: float = config(
+    "MFL_SLOW_REQUESTS_WINDOW",
+    default=3600.0,
+    cast=float,
+)
+
+# Parameters that hold credentials and are never shown.
+SECRET_PARAMS = frozenset({"apikey"})
+REDACTED = "<redacted>"
+
+
+def redact(params: dict[str, Any]) -> dict[str, Any]:
+    """Hide the credentials in a set of request parameters."""
+    return {
+        key: REDACTED if key.lower() in SECRET_PARAMS else value
+        for key, value in params.items()
+    }
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """A statistical profiler that samples the stack of every thread.
+
+    A background thread wakes up every `interval` seconds and records where each
+    thread is, the event loop thread included, so whatever coroutine is running at
+    that moment shows up in its stack. The samples are kept as collapsed stacks, the
+    input format of flamegraph.pl, speedscope and the like. Nothing is recorded, and
+    nothing runs, unless the profiler is started.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.dropped = 0
+        self.started_at: float | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        """Check whether the profiler is sampling."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float | None = None) -> None:
+        """Start sampling, if not already started."""
+        if self.running:
+            return
+        if interval is not None:
+            self.interval = interval
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="sampling-profiler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling. The samples taken so far are kept."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def clear(self) -> None:
+        """Throw away the samples taken so far."""
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.dropped = 0
+
+    def sample(self) -> None:
+        """Record the current stack of every other thread."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        with self._lock:
+            self._sample(names, own)
+            self.samples += 1
+
+    def _sample(self, names: dict[int | None, str], own: int) -> None:
+        for ident, frame in sys._current_frames().items():  # noqa: SLF001 the only way to get them
+            if ident == own:
+                continue
+            labels = []
+            current: FrameType | None = frame
+            while current is not None:
+                labels.append(_frame_label(current))
+                current = current.f_back
+            labels.append(names.get(ident, str(ident)))
+            stack = ";".join(reversed(labels))
+            if stack in self.stacks or len(self.stacks) < PROFILER_MAX_STACKS:
+                self.stacks[stack] += 1
+            else:
+                self.dropped += 1
+
+    def collapsed(self) -> str:
+        """Get the samples as collapsed stacks, one `frame;frame;frame count` a line."""
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def stats(self) -> dict[str, Any]:
+        """Get the state of the profiler."""
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "started_at": self.started_at,
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "dropped": self.dropped,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+
+class SlowRequestLog:
+    """The slowest requests seen recently, with what they spent their time on."""
+
+    def __init__(
+        self,
+        size: int = SLOW_REQUESTS,
+        window: float = SLOW_REQUESTS_WINDOW,
+    ) -> None:
+        self.size = size
+        self.window = window
+        # A min-heap on duration, so the fastest of the slow requests is replaced first.
+        self._heap: list[tuple[float, int, dict[str, Any]]] = []
+        self._counter = itertools.count()
+
+    def admits(self, duration: float) -> bool:
+        """Check whether a request that took this long would make it into the log."""
+        return len(self._heap) < self.size or duration > self._heap[0][0]
+
+    def record(self, duration: float, entry: dict[str, Any]) -> None:
+        """Consider a finished request for the log."""
+        self._expire()
+        item = (duration, next(self._counter), entry)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+        elif duration > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+
+    def entries(self) -> list[dict[str, Any]]:
+        """Get the logged requests, slowest first."""
+        self._expire()
+        return [entry for _, _, entry in sorted(self._heap, reverse=True)]
+
+    def clear(self) -> None:
+        """Forget every logged request."""
+        self._heap.clear()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.window
+        if any(entry["at"] < cutoff for _, _, entry in self._heap):
+            self._heap = [item for item in self._heap if item[2]["at"] >= cutoff]
+            heapq.heapify(self._heap)
+
+
+profiler = SamplingProfiler()
+slow_requests = SlowRequestLog()
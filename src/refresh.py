@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any
+
+from decouple import Csv, config
+
+from src.cache import HOUR, MINUTE, cache_key, get_cache, ttl_for
+from src.utils import (
+    LEAGUE_HOST,
+    LEAGUE_ID,
+    NFL_HOST,
+    REFRESH_AHEAD,
+    api_params,
+    as_list,
+    fetch_export,
+    normalize_params,
+    warm_keys,
+)
+
+logger = logging.getLogger(__name__)
+
+REFRESH_ENABLED: bool = config("MFL_REFRESH_ENABLED", default=True, cast=bool)
+WARM_EXPORTS: list[str] = config(
+    "MFL_WARM_EXPORTS",
+    default=(
+        "league,rules,rosters,nflSchedule,nflByeWeeks,injuries,"
+        "leagueStandings,calendar"
+    ),
+    cast=Csv(),
+)
+# Multipliers applied to the refresh interval of each export during NFL game windows
+# (or while a league calendar event is running) and in the quiet middle of the week.
+GAME_WINDOW_FACTOR: float = config("MFL_GAME_WINDOW_FACTOR", default=0.25, cast=float)
+IDLE_FACTOR: float = config("MFL_IDLE_FACTOR", default=3.0, cast=float)
+MIN_INTERVAL: float = config("MFL_MIN_REFRESH_INTERVAL", default=30.0, cast=float)
+
+# NFL games are treated as live from a little before kickoff until well after the
+# usual final whistle, and the week as idle when nothing kicks off for a day.
+GAME_LEAD = 15 * MINUTE
+GAME_LENGTH = 4 * HOUR
+IDLE_HORIZON = 24 * HOUR
+
+# How much longer than its refresh interval the worker refreshing an export holds on to
+# it, so that it renews the lease before another worker can take over.
+LEASE_MARGIN = 1.5
+
+# Exports that change along with the games being played, and so are refreshed more
+# often during game windows. Everything else keeps its regular cadence then.
+GAME_SENSITIVE = frozenset({"rosters", "injuries", "leagueStandings", "nflSchedule"})
+
+# Exports served from the NFL-wide host rather than from the league host.
+NFL_EXPORTS = frozenset({"nflSchedule", "nflByeWeeks", "injuries"})
+
+# Parameters the routers send by default for an export, so the warmed documents land
+# under the same cache keys that the routes read from.
+DEFAULT_PARAMS: dict[str, dict[str, Any]] = {
+    "leagueStandings": {"COLUMN_NAMES": 0, "ALL": 0, "WEB": 0},
+}
+
+
+class Phase(str, Enum):
+    """How busy the league currently is."""
+
+    game = "game"
+    normal = "normal"
+    idle = "idle"
+
+
+@dataclass
+class WarmExport:
+    """An export kept warm by the refresher."""
+
+    request_type: str
+    host: str
+    params: dict[str, Any]
+    key: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        """Normalize the parameters and compute the cache key once."""
+        self.params = normalize_params(self.params)
+        self.key = cache_key(self.host, self.params)
+
+    @classmethod
+    def for_type(cls, request_type: str) -> WarmExport:
+        """Build the default request for an export TYPE."""
+        extra = DEFAULT_PARAMS.get(request_type, {})
+        if request_type in NFL_EXPORTS:
+            params = {"JSON": 1, "TYPE": request_type, **extra}
+            return cls(request_type, NFL_HOST, params)
+        params = api_params(request_type, L=LEAGUE_ID, **extra)
+        return cls(request_type, LEAGUE_HOST, params)
+
+
+def _windows(
+    schedule: dict[str, Any],
+    calendar: dict[str, Any],
+) -> list[tuple[int, int]]:
+    """Get the (start, end) timestamps of game windows and calendar events."""
+    windows = []
+    for matchup in as_list(schedule.get("nflSchedule", {}).get("matchup")):
+        kickoff = int(matchup.get("kickoff") or 0)
+        if kickoff:
+            windows.append((kickoff - GAME_LEAD, kickoff + GAME_LENGTH))
+    for event in as_list(calendar.get("calendar", {}).get("event")):
+        start = int(event.get("start_time") or 0)
+        end = int(event.get("end_time") or start)
+        if start:
+            windows.append((start - GAME_LEAD, end + GAME_LEAD))
+    return windows
+
+
+def current_phase(
+    schedule: dict[str, Any],
+    calendar: dict[str, Any],
+    now: float | None = None,
+) -> Phase:
+    """Work out the league phase from the NFL schedule and the league calendar."""
+    now = time.time() if now is None else now
+    windows = _windows(schedule, calendar)
+    if not windows:
+        return Phase.normal
+    if any(start <= now <= end for start, end in windows):
+        return Phase.game
+    if not any(now < start <= now + IDLE_HORIZON for start, _ in windows):
+        return Phase.idle
+    return Phase.normal
+
+
+def refresh_interval(request_type: str, phase: Phase) -> float:
+    """Get how long to wait between refreshes of an export in the given phase.
+
+    By default an export is refreshed a little before its TTL runs out, so readers
+    never see it go stale.
+    """
+    interval = ttl_for(request_type) * REFRESH_AHEAD
+    if phase is Phase.game and request_type in GAME_SENSITIVE:
+        interval *= GAME_WINDOW_FACTOR
+    elif phase is Phase.idle:
+        interval *= IDLE_FACTOR
+    return max(interval, MIN_INTERVAL)
+
+
+class RefreshScheduler:
+    """Keep a set of exports warm in the cache, each on its own cadence."""
+
+    def __init__(self, request_types: list[str] = WARM_EXPORTS) -> None:
+        self.exports = {
+            request_type: WarmExport.for_type(request_type)
+            for request_type in request_types
+            if ttl_for(request_type) > 0
+        }
+        self.phase = Phase.normal
+        self.last_refresh: dict[str, float] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def start(self) -> None:
+        """Start refreshing every export in the background."""
+        for export in self.exports.values():
+            warm_keys.add(export.key)
+            self._tasks.append(asyncio.create_task(self._run(export)))
+
+    async def stop(self) -> None:
+        """Stop refreshing."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks.clear()
+        for export in self.exports.values():
+            warm_keys.discard(export.key)
+
+    async def update_phase(self) -> Phase:
+        """Recompute the league phase from the cached schedule and calendar."""
+        documents = {}
+        for request_type in ("nflSchedule", "calendar"):
+            export = self.exports.get(request_type) or WarmExport.for_type(request_type)
+            document = await get_cache().get(export.key)
+            documents[request_type] = document.data if document else {}
+        self.phase = current_phase(documents["nflSchedule"], documents["calendar"])
+        return self.phase
+
+    async def refresh(self, key: str) -> bool:
+        """Refresh a warm export right away, by cache key. Other keys are left alone."""
+        export = next(
+            (export for export in self.exports.values() if export.key == key),
+            None,
+        )
+        if export is None or key not in warm_keys:
+            return False
+        await fetch_export(export.host, export.params, refresh=True)
+        self.last_refresh[export.request_type] = time.time()
+        return True
+
+    async def _run(self, export: WarmExport) -> None:
+        while True:
+            interval = refresh_interval(export.request_type, self.phase)
+            try:
+                # Workers sharing a cache elect one of them to refresh each export, for
+                # as long as it keeps renewing its lease. The others read its results.
+                lease = f"refresh|{export.key}"
+                if await get_cache().lease(lease, interval * LEASE_MARGIN):
+                    await fetch_export(export.host, export.params, refresh=True)
+                    self.last_refresh[export.request_type] = time.time()
+                await self.update_phase()
+            except Exception:
+                logger.exception("Refreshing %s failed", export.request_type)
+            await asyncio.sleep(refresh_interval(export.request_type, self.phase))
+
+    def stats(self) -> dict[str, Any]:
+        """Get the current phase and when each export was last refreshed."""
+        return {
+            "phase": self.phase,
+            "exports": {
+                request_type: {
+                    "last_refresh": self.last_refresh.get(request_type),
+                    "interval": refresh_interval(request_type, self.phase),
+                }
+                for request_type in self.exports
+            },
+        }
+
+
+scheduler = RefreshScheduler()
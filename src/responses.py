@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import gzip
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any
+
+import orjson
+from decouple import Csv, config
+from fastapi import Response
+from starlette.datastructures import Headers
+
+from src.formats import available_formats, serialize, serialize_document
+from src.metrics import timed
+
+if TYPE_CHECKING:
+    from starlette.types import Receive, Scope, Send
+
+    from src.cache import Document
+
+# Bodies smaller than this are sent as they are; compressing them saves next to nothing.
+MIN_COMPRESS_SIZE: int = config("MFL_MIN_COMPRESS_SIZE", default=1024, cast=int)
+# Encodings computed once per upstream document and kept next to it in the cache, in
+# order of preference.
+PRECOMPRESS: list[str] = config("MFL_PRECOMPRESS", default="br,gzip", cast=Csv())
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _brotli_compress(body: bytes) -> bytes:
+    import brotli
+
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def _gzip_compress(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+COMPRESSORS = {"gzip": _gzip_compress}
+if importlib.util.find_spec("brotli") is not None:
+    COMPRESSORS["br"] = _brotli_compress
+
+ENCODINGS = [encoding for encoding in PRECOMPRESS if encoding in COMPRESSORS]
+
+
+def precompress(document: Document) -> None:
+    """Compute the compressed variants of a document before it is cached."""
+    if document.size < MIN_COMPRESS_SIZE:
+        return
+    for encoding in ENCODINGS:
+        document.variants[encoding] = COMPRESSORS[encoding](document.body)
+
+
+def _encodings(body: bytes) -> list[str]:
+    return ENCODINGS if len(body) >= MIN_COMPRESS_SIZE else []
+
+
+def _quality(params: list[str]) -> float:
+    for param in params:
+        name, _, value = param.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def negotiate(accept_encoding: str, available: list[str]) -> str | None:
+    """Pick the preferred available encoding that the client accepts."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        if _quality(params) > 0:
+            accepted.add(coding.strip().lower())
+    for encoding in available:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def negotiate_format(accept: str, available: list[str]) -> str | None:
+    """Pick the available format the client prefers to JSON, if there is one.
+
+    JSON, or anything matching `*/*`, wins ties, so clients that do not ask for
+    another format by name keep getting JSON.
+    """
+    best, best_quality = None, 0.0
+    for item in accept.split(","):
+        media_type, *params = item.split(";")
+        media_type = media_type.strip().lower()
+        quality = _quality(params)
+        if media_type in ("application/json", "application/*", "*/*"):
+            if quality >= best_quality:
+                best, best_quality = None, quality
+        elif media_type in available and quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+class EncodedResponse(Response, ABC):
+    """A response compressed to suit the client's Accept-Encoding when sent.
+
+    JSON responses can also be sent in the formats of `src.formats`, when the client's
+    Accept header prefers one of them. Subclasses say which formats their content can
+    be converted to, and how.
+    """
+
+    media_type = "application/json"
+    # The export TYPE the content is in the format of, if any.
+    request_type: str | None = None
+
+    @property
+    def encodings(self) -> list[str]:
+        """Get the encodings this response can be sent with, in order of preference."""
+        return _encodings(self.body)
+
+    @property
+    @abstractmethod
+    def formats(self) -> list[str]:
+        """Get the formats, other than JSON, this response can be sent in."""
+
+    def encode(self, encoding: str) -> bytes:
+        """Get the body compressed with an encoding."""
+        return COMPRESSORS[encoding](self.body)
+
+    @abstractmethod
+    def convert(self, media_type: str) -> bytes:
+        """Get the body in another format."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Send the response, converted and compressed to suit the client."""
+        self.headers["vary"] = "Accept, Accept-Encoding"
+        headers = Headers(scope=scope)
+        media_type = negotiate_format(headers.get("accept", ""), self.formats)
+        encodings = self.encodings
+        if media_type is not None:
+            with timed("serialize"):
+                self.body = self.convert(media_type)
+            self.headers["content-type"] = media_type
+            # Anything kept precompressed is of the JSON body, not of this one.
+            encodings = _encodings(self.body)
+        encoding = negotiate(headers.get("accept-encoding", ""), encodings)
+        if encoding is not None:
+            with timed("serialize"):
+                self.body = (
+                    COMPRESSORS[encoding](self.body)
+                    if media_type is not None
+                    else self.encode(encoding)
+                )
+            self.headers["content-encoding"] = encoding
+        self.headers["content-length"] = str(len(self.body))
+        await super().__call__(scope, receive, send)
+
+
+class JSONResponse(EncodedResponse):
+    """A JSON response serialized with orjson.
+
+    Content in the format of an export should say which one (`request_type`), for it
+    to be sent as a table where the export can be.
+    """
+
+    def __init__(
+        self,
+        content: Any,  # noqa: ANN401 any JSON content
+        *args: Any,  # noqa: ANN401 the arguments of `Response`
+        request_type: str | None = None,
+        **kwargs: Any,  # noqa: ANN401 the arguments of `Response`
+    ) -> None:
+        self.content = content
+        self.request_type = request_type
+        super().__init__(content, *args, **kwargs)
+
+    @property
+    def formats(self) -> list[str]:
+        """Get the formats, other than JSON, the content can be sent in."""
+        return available_formats(self.request_type)
+
+    def convert(self, media_type: str) -> bytes:
+        """Get the content in another format."""
+        return serialize(self.content, self.request_type, media_type)
+
+    def render(self, content: Any) -> bytes:  # noqa: ANN401 any JSON content
+        """Serialize the content."""
+        with timed("serialize"):
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class DocumentResponse(EncodedResponse):
+    """An upstream document passed through to the client byte for byte.
+
+    The document is never decoded or re-encoded, and the compressed variants kept in
+    the cache alongside it are sent as they are.
+    """
+
+    def __init__(self, document: Document, status_code: int = 200) -> None:
+        self.document = document
+        self.request_type = document.request_type
+        super().__init__(content=document.body, status_code=status_code)
+
+    @property
+    def encodings(self) -> list[str]:
+        """Get the encodings this document was precompressed with."""
+        return list(self.document.variants)
+
+    @property
+    def formats(self) -> list[str]:
+        """Get the formats, other than JSON, the document can be sent in."""
+        return available_formats(self.request_type)
+
+    def encode(self, encoding: str) -> bytes:
+        """Get the precompressed variant of the document."""
+        return self.document.variants[encoding]
+
+    def convert(self, media_type: str) -> bytes:
+        """Get the document in another format, converted once per version of it."""
+        return serialize_document(self.document, media_type)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from src.context import track_version
+from src.derived import (
+    DerivedCache,
+    fetch_documents,
+    league_export,
+    nfl_export,
+    version_key,
+)
+from src.players import player_store
+from src.upstream import UpstreamError
+from src.utils import as_list
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from src.cache import Document
+
+# Lookup tables kept, by the document they were built from, and sets of enriched
+# rosters kept, by the documents they were built from.
+TABLES_SIZE = 32
+ROSTERS_SIZE = 16
+# The salary id MyFantasyLeague gives the league's default contract values under.
+DEFAULT_SALARY = "0000"
+SALARY_FIELDS = ("salary", "contractYear", "contractStatus", "contractInfo")
+# Lineup statuses of players who start, and of those who do not. Other statuses (R when
+# no lineup was submitted or it cannot be seen, IR, TS) say neither.
+STARTER, NON_STARTER = "S", "NS"
+
+tables: DerivedCache[dict[Any, Any]] = DerivedCache(TABLES_SIZE)
+enriched: DerivedCache[dict[str, Any]] = DerivedCache(ROSTERS_SIZE)
+
+
+def _injuries(content: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    return {
+        injury["id"]: {"status": injury.get("status"), "details": injury.get("details")}
+        for injury in as_list(content.get("injuries", {}).get("injury"))
+    }
+
+
+def _bye_weeks(content: dict[str, Any]) -> dict[str, int]:
+    return {
+        team["id"]: int(team["bye_week"])
+        for team in as_list(content.get("nflByeWeeks", {}).get("team"))
+        if str(team.get("bye_week") or "").isdigit()
+    }
+
+
+def _salaries(content: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    units = as_list(content.get("salaries", {}).get("leagueUnit"))
+    return {
+        player["id"]: {
+            field: player[field] for field in SALARY_FIELDS if player.get(field)
+        }
+        for unit in units
+        for player in as_list(unit.get("player"))
+    }
+
+
+def _lineup_statuses(content: dict[str, Any]) -> dict[tuple[str, str], str]:
+    statuses = as_list(content.get("playerRosterStatuses", {}).get("playerStatus"))
+    return {
+        (franchise["franchise_id"], player["id"]): franchise.get("status")
+        for player in statuses
+        for franchise in as_list(player.get("roster_franchise"))
+    }
+
+
+def _players(content: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    players = content.get("players", {})
+    return {details["id"]: details for details in as_list(players.get("player"))}
+
+
+# How each lookup table is built from the content of its document.
+BUILDERS: dict[str, Callable[[dict[str, Any]], dict[Any, Any]]] = {
+    "injuries": _injuries,
+    "nflByeWeeks": _bye_weeks,
+    "salaries": _salaries,
+    "playerRosterStatus": _lineup_statuses,
+    "players": _players,
+}
+
+
+async def lookup_table(name: str, document: Document) -> dict[Any, Any]:
+    """Get the lookup table of a document, built once per version of it.
+
+    Tables are shared by every set of rosters built from the same version of the
+    document, whatever else they were built from. MyFantasyLeague's errors give an
+    empty table.
+    """
+
+    async def build() -> dict[Any, Any]:
+        return {} if "error" in document.data else BUILDERS[name](document.data)
+
+    return await tables.get(f"{name}|{document.etag}", build)
+
+
+def enrich_rosters(
+    rosters: dict[str, Any],
+    lookups: dict[str, dict[Any, Any]],
+    player: Callable[[str], dict[str, Any] | None],
+) -> dict[str, Any]:
+    """Build the roster rows of every franchise in a rosters export.
+
+    Every rostered player is looked up once in each table, by id or by NFL team.
+    Salaries and contracts are taken from the salaries export, then from the rosters
+    export, then from the league's defaults.
+    """
+    salaries = lookups["salaries"]
+    defaults = salaries.get(DEFAULT_SALARY, {})
+    franchises = []
+    for franchise in as_list(rosters.get("rosters", {}).get("franchise")):
+        rows = []
+        for rostered in as_list(franchise.get("player")):
+            player_id = rostered["id"]
+            details = player(player_id) or {}
+            team = details.get("team")
+            contract = defaults | {
+                field: rostered[field] for field in SALARY_FIELDS if rostered.get(field)
+            }
+            contract |= salaries.get(player_id, {})
+            lineup = lookups["playerRosterStatus"].get((franchise["id"], player_id))
+            rows.append(
+                {
+                    "id": player_id,
+                    "name": details.get("name"),
+                    "position": details.get("position"),
+                    "team": team,
+                    "status": rostered.get("status"),
+                    "injury": lookups["injuries"].get(player_id),
+                    "bye_week": lookups["nflByeWeeks"].get(team),
+                    **{field: contract.get(field) for field in SALARY_FIELDS},
+                    "starter": (
+                        lineup == STARTER if lineup in (STARTER, NON_STARTER) else None
+                    ),
+                },
+            )
+        franchises.append({"id": franchise["id"], "player": rows})
+    return {"franchises": franchises}
+
+
+async def enriched_rosters(
+    franchise_id: int | str | None = None,
+    week: int | None = None,
+) -> dict[str, Any]:
+    """Get the rosters of the league, with everything known about each player.
+
+    Rosters are joined with the players' details, the injury report, the NFL bye weeks,
+    the salaries and contracts, and whether each player starts. With `franchise_id`,
+    only that franchise's roster is fetched and built.
+    """
+    franchise = str(franchise_id).zfill(4) if franchise_id is not None else None
+    exports = {
+        "rosters": league_export("rosters", W=week, FRANCHISE=franchise),
+        "injuries": nfl_export("injuries"),
+        "nflByeWeeks": nfl_export("nflByeWeeks"),
+        "salaries": league_export("salaries"),
+    }
+    if player_store.loaded:
+        track_version(f"players:{player_store.synced_at}")
+        versions = [player_store.synced_at]
+    else:
+        exports["players"] = league_export("players")
+        versions = []
+    fetched = await fetch_documents(exports)
+    error = fetched["rosters"].data.get("error")
+    if error is not None:
+        msg = f"No rosters to enrich: {error}"
+        raise UpstreamError(msg)
+    rostered = sorted(
+        player["id"]
+        for team in as_list(fetched["rosters"].data.get("rosters", {}).get("franchise"))
+        for player in as_list(team.get("player"))
+    )
+    if rostered:
+        # Lineups are asked about the rostered players only.
+        fetched |= await fetch_documents(
+            {
+                "playerRosterStatus": league_export(
+                    "playerRosterStatus",
+                    P=",".join(rostered),
+                    W=week,
+                    F=franchise,
+                ),
+            },
+        )
+
+    async def build() -> dict[str, Any]:
+        lookups = {
+            name: await lookup_table(name, document)
+            for name, document in fetched.items()
+            if name in BUILDERS
+        }
+        lookups.setdefault("playerRosterStatus", {})
+        player = lookups["players"].get if "players" in lookups else player_store.get
+        return enrich_rosters(fetched["rosters"].data, lookups, player)
+
+    return await enriched.get(version_key(fetched.values(), *versions), build)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import secrets
+from http import HTTPStatus
+from typing import Annotated, Any
+
+from decouple import config
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from src.archive import season_archive
+from src.live import live_scoring_hub
+from src.profiling import profiler, slow_requests
+from src.refresh import scheduler
+from src.upstream import upstream as upstream_hosts
+from src.utils import cassette, upstream_calls
+
+# Bearer token the admin routes ask for. They are all refused until one is set.
+ADMIN_TOKEN: str = config("MFL_ADMIN_TOKEN", default="")
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def require_admin(
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(_bearer)],
+) -> None:
+    """Only let requests carrying the admin token (`Authorization: Bearer ...`) in."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN,
+            detail="The admin routes are disabled, set MFL_ADMIN_TOKEN to enable them",
+        )
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(),
+        ADMIN_TOKEN.encode(),
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+admin_router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+
+
+@admin_router.get("/upstream")
+async def upstream() -> dict[str, Any]:
+    """Get counters for the calls made to MyFantasyLeague.
+
+    `deduplicated` counts the calls that were coalesced into an identical call that
+    was already in flight, instead of going upstream themselves. The rate limiters
+    (per host and API key, shown by a digest of the key) and circuit breakers (per
+    host) show how close each host is to being throttled or cut off. `cassette` shows
+    whether responses are being recorded or replayed (see `src.cassette`).
+    """
+    return {
+        "coalescing": upstream_calls.stats(),
+        **upstream_hosts.stats(),
+        "live_scoring_viewers": live_scoring_hub.stats(),
+        "cassette": cassette.stats(),
+    }
+
+
+@admin_router.get("/refresh")
+async def refresh() -> dict[str, Any]:
+    """Get the league phase and the state of each export kept warm in the background."""
+    return scheduler.stats()
+
+
+@admin_router.get("/archive")
+async def archive() -> dict[str, Any]:
+    """Get the seasons kept in the history archive and when it was last updated."""
+    return season_archive.stats()
+
+
+@admin_router.get("/profiler")
+async def profiler_stats() -> dict[str, Any]:
+    """Get the state of the sampling profiler."""
+    return profiler.stats()
+
+
+@admin_router.post("/profiler/start")
+async def start_profiler(
+    interval: Annotated[float | None, Query(gt=0, le=1)] = None,
+    *,
+    clear: bool = False,
+) -> dict[str, Any]:
+    """Start sampling the stack of every thread every `interval` seconds.
+
+    The samples taken by an earlier session are kept unless `clear` is set.
+    """
+    if clear:
+        profiler.clear()
+    profiler.start(interval)
+    return profiler.stats()
+
+
+@admin_router.post("/profiler/stop")
+async def stop_profiler() -> dict[str, Any]:
+    """Stop sampling. The samples stay available under `/admin/profiler/stacks`."""
+    await asyncio.to_thread(profiler.stop)
+    return profiler.stats()
+
+
+@admin_router.get("/profiler/stacks", response_class=PlainTextResponse)
+async def profiler_stacks() -> str:
+    """Get the samples as collapsed stacks, ready for flamegraph.pl or speedscope."""
+    return profiler.collapsed()
+
+
+@admin_router.delete("/profiler/stacks")
+async def clear_profiler_stacks() -> dict[str, Any]:
+    """Throw away the samples taken so far."""
+    profiler.clear()
+    return profiler.stats()
+
+
+@admin_router.get("/slow-requests")
+async def slow_request_log() -> list[dict[str, Any]]:
+    """Get the slowest recent requests, slowest first.
+
+    Each one has its time split into phases and the exports it fetched, with how the
+    cache answered each of them. API keys are redacted.
+    """
+    return slow_requests.entries()
+
+
+@admin_router.delete("/slow-requests")
+async def clear_slow_request_log() -> None:
+    """Forget the slow requests logged so far."""
+    slow_requests.clear()
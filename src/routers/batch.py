@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from functools import cache
+from typing import TYPE_CHECKING, Any
+
+import orjson
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, Field, ValidationError, validate_call
+
+from src.responses import DocumentResponse, JSONResponse
+from src.routers.common_info import common_info_router
+from src.routers.communications import communications_router
+from src.routers.draft_and_auction import draft_auction_router
+from src.routers.fantasy_content import fantasy_router
+from src.routers.history import history_router
+from src.routers.league_players import players_router
+from src.routers.nfl_content import nfl_router
+from src.routers.other_league_info import other_info_router
+from src.routers.scoring_and_results import scoring_router
+from src.routers.transactions import transactions_router
+from src.routers.user_functions import user_router
+from src.upstream import UpstreamError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine
+
+batch_router = APIRouter(tags=["Batch"])
+
+MAX_BATCH_SIZE = 50
+
+# Routers whose GET routes can be part of a batch. The admin, metrics and batch routes
+# are not plain data routes, and are left out.
+BATCH_ROUTERS = (
+    common_info_router,
+    transactions_router,
+    scoring_router,
+    draft_auction_router,
+    communications_router,
+    players_router,
+    other_info_router,
+    user_router,
+    fantasy_router,
+    nfl_router,
+    history_router,
+)
+
+# Routes that only ever stream, and so have nothing to embed in a batch response.
+EXCLUDED_PATHS = frozenset({"/live_scoring/stream"})
+
+
+class BatchItem(BaseModel):
+    """A single request within a batch."""
+
+    route: str = Field(
+        description=(
+            "Path of the route without its leading slash, such as `league`, "
+            "`transactions/log` or `history/{season}/standings`."
+        ),
+    )
+    params: dict[str, Any] = Field(
+        default_factory=dict,
+        description="Parameters for the route, as they would be given in the query.",
+    )
+    id: str | None = Field(
+        default=None,
+        description="Key for this item in the response. Defaults to the route name.",
+    )
+
+    @property
+    def key(self) -> str:
+        """Get the key of this item in the batch response."""
+        return self.id or self.route
+
+
+class BatchRequest(BaseModel):
+    """A set of requests to run together."""
+
+    requests: list[BatchItem] = Field(max_length=MAX_BATCH_SIZE)
+
+
+@cache
+def _validated(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # The signature of the route handler is the source of truth for what parameters
+    # a route accepts, so batch items are validated against it directly.
+    return validate_call(endpoint)
+
+
+def _data(result: Any) -> Any:  # noqa: ANN401 any route result
+    # Routes that pass an upstream document through are embedded in the batch response
+    # as they are, without being decoded and encoded again.
+    if isinstance(result, DocumentResponse):
+        return orjson.Fragment(result.document.body)
+    if isinstance(result, StreamingResponse):
+        raise HTTPException(
+            status_code=400,
+            detail="Streamed responses cannot be part of a batch",
+        )
+    if isinstance(result, Response):
+        return orjson.Fragment(result.body)
+    return result
+
+
+@cache
+def batch_routes() -> dict[str, APIRoute]:
+    """Get the routes that can be part of a batch, by path without the leading slash."""
+    return {
+        route.path.lstrip("/"): route
+        for router in BATCH_ROUTERS
+        for route in router.routes
+        if isinstance(route, APIRoute)
+        and "GET" in route.methods
+        and route.path not in EXCLUDED_PATHS
+    }
+
+
+async def _run_item(
+    route: APIRoute | None,
+    item: BatchItem,
+) -> dict[str, Any]:
+    started = time.perf_counter()
+    result: dict[str, Any]
+    if route is None:
+        return {"status": 404, "detail": f"Unknown route {item.route}", "elapsed_ms": 0}
+    try:
+        call: Callable[..., Coroutine[Any, Any, Any]] = _validated(route.endpoint)
+        result = {"status": 200, "data": _data(await call(**item.params))}
+    except ValidationError as exc:
+        errors = exc.errors(include_url=False, include_input=False)
+        result = {"status": 422, "detail": errors}
+    except HTTPException as exc:
+        result = {"status": exc.status_code, "detail": exc.detail}
+    except UpstreamError as exc:
+        result = {"status": exc.status_code, "detail": str(exc)}
+    except Exception as exc:  # noqa: BLE001 one failure must not fail the batch
+        result = {"status": 502, "detail": str(exc) or type(exc).__name__}
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+@batch_router.post("/batch")
+async def batch(batch_request: BatchRequest) -> JSONResponse:
+    """Run several routes concurrently and return all of their results at once.
+
+    Each item names a route by its path (`league`, `rosters`, `transactions/log`,
+    `history/{season}/standings`, ...) and the parameters it would normally take in
+    its query string or path. The response is keyed by each item's `id` (or its
+    route), with the status, the time taken and either the data or the error detail
+    for every item. A failing item does not fail the rest of the batch, and items
+    asking for a streamed response fail with a 400.
+    """
+    keys = [item.key for item in batch_request.requests]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(
+            status_code=422,
+            detail="Every item in a batch needs a unique id",
+        )
+    routes = batch_routes()
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(_run_item(routes.get(item.route), item) for item in batch_request.requests),
+    )
+    return JSONResponse(
+        {
+            "responses": dict(zip(keys, results, strict=True)),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        },
+    )
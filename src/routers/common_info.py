@@ -1,16 +1,18 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Annotated
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 
-from src.utils import request_api_with_league
+from src.responses import DocumentResponse, EncodedResponse
+from src.selection import RecordQuery, selected_response
+from src.utils import api_response_with_league
 
 common_info_router = APIRouter(tags=["Common League Info"])
 
 
 @common_info_router.get("/league")
-async def league() -> dict[str, Any]:
+async def league() -> DocumentResponse:
     """Get general league setup parameters for a given league.
 
     Response includes:
@@ -22,20 +24,27 @@ async def league() -> dict[str, Any]:
     - franchise names
     - division names
     """
-    return request_api_with_league("league")
+    return await api_response_with_league("league")
 
 
 @common_info_router.get("/rules")
-async def rules() -> dict[str, Any]:
+async def rules() -> DocumentResponse:
     """Get league scoring rules for a given league."""
-    return request_api_with_league("rules")
+    return await api_response_with_league("rules")
 
 
 @common_info_router.get("/rosters")
-async def rosters(
+async def rosters(  # noqa: PLR0913 one parameter per filter
     week: int | None = None,
     franchise_id: int | None = None,
-) -> dict[str, Any]:
+    position: str | None = None,
+    team: str | None = None,
+    status: str | None = None,
+    fields: str | None = None,
+    sort: str | None = None,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> EncodedResponse:
     """Get the current rosters.
 
     When `franchise_id` is specified, the response will include the
@@ -45,25 +54,57 @@ async def rosters(
     The week must be less than or equal to the upcoming week.
     Changes to salary and contract info is not tracked so those fields (if used)
     always show the current values.
+
+    The rostered players can be filtered by `position`, NFL `team` and `status`
+    (`ROSTER`, `TAXI_SQUAD`, `INJURED_RESERVE`), cut down to some `fields`, sorted and
+    paged (see `RecordQuery`). They are then listed together, each with the id of its
+    `franchise`.
     """
-    return request_api_with_league("rosters", W=week, FRANCHISE=franchise_id)
+    return await selected_response(
+        "rosters",
+        RecordQuery(
+            fields=fields,
+            position=position,
+            team=team,
+            status=status,
+            sort=sort,
+            limit=limit,
+            offset=offset,
+        ),
+        W=week,
+        FRANCHISE=franchise_id,
+    )
 
 
 @common_info_router.get("/free_agents")
-async def free_agents(position: str | None = None) -> dict[str, Any]:
+async def free_agents(  # noqa: PLR0913 one parameter per filter
+    position: str | None = None,
+    team: str | None = None,
+    fields: str | None = None,
+    sort: str | None = None,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> EncodedResponse:
     """Get fantasy free agents.
 
     When `position` is specified, return only players from that position.
+
+    The free agents can also be filtered by NFL `team`, cut down to some `fields`,
+    sorted and paged (see `RecordQuery`).
     """
     # TODO: turn position into an enum for easier access in frontend.
-    return request_api_with_league("freeAgents", POSITION=position)
+    return await selected_response(
+        "freeAgents",
+        RecordQuery(team=team, fields=fields, sort=sort, limit=limit, offset=offset),
+        POSITION=position,
+    )
 
 
 @common_info_router.get("/schedule")
 async def schedule(
     week: int | None = None,
     franchise_id: int | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the fantasy schedule.
 
     When `franchise_id` is specified, the response will include the
@@ -71,22 +112,22 @@ async def schedule(
 
     When `week` is specified, it returns the schedule for that week.
     """
-    return request_api_with_league("schedule", W=week, FRANCHISE=franchise_id)
+    return await api_response_with_league("schedule", W=week, FRANCHISE=franchise_id)
 
 
 @common_info_router.get("/calendar")
-async def calendar() -> dict[str, Any]:
+async def calendar() -> DocumentResponse:
     """Get summary of league calendar events."""
-    return request_api_with_league("calendar")
+    return await api_response_with_league("calendar")
 
 
 @common_info_router.get("/playoff_brackets")
-async def playoff_brackets() -> dict[str, Any]:
+async def playoff_brackets() -> DocumentResponse:
     """Get all playoff brackets for a given league."""
-    return request_api_with_league("playoffBrackets")
+    return await api_response_with_league("playoffBrackets")
 
 
 @common_info_router.get("/playoff_bracket")
-async def playoff_bracket(bracket_id: int | None = None) -> dict[str, Any]:
+async def playoff_bracket(bracket_id: int | None = None) -> DocumentResponse:
     """Get the games (with results if available) of the specified playoff bracket."""
-    return request_api_with_league("playoffBracket", BRACKET_ID=bracket_id)
+    return await api_response_with_league("playoffBracket", BRACKET_ID=bracket_id)
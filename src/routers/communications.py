@@ -1,27 +1,26 @@
 from __future__ import annotations
 
-from typing import Any
-
 from fastapi import APIRouter
 
-from src.utils import request_api_with_league
+from src.responses import DocumentResponse
+from src.utils import api_response_with_league
 
 communications_router = APIRouter(tags=["Communications"])
 
 
 @communications_router.get("/message_board")
-async def message_board(count: int = 10) -> dict[str, Any]:
+async def message_board(count: int = 10) -> DocumentResponse:
     """Get summary of recent message board posts."""
-    return request_api_with_league("messageBoard", COUNT=count)
+    return await api_response_with_league("messageBoard", COUNT=count)
 
 
 @communications_router.get("/message_board_thread/{thread_id}")
-async def message_board_thread(thread_id: int) -> dict[str, Any]:
+async def message_board_thread(thread_id: int) -> DocumentResponse:
     """Display posts in a thread from a league message board."""
-    return request_api_with_league("messageBoardThread", THREAD_ID=thread_id)
+    return await api_response_with_league("messageBoardThread", THREAD_ID=thread_id)
 
 
 @communications_router.get("/polls")
-async def polls() -> dict[str, Any]:
+async def polls() -> DocumentResponse:
     """Get all current league polls."""
-    return request_api_with_league("polls")
+    return await api_response_with_league("polls")
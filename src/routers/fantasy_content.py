@@ -1,16 +1,32 @@
 from __future__ import annotations
 
-import datetime
+import dataclasses
+import datetime  # noqa: TCH003 FastAPI reads the annotations at runtime
 from enum import Enum
-from typing import Any, Literal
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 
-from src.utils import request_api_data, request_api_with_league
+from src.lineups import optimal_lineups
+from src.players import player_store
+from src.responses import DocumentResponse, EncodedResponse, JSONResponse
+from src.selection import RecordQuery, select, selected_response
+from src.utils import api_response, api_response_with_league
+from src.waivers import waiver_view
 
 fantasy_router = APIRouter(tags=["Fantasy Content"])
 
 
+class WaiverSort(str, Enum):
+    """Fields free agents can be ranked by."""
+
+    projected = "projected"
+    rank = "rank"
+    adp = "adp"
+    added = "added"
+    owned = "owned"
+
+
 class Period(str, Enum):
     """Valid periods."""
 
@@ -27,30 +43,59 @@ class Period(str, Enum):
 
 
 @fantasy_router.get("/players")
-async def get_players(
+async def get_players(  # noqa: PLR0913 one parameter per filter
     details: bool = False,
-    since: datetime.datetime | None = datetime.datetime.now(  # noqa: B008
-        tz=datetime.UTC,
-    ),
+    since: datetime.datetime | None = None,
     player_id: int | None = None,
-) -> dict[str, Any]:
+    position: str | None = None,
+    team: str | None = None,
+    name: str | None = None,
+    status: str | None = None,
+    fields: str | None = None,
+    sort: str | None = None,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> EncodedResponse:
     """Get all player IDs, names, and positions.
 
     If `since` is specified, retrieve only changes to the player database since that
     time.
+
+    Players are served from the local player database once it has been loaded. The
+    players can be filtered by the start of their `name`, `position`, NFL `team` and
+    `status`, cut down to some `fields`, sorted and paged (see `RecordQuery`).
     """
-    if since:
-        timestamp = int(since.timestamp())
-        return request_api_with_league(
-            "players",
-            DETAILS=int(details),
-            SINCE=timestamp,
-            PLAYERS=player_id,
+    timestamp = int(since.timestamp()) if since else None
+    query = RecordQuery(
+        fields=fields,
+        position=position,
+        team=team,
+        name=name,
+        status=status,
+        sort=sort,
+        limit=limit,
+        offset=offset,
+    )
+    if player_store.can_serve(timestamp):
+        players = player_store.find(
+            ids=[player_id] if player_id is not None else None,
+            position=position,
+            team=team,
+            name=name,
+            since=timestamp,
         )
-
-    return request_api_with_league(
+        document = player_store.document(players, details=details)
+        # Positions, teams and names were already picked out with the store's indexes.
+        query = dataclasses.replace(query, position=None, team=None, name=None)
+        if query.active:
+            document = select(document, "players", query)
+        return JSONResponse(document, request_type="players")
+
+    return await selected_response(
         "players",
+        query,
         DETAILS=int(details),
+        SINCE=timestamp,
         PLAYERS=player_id,
     )
 
@@ -58,26 +103,32 @@ async def get_players(
 @fantasy_router.get("/player_profile")
 async def get_player_profile(
     player_id: int,
-) -> dict[str, Any]:
-    """Get a player profile summary."""
-    return request_api_data(
+) -> DocumentResponse:
+    """Get a player profile summary.
+
+    Ids that are not in the local player database are rejected without asking
+    MyFantasyLeague, once the database has been loaded.
+    """
+    if player_store.loaded and player_store.get(player_id) is None:
+        raise HTTPException(status_code=404, detail="Player not found")
+    return await api_response(
         "playerProfile",
         P=player_id,
     )
 
 
 @fantasy_router.get("/all_rules")
-async def get_all_rules() -> dict[str, Any]:
+async def get_all_rules() -> DocumentResponse:
     """Get all scoring rules."""
-    return request_api_data("allRules")
+    return await api_response("allRules")
 
 
 @fantasy_router.get("/player_ranks")
 async def get_player_ranks(
     position: str | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get player rankings from experts at FantasySharks.com."""
-    return request_api_data("playerRanks", POS=position)
+    return await api_response("playerRanks", POS=position)
 
 
 @fantasy_router.get("/adp")
@@ -89,9 +140,9 @@ async def get_adp(
     is_mock: bool | None = None,
     cutoff: int | None = None,
     details: bool = False,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get ADP results."""
-    return request_api_data(
+    return await api_response(
         "adp",
         PERIOD=period,
         FCOUNT=fcount,
@@ -108,9 +159,9 @@ async def get_aav(
     period: Period = Period.all,
     is_ppr: bool | None = None,
     is_keeper: str = "NKR",
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get AAV results."""
-    return request_api_data(
+    return await api_response(
         "aav",
         PERIOD=period,
         IS_PPR=int(is_ppr) if is_ppr else None,
@@ -122,44 +173,44 @@ async def get_aav(
 async def get_top_adds(
     count: int | None = None,
     status: Literal["FA"] | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the most added players."""
-    return request_api_data("topAdds", COUNT=count, STATUS=status)
+    return await api_response("topAdds", COUNT=count, STATUS=status)
 
 
 @fantasy_router.get("/top_drops")
 async def get_top_drops(
     count: int | None = None,
     status: Literal["FA"] | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the most dropped players."""
-    return request_api_data("topDrops", COUNT=count, STATUS=status)
+    return await api_response("topDrops", COUNT=count, STATUS=status)
 
 
 @fantasy_router.get("/top_starters")
 async def get_top_starters(
     count: int | None = None,
     status: Literal["FA"] | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the most started players."""
-    return request_api_data("topStarters", COUNT=count, STATUS=status)
+    return await api_response("topStarters", COUNT=count, STATUS=status)
 
 
 @fantasy_router.get("/top_trades")
 async def get_top_trades(
     count: int | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the most traded players."""
-    return request_api_data("topTrades", COUNT=count)
+    return await api_response("topTrades", COUNT=count)
 
 
 @fantasy_router.get("/top_owns")
 async def get_top_owns(
     count: int | None = None,
     status: Literal["FA"] | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the most owned players."""
-    return request_api_data("topOwns", COUNT=count, STATUS=status)
+    return await api_response("topOwns", COUNT=count, STATUS=status)
 
 
 @fantasy_router.get("/who_should_i_start")
@@ -167,11 +218,59 @@ async def who_should_i_start(
     league_id: int | None = None,
     week: int | None = None,
     franchise: int | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get 'Who Should I Start?' data."""
-    return request_api_with_league(
+    return await api_response_with_league(
         "whoShouldIStart",
         L=league_id,
         WEEK=week,
         FRANCHISE=franchise,
     )
+
+
+@fantasy_router.get("/optimal_lineups")
+async def get_optimal_lineups(
+    week: int | None = None,
+    franchise_id: int | None = None,
+) -> dict[str, Any]:
+    """Get the starting lineup with the highest projected score for every franchise.
+
+    Lineups follow the league's starter requirements, flex slots included, and leave
+    out players who are injured (out, IR or suspended) or on a bye. They are for the
+    current week unless `week` is specified. When `franchise_id` is specified, only
+    that franchise's lineup is returned.
+    """
+    result = await optimal_lineups(week)
+    if franchise_id is None:
+        return result
+    key = str(franchise_id).zfill(4)
+    return {
+        **result,
+        "franchises": [
+            franchise for franchise in result["franchises"] if franchise["id"] == key
+        ],
+    }
+
+
+@fantasy_router.get("/waiver_targets")
+async def get_waiver_targets(
+    position: str | None = None,
+    sort: WaiverSort = WaiverSort.projected,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> dict[str, Any]:
+    """Get the league's free agents, ranked.
+
+    Every free agent comes with its projected score, expert rank, ADP and the share of
+    leagues adding and owning it. They are ranked by `sort`: projected score, share of
+    adds and share of owners from highest, rank and ADP from lowest, and players
+    without a value last. They can be filtered by `position`.
+    """
+    await waiver_view.refresh()
+    total, players = waiver_view.targets(
+        position=position,
+        sort=sort.value,
+        limit=limit,
+        offset=offset,
+    )
+    return {"total": total, "players": players}
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+
+from src.archive import season_archive
+
+history_router = APIRouter(prefix="/history", tags=["History"])
+
+
+def _id(value: int | None) -> str | None:
+    """Pad a franchise or player id to four digits, as MyFantasyLeague does."""
+    return None if value is None else str(value).zfill(4)
+
+
+async def _document(season: int, request_type: str, key: str = "") -> dict[str, Any]:
+    document = await season_archive.document(season, request_type, key)
+    if document is None:
+        raise HTTPException(404, f"No {request_type} archived for {season}")
+    return document
+
+
+@history_router.get("/seasons")
+async def seasons() -> list[dict[str, Any]]:
+    """Get the archived seasons, whether each one is complete and its last week."""
+    return await season_archive.archived_seasons()
+
+
+@history_router.get("/{season}/weekly_results")
+async def weekly_results(
+    season: int,
+    week: int | None = None,
+    franchise_id: int | None = None,
+) -> list[dict[str, Any]]:
+    """Get the result of every franchise in every completed week of a season."""
+    return await season_archive.weekly_results(season, week, _id(franchise_id))
+
+
+@history_router.get("/{season}/player_scores")
+async def player_scores(
+    season: int,
+    week: int | None = None,
+    franchise_id: int | None = None,
+) -> list[dict[str, Any]]:
+    """Get the score of every rostered player in every completed week of a season.
+
+    `status` tells whether the player was a starter or not.
+    """
+    return await season_archive.player_scores(season, week, _id(franchise_id))
+
+
+@history_router.get("/{season}/standings")
+async def standings(season: int) -> dict[str, Any]:
+    """Get the final standings of a finished season."""
+    return await _document(season, "leagueStandings")
+
+
+@history_router.get("/{season}/playoff_brackets")
+async def playoff_brackets(season: int) -> dict[str, Any]:
+    """Get the playoff brackets of a finished season."""
+    return await _document(season, "playoffBrackets")
+
+
+@history_router.get("/{season}/playoff_brackets/{bracket_id}")
+async def playoff_bracket(season: int, bracket_id: int) -> dict[str, Any]:
+    """Get the games and results of a playoff bracket of a finished season."""
+    return await _document(season, "playoffBracket", str(bracket_id))
+
+
+@history_router.get("/{season}/draft_results")
+async def draft_results(
+    season: int,
+    franchise_id: int | None = None,
+) -> list[dict[str, Any]]:
+    """Get the draft picks of a season."""
+    return await season_archive.draft_picks(season, _id(franchise_id))
+
+
+@history_router.get("/{season}/auction_results")
+async def auction_results(
+    season: int,
+    franchise_id: int | None = None,
+) -> list[dict[str, Any]]:
+    """Get the auctions won in a season."""
+    return await season_archive.auction_results(season, _id(franchise_id))
+
+
+@history_router.get("/transactions")
+async def transactions(
+    season: int | None = None,
+    franchise_id: int | None = None,
+    player_id: int | None = None,
+    transaction_type: str | None = None,
+) -> list[dict[str, Any]]:
+    """Get the archived transactions across seasons, newest first.
+
+    Each transaction is as MyFantasyLeague reported it, with the season it was made in.
+    """
+    return await season_archive.transactions(
+        season,
+        _id(franchise_id),
+        _id(player_id),
+        transaction_type,
+    )
+
+
+@history_router.get("/franchises/{franchise_id}")
+async def franchise(franchise_id: int) -> list[dict[str, Any]]:
+    """Get a franchise's name, record and points for and against in every season."""
+    return await season_archive.franchise_history(_id(franchise_id))
+
+
+@history_router.get("/players/{player_id}")
+async def player(player_id: int) -> dict[str, Any]:
+    """Get a player's weekly scores, transactions, draft picks and auctions."""
+    return await season_archive.player_history(_id(player_id))
@@ -4,7 +4,9 @@ from typing import Any
 
 from fastapi import APIRouter
 
-from src.utils import request_api_with_league
+from src.responses import DocumentResponse
+from src.rosters import enriched_rosters
+from src.utils import api_response_with_league
 
 players_router = APIRouter(tags=["League Players"])
 
@@ -14,7 +16,7 @@ async def player_roster_status(
     player_id: int | None = None,
     week: int | None = None,
     franchise_id: int | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the player's current roster status.
 
     The franchise(s) the player is on are listed in the subelement. There may more than
@@ -27,7 +29,7 @@ async def player_roster_status(
     'locked' attributes may be set indicating whether a player can't be added or is
     locked.
     """
-    return request_api_with_league(
+    return await api_response_with_league(
         "playerRosterStatus",
         P=player_id,
         W=week,
@@ -35,27 +37,42 @@ async def player_roster_status(
     )
 
 
+@players_router.get("/enriched_rosters")
+async def get_enriched_rosters(
+    franchise_id: int | None = None,
+    week: int | None = None,
+) -> dict[str, Any]:
+    """Get every roster, with what is needed to show it for each player.
+
+    Each rostered player comes with its name, position and NFL team, its injury status,
+    its bye week, its salary and contract, and whether it starts (`null` when the
+    lineup is not known). When `franchise_id` is specified, only that franchise's
+    roster is fetched and built.
+    """
+    return await enriched_rosters(franchise_id, week)
+
+
 @players_router.get("/my_watch_list")
-async def my_watch_list() -> dict[str, Any]:
+async def my_watch_list() -> DocumentResponse:
     """Get My Watch List."""
-    return request_api_with_league("myWatchList")
+    return await api_response_with_league("myWatchList")
 
 
 @players_router.get("/contest_players")
 async def contest_players(
     week: int | None = None,
     franchise_id: int | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get eligible players to be in franchise's starting lineup for Contest Leagues.
 
     While this request can be used by any league it's best suited for leagues with the
     loadRosters setting set to either 'contest' or 'setem'.
     """
-    return request_api_with_league("contestPlayers", W=week, F=franchise_id)
+    return await api_response_with_league("contestPlayers", W=week, F=franchise_id)
 
 
 @players_router.get("/salaries")
-async def salaries() -> dict[str, Any]:
+async def salaries() -> DocumentResponse:
     """Get the current player salaries and contract fields.
 
     Only players with values are returned. If a value is empty it means that the
@@ -63,10 +80,10 @@ async def salaries() -> dict[str, Any]:
 
     The default values are specified under the player id '0000'.
     """
-    return request_api_with_league("salaries")
+    return await api_response_with_league("salaries")
 
 
 @players_router.get("/salary_adjustments")
-async def salary_adjustments() -> dict[str, Any]:
+async def salary_adjustments() -> DocumentResponse:
     """Get all extra salary adjustments for a given league."""
-    return request_api_with_league("salaryAdjustments")
+    return await api_response_with_league("salaryAdjustments")
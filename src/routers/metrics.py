@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+metrics_router = APIRouter(tags=["Admin"])
+
+
+@metrics_router.get("/metrics")
+async def metrics() -> Response:
+    """Get the service metrics in the Prometheus text format."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
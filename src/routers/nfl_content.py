@@ -2,36 +2,30 @@ from __future__ import annotations
 
 from typing import Any, Literal
 
-import requests
 from fastapi import APIRouter
 
-from src.utils import request_api_with_league
+from src.derived import nfl_export
+from src.responses import DocumentResponse
+from src.utils import api_response_with_league, fetch_document
 
 nfl_router = APIRouter(tags=["NFL Content"])
 
 
-def request_nfl_data(
+async def nfl_response(
     request_type: str,
     **kwargs: Any,  # noqa: ANN401 **kwargs can be of any type
-) -> dict[str, Any]:
-    """Make a request to the league api endpoint."""
-    params = {
-        "JSON": 1,
-        "TYPE": request_type,
-    }
-    if kwargs:
-        params.update(kwargs)
-    host = "https://api.myfantasyleague.com/2024/export"
-    resp = requests.get(host, timeout=10, params=params)
-    return resp.json()
+) -> DocumentResponse:
+    """Make a request to the NFL api endpoint and pass the document straight on."""
+    document = await fetch_document(*nfl_export(request_type, **kwargs))
+    return DocumentResponse(document)
 
 
 @nfl_router.get("/injuries")
 async def get_injuries(
     week: int | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get NFL injuries report."""
-    return request_nfl_data(
+    return await nfl_response(
         "injuries",
         W=week,
     )
@@ -40,9 +34,9 @@ async def get_injuries(
 @nfl_router.get("/nfl_schedule")
 async def get_nfl_schedule(
     week: int | Literal["ALL"] | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get NFL schedule for a week or the full season."""
-    return request_nfl_data(
+    return await nfl_response(
         "nflSchedule",
         W=week,
     )
@@ -51,17 +45,17 @@ async def get_nfl_schedule(
 @nfl_router.get("/nfl_bye_weeks")
 async def get_nfl_bye_weeks(
     week: int | None = None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get bye weeks for all NFL teams or for teams with a bye in a specified week."""
-    return request_nfl_data(
+    return await nfl_response(
         "nflByeWeeks",
         W=week,
     )
 
 
 @nfl_router.get("/points_allowed")
-async def get_points_allowed() -> dict[str, Any]:
+async def get_points_allowed() -> DocumentResponse:
     """Get fantasy points allowed by each NFL team, broken out by position."""
-    return request_api_with_league(
+    return await api_response_with_league(
         "pointsAllowed",
     )
@@ -1,10 +1,22 @@
 from __future__ import annotations
 
-from typing import Any, Literal
+import asyncio
+import contextlib
+import json
+from typing import TYPE_CHECKING, Annotated, Any, Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 
-from src.utils import request_api_with_league
+from src.live import LIVE_HEARTBEAT, live_scoring_hub
+from src.playoff_odds import estimate_playoff_odds
+from src.responses import DocumentResponse, EncodedResponse
+from src.selection import RecordQuery, selected_response, stream_selected
+from src.streaming import ndjson
+from src.utils import api_response_with_league
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
 
 scoring_router = APIRouter(tags=["Scoring And Results"])
 
@@ -14,7 +26,7 @@ async def league_standings(
     column_names: bool = False,
     all_fields: bool = False,
     web: bool = False,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the current standings for the league.
 
     When `column_names` is specified, returns a mapping of column keys to column names.
@@ -30,7 +42,7 @@ async def league_standings(
     This is in case the app wants to just replicate the report from the web site.
     This parameter is ignored if ALL is set.
     """
-    return request_api_with_league(
+    return await api_response_with_league(
         "leagueStandings",
         COLUMN_NAMES=int(column_names),
         ALL=int(all_fields),
@@ -42,7 +54,7 @@ async def league_standings(
 async def weekly_results(
     week: int | Literal["YTD"] | None = None,
     missing_as_bye: bool = False,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the weekly results for a league/week.
 
     This includes the scores for all starter and non-starter players for all franchises
@@ -52,18 +64,32 @@ async def weekly_results(
     If `missing_as_bye` is specified, fantasy teams with no scheduled opponents will
     be shown as playing vs a BYE opponent.
     """
-    return request_api_with_league(
+    return await api_response_with_league(
         "weeklyResults",
         W=week,
         MISSING_AS_BYE=int(missing_as_bye),
     )
 
 
+@scoring_router.get("/playoff_odds")
+async def playoff_odds(
+    simulations: Annotated[int, Query(ge=1000, le=1_000_000)] = 20_000,
+) -> dict[str, Any]:
+    """Get every franchise's chances of making the playoffs, a bye, and the title.
+
+    The rest of the season is simulated `simulations` times, from the schedule, the
+    standings, the weekly results so far and the projections of each roster. Teams
+    are seeded by record, then by points scored. Each franchise also gets its average
+    seed and its average number of wins at the end of the regular season.
+    """
+    return await estimate_playoff_odds(simulations)
+
+
 @scoring_router.get("/live_scoring")
 async def live_scoring(
     week: int | None = None,
     details: bool = False,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get live scoring for a given league and week.
 
     Includes:
@@ -72,37 +98,70 @@ async def live_scoring(
     - players who have yet to play
     - players who are currently playing
     """
-    return request_api_with_league("liveScoring", W=week, DETAILS=int(details))
+    return await api_response_with_league("liveScoring", W=week, DETAILS=int(details))
 
 
-@scoring_router.get("/player_scores")
-async def player_scores(
-    week: int | Literal["YTD"] | None = None,
+@scoring_router.get("/player_scores", response_model=None)
+async def player_scores(  # noqa: PLR0913 one parameter per filter
+    week: int | Literal["YTD", "AVG"] | None = None,
     year: int | None = None,
     player: int | None = None,
     positions: str | None = None,
     status: Literal["freeagent"] | None = None,
     rules: bool = False,
     count: int | None = None,
-) -> dict[str, Any]:
+    team: str | None = None,
+    min_score: float | None = None,
+    max_score: float | None = None,
+    fields: str | None = None,
+    sort: str | None = None,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    *,
+    stream: bool = False,
+) -> EncodedResponse | StreamingResponse:
     """Get all player scores for a given week.
 
-    Includes all rostered players and free agents.
+    Includes all rostered players and free agents. `week` can be "YTD" for the season
+    so far or "AVG" for the average per week.
+
+    The scores can also be filtered by NFL `team` and by score, cut down to some
+    `fields`, sorted and paged (see `RecordQuery`).
+
+    With `stream`, the scores are sent as newline-delimited JSON while the export is
+    still being decoded, which keeps memory flat for big exports (a whole season's
+    scores). They come in the export's order, so they cannot be sorted.
     """
-    return request_api_with_league(
-        "playerScores",
-        W=week,
-        YEAR=year,
-        PLAYERS=player,
-        POSITIONS=positions,
-        STATUS=status,
-        RULES=int(rules),
-        COUNT=count,
+    query = RecordQuery(
+        team=team,
+        min_score=min_score,
+        max_score=max_score,
+        fields=fields,
+        sort=sort,
+        limit=limit,
+        offset=offset,
     )
+    params = {
+        "W": week,
+        "YEAR": year,
+        "PLAYERS": player,
+        "POSITIONS": positions,
+        "STATUS": status,
+        "RULES": int(rules),
+        "COUNT": count,
+    }
+    if stream:
+        if sort is not None:
+            raise HTTPException(400, "Streamed scores cannot be sorted")
+        return StreamingResponse(
+            ndjson(stream_selected("playerScores", query, **params)),
+            media_type="application/x-ndjson",
+        )
+    return await selected_response("playerScores", query, **params)
 
 
 @scoring_router.get("/projected_scores")
-async def projected_scores(
+async def projected_scores(  # noqa: PLR0913 one parameter per filter
     week: int | None = None,
     year: int | None = None,
     player: int | None = None,
@@ -110,10 +169,30 @@ async def projected_scores(
     status: Literal["freeagent"] | None = None,
     rules: bool = False,
     count: int | None = None,
-) -> dict[str, Any]:
-    """Get calculation of expected fantasy points, using the league's scoring system."""
-    return request_api_with_league(
+    team: str | None = None,
+    min_score: float | None = None,
+    max_score: float | None = None,
+    fields: str | None = None,
+    sort: str | None = None,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> EncodedResponse:
+    """Get calculation of expected fantasy points, using the league's scoring system.
+
+    The projections can also be filtered by NFL `team` and by score, cut down to some
+    `fields`, sorted and paged (see `RecordQuery`).
+    """
+    return await selected_response(
         "projectedScores",
+        RecordQuery(
+            team=team,
+            min_score=min_score,
+            max_score=max_score,
+            fields=fields,
+            sort=sort,
+            limit=limit,
+            offset=offset,
+        ),
         W=week,
         YEAR=year,
         PLAYERS=player,
@@ -122,3 +201,74 @@ async def projected_scores(
         RULES=int(rules),
         COUNT=count,
     )
+
+
+async def _live_scoring_events(
+    week: int | None,
+    details: bool,
+) -> AsyncIterator[dict[str, Any]]:
+    async with live_scoring_hub.subscription(week, details) as queue:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), LIVE_HEARTBEAT)
+            except TimeoutError:
+                event = {"type": "heartbeat"}
+            yield event
+
+
+async def _server_sent_events(
+    events: AsyncIterator[dict[str, Any]],
+) -> AsyncIterator[str]:
+    async for event in events:
+        if event["type"] == "heartbeat":
+            # Comments keep proxies from closing a quiet stream.
+            yield ": heartbeat\n\n"
+            continue
+        data = json.dumps(event, separators=(",", ":"))
+        yield f"event: {event['type']}\ndata: {data}\n\n"
+
+
+@scoring_router.get("/live_scoring/stream")
+async def live_scoring_stream(
+    week: int | None = None,
+    details: bool = False,
+) -> StreamingResponse:
+    """Stream live scoring for a given league and week as Server-Sent Events.
+
+    A `snapshot` event with every franchise's score, game seconds remaining and
+    players yet to play or currently playing (plus each player's score and game
+    seconds remaining) is sent first. After that, `delta` events only carry the
+    fields that changed, with `null` for anything that went away.
+    """
+    return StreamingResponse(
+        _server_sent_events(_live_scoring_events(week, details)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@scoring_router.websocket("/live_scoring/ws")
+async def live_scoring_websocket(
+    websocket: WebSocket,
+    week: int | None = None,
+    details: bool = False,
+) -> None:
+    """Stream live scoring over a WebSocket, with the same events as the SSE stream."""
+    await websocket.accept()
+
+    async def send_events() -> None:
+        async for event in _live_scoring_events(week, details):
+            await websocket.send_json(event)
+
+    sender = asyncio.create_task(send_events())
+    try:
+        # Nothing is expected from the client, but receiving is how a disconnect is
+        # noticed while no events are going out.
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await sender
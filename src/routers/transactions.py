@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import Any
+from typing import Annotated
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from src.utils import request_api_with_league
+from src.context import track_version
+from src.derived import league_export
+from src.responses import DocumentResponse, JSONResponse
+from src.streaming import ndjson, stream_records
+from src.transaction_log import transaction_log
+from src.utils import api_response_with_league
 
 transactions_router = APIRouter(tags=["Transactions"])
 
@@ -30,45 +36,114 @@ class TransactionType(str, Enum):
     all = "*"
 
 
-@transactions_router.get("/transactions")
-async def transactions(
+@transactions_router.get("/transactions", response_model=None)
+async def transactions(  # noqa: PLR0913 one parameter per filter
     transaction_type: TransactionType,
     week: int | None = None,
     franchise_id: int | None = None,
     days: int | None = None,
     count: int | None = None,
-) -> dict[str, Any]:
+    *,
+    stream: bool = False,
+) -> DocumentResponse | StreamingResponse:
     """Get all non-pending transactions for a given league.
 
     Note that this can be a very large set, so it's recommended that you filter
     the result using one or more of the available parameters.
+
+    With `stream`, the transactions are sent as newline-delimited JSON while the
+    export is still being decoded, so a whole season of them is never held at once.
+    """
+    params = {
+        "W": week,
+        "TRANS_TYPE": transaction_type,
+        "FRANCHISE": franchise_id,
+        "DAYS": days,
+        "COUNT": count,
+    }
+    if stream:
+        host, params = league_export("transactions", **params)
+        records = stream_records(host, params, ("transactions", "transaction"))
+        return StreamingResponse(ndjson(records), media_type="application/x-ndjson")
+    return await api_response_with_league("transactions", **params)
+
+
+@transactions_router.get("/transactions/log", response_model=None)
+async def transaction_log_page(  # noqa: PLR0913 one parameter per filter
+    transaction_type: TransactionType = TransactionType.all,
+    week: int | None = None,
+    franchise_id: int | None = None,
+    player_id: int | None = None,
+    cursor: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    *,
+    newer: bool = False,
+    stream: bool = False,
+    follow: bool = False,
+) -> JSONResponse | StreamingResponse:
+    """Get transactions from the local transaction log, a page at a time.
+
+    The log is kept in sync with MyFantasyLeague in the background, so reading it never
+    waits on MyFantasyLeague. Every transaction carries a `seq` number, and pages run
+    from the newest transaction back. Pass the `next_cursor` of a page as `cursor` to
+    get the next one.
+
+    To tail the log, set `newer` and pass the last `seq` seen as `cursor`: only the
+    transactions added since are returned, oldest first.
+
+    With `stream`, every matching transaction is sent at once as newline-delimited
+    JSON. Adding `follow` keeps the stream open and sends new transactions as they are
+    synced.
     """
-    return request_api_with_league(
-        "transactions",
-        W=week,
-        TRANS_TYPE=transaction_type,
-        FRANCHISE=franchise_id,
-        DAYS=days,
-        COUNT=count,
+    if not transaction_log.loaded:
+        raise HTTPException(503, "The transaction log is still loading")
+    filters = {
+        "transaction_type": None
+        if transaction_type is TransactionType.all
+        else transaction_type.value,
+        "week": week,
+        "franchise_id": None if franchise_id is None else str(franchise_id).zfill(4),
+        "player_id": None if player_id is None else str(player_id).zfill(4),
+    }
+    if stream or follow:
+        transactions = transaction_log.stream(
+            cursor=cursor,
+            newer=newer,
+            follow=follow,
+            **filters,
+        )
+        return StreamingResponse(
+            ndjson(transactions),
+            media_type="application/x-ndjson",
+        )
+    track_version(f"transactions:{await transaction_log.latest()}")
+    page = await transaction_log.page(
+        cursor=cursor,
+        newer=newer,
+        limit=limit,
+        **filters,
     )
+    # An empty page when tailing an up to date log: ask again from the same place.
+    next_cursor = page[-1]["seq"] if page else (cursor if newer else None)
+    return JSONResponse({"transactions": page, "next_cursor": next_cursor})
 
 
 @transactions_router.get("/pending_waivers")
-async def pending_waivers(franchise_id: int | None = None) -> dict[str, Any]:
+async def pending_waivers(franchise_id: int | None = None) -> DocumentResponse:
     """Get pending unprocessed waivers that the current franchise has submitted."""
-    return request_api_with_league(
+    return await api_response_with_league(
         "pendingWaivers",
         FRANCHISE_ID=franchise_id,
     )
 
 
 @transactions_router.get("/pending_trades")
-async def pending_trades(franchise_id: int | None = None) -> dict[str, Any]:
+async def pending_trades(franchise_id: int | None = None) -> DocumentResponse:
     """Get pending trades for this franchise.
 
     Pass in '0000' to `franchise_id` to get trades pending commissioner action.
     """
-    return request_api_with_league(
+    return await api_response_with_league(
         "pendingTrades",
         FRANCHISE_ID=franchise_id,
     )
@@ -77,7 +152,7 @@ async def pending_trades(franchise_id: int | None = None) -> dict[str, Any]:
 @transactions_router.get("/trade_bait")
 async def trade_bait(
     include_draft_picks: bool = False,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get the Trade Bait for all franchises in a league.
 
     When `include_draft_picks` set, this will also return draft picks offered.
@@ -91,12 +166,12 @@ async def trade_bait(
     BB_10 to indicate $10 in blind bid dollars.
     """
     if include_draft_picks:
-        return request_api_with_league("tradeBait", INCLUDE_DRAFT_PICKS=1)
-    return request_api_with_league("tradeBait")
+        return await api_response_with_league("tradeBait", INCLUDE_DRAFT_PICKS=1)
+    return await api_response_with_league("tradeBait")
 
 
 @transactions_router.get("/assets")
-async def assets() -> dict[str, Any]:
+async def assets() -> DocumentResponse:
     """Get all tradable assets for a given league.
 
     This includes:
@@ -104,4 +179,4 @@ async def assets() -> dict[str, Any]:
     - current year draft picks
     - future draft picks
     """
-    return request_api_with_league("assets")
+    return await api_response_with_league("assets")
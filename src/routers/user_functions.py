@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-from typing import Any
-
 from fastapi import APIRouter
 
-from src.utils import request_api_data
+from src.responses import DocumentResponse
+from src.utils import api_response
 
 user_router = APIRouter(tags=["User Functions"])
 
@@ -13,9 +12,9 @@ user_router = APIRouter(tags=["User Functions"])
 async def my_leagues(
     year: int | None = None,
     names: bool = False,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Get all the leagues of the current user."""
-    return request_api_data("myLeagues", YEAR=year, FRANCHISE_NAMES=int(names))
+    return await api_response("myLeagues", YEAR=year, FRANCHISE_NAMES=int(names))
 
 
 @user_router.get("/league_search")
@@ -23,12 +22,12 @@ async def league_search(
     search_term: str | None,
     league_id: int | None,
     year: int | None,
-) -> dict[str, Any]:
+) -> DocumentResponse:
     """Search for leagues that match `league_id` or `search_term`.
 
     Either `league_id` or `search_term` must be specified, but not both.
     """
-    return request_api_data(
+    return await api_response(
         "leagueSearch",
         SEARCH=search_term,
         ID=league_id,
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from src.context import track_version
+from src.derived import league_export
+from src.players import name_matches, player_store
+from src.responses import EncodedResponse, JSONResponse
+from src.streaming import stream_records
+from src.utils import api_response_with_league, as_list, request_api_with_league
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+# Where the records of the exports that can be selected from are, by TYPE. Records
+# nested in another element (players on a franchise's roster) are lifted out of it, and
+# given its id under its name.
+RECORDS: dict[str, tuple[str, ...]] = {
+    "players": ("players", "player"),
+    "playerScores": ("playerScores", "playerScore"),
+    "projectedScores": ("projectedScores", "playerScore"),
+    "rosters": ("rosters", "franchise", "player"),
+    "freeAgents": ("freeAgents", "leagueUnit", "player"),
+}
+
+
+def _split(value: str | None) -> list[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+@dataclass
+class RecordQuery:
+    """The part of an export's records a client asked for.
+
+    `fields` and `sort` are comma separated field names. Sorting is ascending unless a
+    field starts with `-`, numbers are compared as numbers, and records without the
+    field come last either way. `name` matches the start of a player's name, in either
+    its "Last, First" or its "First Last" form.
+    """
+
+    fields: str | None = None
+    position: str | None = None
+    team: str | None = None
+    name: str | None = None
+    status: str | None = None
+    min_score: float | None = None
+    max_score: float | None = None
+    sort: str | None = None
+    limit: int | None = None
+    offset: int = 0
+
+    @property
+    def active(self) -> bool:
+        """Check whether anything other than the whole export was asked for."""
+        return self != RecordQuery()
+
+    def matches(self, record: dict[str, Any], player_ids: set[str] | None) -> bool:
+        """Check a record against every filter that is given."""
+        return (
+            self._matches_player(record, player_ids)
+            and (
+                self.status is None
+                or str(record.get("status", "")).upper() == self.status.upper()
+            )
+            and self._matches_score(record)
+        )
+
+    def _matches_player(
+        self,
+        record: dict[str, Any],
+        player_ids: set[str] | None,
+    ) -> bool:
+        if player_ids is not None:
+            if record.get("id") not in player_ids:
+                return False
+        elif any(
+            value is not None and record.get(field) != value
+            for field, value in (("position", self.position), ("team", self.team))
+        ):
+            return False
+        return self.name is None or name_matches(str(record.get("name", "")), self.name)
+
+    def _matches_score(self, record: dict[str, Any]) -> bool:
+        if self.min_score is None and self.max_score is None:
+            return True
+        score = _number(record.get("score"))
+        if score is None:
+            return False
+        return (self.min_score is None or score >= self.min_score) and (
+            self.max_score is None or score <= self.max_score
+        )
+
+
+def _number(value: Any) -> float | None:  # noqa: ANN401 documents hold any JSON value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sort_value(value: Any) -> tuple[int, float | str]:  # noqa: ANN401 any JSON value
+    number = _number(value)
+    return (0, number) if number is not None else (1, str(value))
+
+
+def _player_ids(query: RecordQuery) -> set[str] | None:
+    """Get the ids of the players in a position or NFL team from the player database.
+
+    Most exports only give players by id. Until the database is loaded, positions and
+    teams can only be matched against records that carry them.
+    """
+    if (query.position is None and query.team is None) or not player_store.loaded:
+        return None
+    track_version(f"players:{player_store.synced_at}")
+    return {
+        player["id"]
+        for player in player_store.find(position=query.position, team=query.team)
+    }
+
+
+def records(document: dict[str, Any], path: tuple[str, ...]) -> list[dict[str, Any]]:
+    """Get the records of a document, given where they are in it."""
+    found: list[tuple[dict[str, Any], Any]] = [({}, document.get(path[0]) or {})]
+    for depth, name in enumerate(path[1:], start=2):
+        nested = depth < len(path)
+        found = [
+            (
+                {**parents, name: child["id"]} if nested and "id" in child else parents,
+                child,
+            )
+            for parents, element in found
+            for child in as_list(element.get(name))
+        ]
+    return [{**parents, **record} for parents, record in found]
+
+
+def select(
+    document: dict[str, Any],
+    request_type: str,
+    query: RecordQuery,
+) -> dict[str, Any]:
+    """Select the records a client asked for from an export document.
+
+    The records are sent in a single list where the export keeps them, whatever they
+    were nested in, alongside the other attributes of the export. `total` is the number
+    of records that matched, before `offset` and `limit`.
+    """
+    if "error" in document:
+        return document
+    path = RECORDS[request_type]
+    player_ids = _player_ids(query)
+    matched = [
+        record
+        for record in records(document, path)
+        if query.matches(record, player_ids)
+    ]
+    for field in reversed(_split(query.sort)):
+        name = field.removeprefix("-")
+        present = [record for record in matched if record.get(name) not in (None, "")]
+        missing = [record for record in matched if record.get(name) in (None, "")]
+        present.sort(
+            key=lambda record, name=name: _sort_value(record[name]),
+            reverse=field != name,
+        )
+        matched = present + missing
+    end = None if query.limit is None else query.offset + query.limit
+    page = matched[query.offset : end]
+    if fields := _split(query.fields):
+        page = [
+            {field: record[field] for field in fields if field in record}
+            for record in page
+        ]
+    root = document.get(path[0]) or {}
+    return {
+        **document,
+        path[0]: {
+            **{key: value for key, value in root.items() if key != path[1]},
+            path[-1]: page,
+        },
+        "total": len(matched),
+    }
+
+
+async def selected_response(
+    request_type: str,
+    query: RecordQuery,
+    **kwargs: Any,  # noqa: ANN401 **kwargs can be of any type
+) -> EncodedResponse:
+    """Make a request to the league api endpoint, and select from its records.
+
+    The document is passed straight on, as `api_response` does, when the whole of it
+    was asked for.
+    """
+    if not query.active:
+        return await api_response_with_league(request_type, **kwargs)
+    document = await request_api_with_league(request_type, **kwargs)
+    return JSONResponse(
+        select(document, request_type, query),
+        request_type=request_type,
+    )
+
+
+async def stream_selected(
+    request_type: str,
+    query: RecordQuery,
+    **kwargs: Any,  # noqa: ANN401 **kwargs can be of any type
+) -> AsyncIterator[dict[str, Any]]:
+    """Select from the records of an export as it is decoded (see `src.streaming`).
+
+    The export is never held whole, so its records are filtered, cut down and paged
+    as they come, and stay in the export's order: sorting would need all of them at
+    once. Reading stops as soon as the page is full.
+    """
+    player_ids = _player_ids(query)
+    fields = _split(query.fields)
+    end = None if query.limit is None else query.offset + query.limit
+    matched = 0
+    host, params = league_export(request_type, **kwargs)
+    async for record in stream_records(host, params, RECORDS[request_type]):
+        if not query.matches(record, player_ids):
+            continue
+        matched += 1
+        if matched <= query.offset:
+            continue
+        yield (
+            {field: record[field] for field in fields if field in record}
+            if fields
+            else record
+        )
+        if end is not None and matched >= end:
+            return
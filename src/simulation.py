@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# Simulations run at once. This bounds the memory a run takes, whatever its size.
+CHUNK_SIZE = 25_000
+
+# The rows of the counts returned by `simulate`, one column per franchise.
+COUNTS = ("playoffs", "byes", "titles", "seeds", "wins")
+
+
+@dataclass
+class Season:
+    """Where a season stands, and what is left of it, for simulating the rest of it.
+
+    Franchises are referred to by their index in `franchises` throughout. Weekly scores
+    are drawn from a normal distribution per franchise.
+    """
+
+    franchises: list[str]
+    # Wins so far, ties counting as half a win, and points scored so far.
+    wins: np.ndarray
+    points: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    # The regular season games left: the two franchises and the week, as an index
+    # into the `weeks` weeks left, of each.
+    home: np.ndarray
+    away: np.ndarray
+    week: np.ndarray
+    weeks: int
+    playoff_teams: int
+
+    @property
+    def bracket_size(self) -> int:
+        """Get the number of slots in the first round of the playoffs, byes included."""
+        return 1 << (self.playoff_teams - 1).bit_length()
+
+
+def bracket_order(size: int) -> list[int]:
+    """Get the seeds (from 0) of a single elimination bracket, in bracket order.
+
+    Seeds meet in the first round as 1 against `size`, 2 against `size - 1` and so on,
+    placed so that the top two seeds can only meet in the final.
+    """
+    order = [0]
+    while len(order) < size:
+        slots = len(order) * 2
+        order = [seed for top in order for seed in (top, slots - 1 - top)]
+    return order
+
+
+def _regular_season(
+    season: Season,
+    simulations: int,
+    rng: np.random.Generator,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Play the rest of the regular season, and get the final wins and points."""
+    wins = np.tile(season.wins, (simulations, 1))
+    points = np.tile(season.points, (simulations, 1))
+    if not len(season.home):
+        return wins, points
+    scores = rng.normal(
+        season.mean,
+        season.std,
+        size=(simulations, season.weeks, len(season.franchises)),
+    )
+    home = scores[:, season.week, season.home]
+    away = scores[:, season.week, season.away]
+    home_wins = (np.sign(home - away) + 1) / 2
+    # Transposed, so the games of every simulation are added to a franchise at once.
+    np.add.at(wins.T, season.home, home_wins.T)
+    np.add.at(wins.T, season.away, 1 - home_wins.T)
+    np.add.at(points.T, season.home, home.T)
+    np.add.at(points.T, season.away, away.T)
+    return wins, points
+
+
+def _playoffs(
+    season: Season,
+    seeded: np.ndarray,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Play the playoffs from the seeding, and get the champion of each simulation."""
+    slots = np.array(bracket_order(season.bracket_size))
+    # Slots past the last playoff team are byes for the team they are paired with.
+    field = np.where(
+        slots < season.playoff_teams,
+        seeded[:, np.minimum(slots, len(season.franchises) - 1)],
+        -1,
+    )
+    while field.shape[1] > 1:
+        top, bottom = field[:, 0::2], field[:, 1::2]
+        top_score = rng.normal(season.mean[top], season.std[top])
+        bottom_score = rng.normal(season.mean[bottom], season.std[bottom])
+        field = np.where(
+            bottom < 0,
+            top,
+            np.where(top_score >= bottom_score, top, bottom),
+        )
+    return field[:, 0]
+
+
+def _simulate_chunk(
+    season: Season,
+    simulations: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    teams = len(season.franchises)
+    wins, points = _regular_season(season, simulations, rng)
+    # Seeded by record, then by points scored.
+    seeded = np.lexsort((-points, -wins), axis=-1)
+    seeds = np.argsort(seeded, axis=1)
+    champions = _playoffs(season, seeded, rng)
+    byes = season.bracket_size - season.playoff_teams
+    return np.stack(
+        [
+            (seeds < season.playoff_teams).sum(axis=0),
+            (seeds < byes).sum(axis=0),
+            np.bincount(champions, minlength=teams),
+            (seeds + 1).sum(axis=0),
+            wins.sum(axis=0),
+        ],
+    ).astype(float)
+
+
+def simulate(
+    season: Season,
+    simulations: int,
+    seed: int | np.random.SeedSequence,
+) -> np.ndarray:
+    """Simulate the rest of a season many times over, and count how franchises fared.
+
+    Returns the sums over every simulation of the rows in `COUNTS`, with one column per
+    franchise. Runs are reproducible: the same season and seed give the same counts.
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.zeros((len(COUNTS), len(season.franchises)))
+    for start in range(0, simulations, CHUNK_SIZE):
+        counts += _simulate_chunk(season, min(CHUNK_SIZE, simulations - start), rng)
+    return counts
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Coalesce concurrent calls that share a key into a single call.
+
+    The first caller for a key starts the call, and everyone who asks for the same key
+    while it is still in flight waits on that call and gets its result, or its error.
+    The call runs in its own task, so a caller going away (a client disconnecting, for
+    example) does not cancel it for everybody else.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.deduplicated = 0
+        self._in_flight: dict[str, asyncio.Task[T]] = {}
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether a call for a key is in flight."""
+        return key in self._in_flight
+
+    @property
+    def in_flight(self) -> int:
+        """Get the number of calls currently running."""
+        return len(self._in_flight)
+
+    def stats(self) -> dict[str, Any]:
+        """Get the coalescing counters."""
+        return {
+            "calls": self.calls,
+            "executed": self.calls - self.deduplicated,
+            "deduplicated": self.deduplicated,
+            "in_flight": self.in_flight,
+        }
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Run `func` unless a call for `key` is already running; return the result."""
+        return await asyncio.shield(self.start(key, func))
+
+    def start(self, key: str, func: Callable[[], Awaitable[T]]) -> asyncio.Task[T]:
+        """Start `func` unless a call for `key` is already running, without waiting."""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.deduplicated += 1
+        return task
+
+    def _forget(self, key: str, task: asyncio.Task[T]) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the error as retrieved in case every caller went away before it landed.
+        if not task.cancelled():
+            task.exception()
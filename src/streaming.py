@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import importlib.util
+from typing import TYPE_CHECKING, Any
+
+import orjson
+from decouple import config
+
+from src.cassette import CassetteMode
+from src.metrics import UPSTREAM_BYTES
+from src.upstream import UpstreamError, upstream
+from src.utils import as_list, cassette, fetch_document, normalize_params
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+# Bytes read from MyFantasyLeague at a time when streaming an export. Only about this
+# much of the body, and the record being decoded, are held at once.
+STREAM_CHUNK_SIZE: int = config("MFL_STREAM_CHUNK_SIZE", default=64 * 1024, cast=int)
+
+# Whether exports can be decoded as they arrive. Without ijson, they are fetched and
+# decoded whole, as every other export is.
+STREAMING = importlib.util.find_spec("ijson") is not None
+
+
+class _Body:
+    """The body of a response, read as a file by ijson."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]) -> None:
+        self._chunks = chunks.__aiter__()
+
+    async def read(self, size: int = -1) -> bytes:
+        """Get the next chunk of the body, or nothing once it has all been read.
+
+        ijson first reads nothing at all, to tell whether the file gives bytes or text,
+        so that read must not use up a chunk.
+        """
+        if size == 0:
+            return b""
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+
+async def parse_records(
+    chunks: AsyncIterator[bytes],
+    path: tuple[str, ...],
+) -> AsyncIterator[dict[str, Any]]:
+    """Decode the records of an export as bytes arrive.
+
+    Records are found by `path`: the root element of the export and the element of
+    the records in it, such as `("players", "player")`.
+
+    Each record is yielded as soon as it is complete, so only one of them is held at a
+    time. MyFantasyLeague gives a single record as the record itself rather than in a
+    list, which is handled too. An error document raises `UpstreamError`.
+    """
+    import ijson
+
+    # ijson's names for the places records can be, and that of an error.
+    targets = {".".join(path), ".".join(path) + ".item", "error"}
+    builder, building = None, None
+    async for prefix, event, value in ijson.parse_async(_Body(chunks), use_float=True):
+        if builder is None:
+            if prefix in targets and event == "start_map":
+                builder, building = ijson.ObjectBuilder(), prefix
+            elif prefix == "error":
+                msg = f"MyFantasyLeague returned an error: {value}"
+                raise UpstreamError(msg)
+            else:
+                continue
+        builder.event(event, value)
+        if prefix == building and event == "end_map":
+            if building == "error":
+                msg = f"MyFantasyLeague returned an error: {builder.value}"
+                raise UpstreamError(msg)
+            yield builder.value
+            builder = None
+
+
+async def stream_records(
+    host: str,
+    params: dict[str, Any],
+    path: tuple[str, ...],
+    *,
+    refresh: bool = False,
+) -> AsyncIterator[dict[str, Any]]:
+    """Get the records of an export one at a time, decoding it as it arrives.
+
+    This is for exports too big to hold whole (every player's details, a season of
+    transactions or scores): however big they are, only a chunk of the body and a
+    record are held at once. Streamed exports skip the cache, so anything that can be
+    answered from a cached copy should be.
+
+    Without ijson, or with a cassette, the export is fetched and decoded whole, and its
+    records are yielded from the document (skipping the cache with `refresh`).
+    """
+    params = normalize_params(params)
+    if not STREAMING or cassette.mode is not CassetteMode.off:
+        document = await fetch_document(host, params, refresh=refresh)
+        if "error" in document.data:
+            msg = f"MyFantasyLeague returned an error: {document.data['error']}"
+            raise UpstreamError(msg)
+        for record in as_list(document.data.get(path[0], {}).get(path[-1])):
+            yield record
+        return
+    async with upstream.stream(host, params) as resp:
+        chunks = resp.aiter_bytes(STREAM_CHUNK_SIZE)
+        try:
+            async for record in parse_records(chunks, path):
+                yield record
+        finally:
+            UPSTREAM_BYTES.labels(params["TYPE"]).observe(resp.num_bytes_downloaded)
+
+
+async def ndjson(records: AsyncIterator[dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode records as newline-delimited JSON, one line per record as it comes."""
+    async for record in records:
+        yield orjson.dumps(record) + b"\n"
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import math
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import orjson
+from decouple import config
+
+from src.archive import transaction_franchises, transaction_players
+from src.cache import DAY, get_cache
+from src.database import Database
+from src.invalidation import invalidate
+from src.utils import (
+    CURRENT_SEASON,
+    DATA_DIR,
+    LEAGUE_HOST,
+    LEAGUE_ID,
+    api_params,
+    as_list,
+    current_week,
+    fetch_export,
+)
+
+if TYPE_CHECKING:
+    import sqlite3
+    from collections.abc import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONS_SYNC_ENABLED: bool = config(
+    "MFL_TRANSACTIONS_SYNC_ENABLED",
+    default=True,
+    cast=bool,
+)
+TRANSACTIONS_SYNC_INTERVAL: float = config(
+    "MFL_TRANSACTIONS_SYNC_INTERVAL",
+    default=30.0,
+    cast=float,
+)
+TRANSACTIONS_PATH: Path = config(
+    "MFL_TRANSACTIONS_PATH",
+    default=str(DATA_DIR / "transactions.sqlite3"),
+    cast=Path,
+)
+SYNC_LEASE = "transactions|sync"
+# How often a stream following the log checks it for new transactions.
+FOLLOW_INTERVAL = 5.0
+# Transactions read from the log at a time when streaming it.
+STREAM_BATCH = 500
+
+# Delta pulls overlap the previous one slightly, so transactions processed while a
+# sync was in flight are not missed. Transactions seen twice are only stored once.
+SYNC_OVERLAP = 3600
+
+# Bumped whenever what the log stores changes, so logs written before are loaded again.
+LOG_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT UNIQUE,
+    week INTEGER,
+    timestamp INTEGER,
+    type TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_type ON transactions (type, seq);
+CREATE INDEX IF NOT EXISTS transactions_week ON transactions (week, seq);
+CREATE TABLE IF NOT EXISTS transaction_players (
+    player_id TEXT,
+    seq INTEGER,
+    PRIMARY KEY (player_id, seq)
+);
+CREATE TABLE IF NOT EXISTS transaction_franchises (
+    franchise_id TEXT,
+    seq INTEGER,
+    PRIMARY KEY (franchise_id, seq)
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+def transaction_id(transaction: dict[str, Any]) -> str:
+    """Identify a transaction by its content, as MyFantasyLeague gives them no id."""
+    payload = orjson.dumps(transaction, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+class TransactionLog:
+    """Local log of the league's transactions this season.
+
+    The log is loaded once, week by week, and then kept current by pulling only the
+    last few days of transactions, often enough for the cached exports that new
+    transactions change to be invalidated as they happen (see `src.invalidation`).
+    Transactions are stored once each, in the order they were first seen, and numbered
+    in that order. Those numbers are the cursors that clients page through the log
+    with, and tail it with: asking for what comes after the last one seen only ever
+    returns new transactions.
+    """
+
+    def __init__(self, path: Path = TRANSACTIONS_PATH) -> None:
+        self.db = Database(path, SCHEMA)
+        self.synced_at = 0.0
+        self.synced_week = 0
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def loaded(self) -> bool:
+        """Check whether the log holds every transaction of the season."""
+        return self.synced_at > 0
+
+    async def load_state(self) -> None:
+        """Read how far the log was synced, and start over on a new season.
+
+        A log written by an older version of the app is started over as well.
+        """
+        state = {
+            row["key"]: row["value"]
+            for row in await self.db.query("SELECT key, value FROM state")
+        }
+        if state and (
+            state.get("season") != CURRENT_SEASON
+            or state.get("version") != LOG_VERSION
+        ):
+            await self.db.write(
+                [
+                    ("DELETE FROM transactions", ()),
+                    ("DELETE FROM transaction_players", ()),
+                    ("DELETE FROM transaction_franchises", ()),
+                    ("DELETE FROM state", ()),
+                ],
+            )
+            state = {}
+        self.synced_at = state.get("synced_at", 0.0)
+        self.synced_week = state.get("week", 0)
+
+    @staticmethod
+    def _store(
+        db: sqlite3.Connection,
+        week: int,
+        transactions: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        added = []
+        # Numbered oldest first, so the log reads in the order things happened.
+        transactions = sorted(transactions, key=lambda t: int(t.get("timestamp") or 0))
+        for transaction in transactions:
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO transactions "
+                "(id, week, timestamp, type, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    transaction_id(transaction),
+                    week,
+                    int(transaction.get("timestamp") or 0),
+                    transaction.get("type"),
+                    orjson.dumps(transaction).decode(),
+                ),
+            )
+            if cursor.rowcount:
+                added.append(transaction)
+                db.executemany(
+                    "INSERT OR IGNORE INTO transaction_players VALUES (?, ?)",
+                    [
+                        (player_id, cursor.lastrowid)
+                        for player_id in transaction_players(transaction)
+                    ],
+                )
+                # Trades have a franchise on each side, and are found from either.
+                db.executemany(
+                    "INSERT OR IGNORE INTO transaction_franchises VALUES (?, ?)",
+                    [
+                        (franchise_id, cursor.lastrowid)
+                        for franchise_id in transaction_franchises(transaction)
+                    ],
+                )
+        return added
+
+    async def sync(self) -> list[dict[str, Any]]:
+        """Pull every transaction of the season, or only those of the last few days.
+
+        Returns the transactions that were not in the log yet.
+        """
+        started = time.time()
+        week = await current_week()
+        if self.loaded:
+            # The week the last sync saw may have ended since, with transactions in it
+            # that were not pulled yet.
+            weeks = sorted({self.synced_week, week})
+            days = math.ceil((started - self.synced_at + SYNC_OVERLAP) / DAY)
+        else:
+            weeks = list(range(1, week + 1))
+            days = None
+        added = []
+        for pulled_week in weeks:
+            params = api_params(
+                "transactions",
+                L=LEAGUE_ID,
+                W=pulled_week,
+                TRANS_TYPE="*",
+                DAYS=days,
+            )
+            document = await fetch_export(LEAGUE_HOST, params, refresh=True)
+            if "error" in document:
+                msg = f"Transaction sync failed: {document['error']}"
+                raise RuntimeError(msg)
+            transactions = as_list(document.get("transactions", {}).get("transaction"))
+            added += await self.db.transact(
+                lambda db, w=pulled_week, t=transactions: self._store(db, w, t),
+            )
+        self.synced_at = started
+        self.synced_week = week
+        await self.db.write(
+            [
+                (
+                    "INSERT OR REPLACE INTO state VALUES (?, ?)",
+                    (key, value),
+                )
+                for key, value in (
+                    ("season", CURRENT_SEASON),
+                    ("version", LOG_VERSION),
+                    ("synced_at", started),
+                    ("week", week),
+                )
+            ],
+        )
+        return added
+
+    async def page(  # noqa: PLR0913 one parameter per filter
+        self,
+        *,
+        cursor: int | None = None,
+        newer: bool = False,
+        limit: int = 100,
+        transaction_type: str | None = None,
+        franchise_id: str | None = None,
+        player_id: str | None = None,
+        week: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Get a page of transactions matching every filter that is given.
+
+        Pages run from the newest transaction back, starting before `cursor`. When
+        `newer` is set they run forwards instead, starting after `cursor`, which is how
+        the log is tailed.
+        """
+        order = "ASC" if newer else "DESC"
+        position = "seq > :cursor" if newer else "seq < :cursor"
+        rows = await self.db.query(
+            "SELECT seq, week, payload FROM transactions "  # noqa: S608 only fixed fragments are interpolated
+            f"WHERE (:cursor IS NULL OR {position}) "
+            "AND (:type IS NULL OR type = :type) "
+            "AND (:week IS NULL OR week = :week) "
+            "AND (:franchise IS NULL OR seq IN "
+            "(SELECT seq FROM transaction_franchises WHERE franchise_id = :franchise)) "
+            "AND (:player IS NULL OR seq IN "
+            "(SELECT seq FROM transaction_players WHERE player_id = :player)) "
+            f"ORDER BY seq {order} LIMIT :limit",
+            {
+                "cursor": cursor,
+                "type": transaction_type,
+                "franchise": franchise_id,
+                "week": week,
+                "player": player_id,
+                "limit": limit,
+            },
+        )
+        return [
+            {"seq": row["seq"], "week": row["week"], **orjson.loads(row["payload"])}
+            for row in rows
+        ]
+
+    async def stream(
+        self,
+        *,
+        cursor: int | None = None,
+        newer: bool = False,
+        follow: bool = False,
+        **filters: Any,  # noqa: ANN401 the filters of `page`
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Read the transactions matching the filters, a batch at a time.
+
+        With `follow`, the stream reads forwards and never ends: once it has caught up
+        it waits for new transactions to land in the log.
+        """
+        newer = newer or follow
+        while True:
+            batch = await self.page(
+                cursor=cursor,
+                newer=newer,
+                limit=STREAM_BATCH,
+                **filters,
+            )
+            for transaction in batch:
+                yield transaction
+            if batch:
+                cursor = batch[-1]["seq"]
+            if len(batch) < STREAM_BATCH:
+                if not follow:
+                    return
+                await asyncio.sleep(FOLLOW_INTERVAL)
+
+    async def latest(self) -> int:
+        """Get the number of the last transaction in the log."""
+        rows = await self.db.query(
+            "SELECT COALESCE(MAX(seq), 0) AS seq FROM transactions",
+        )
+        return rows[0]["seq"]
+
+    async def start(self) -> None:
+        """Keep the log in sync in the background."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop syncing and close the database."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self.db.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Workers sharing a cache elect one of them to sync. The others read
+                # the same database, and only need to know how far it got.
+                lease = await get_cache().lease(
+                    SYNC_LEASE,
+                    TRANSACTIONS_SYNC_INTERVAL * 3,
+                )
+                await self.load_state()
+                if lease:
+                    loaded = self.loaded
+                    added = await self.sync()
+                    # Everything is new on the first load, and nothing cached is wrong.
+                    if loaded and added:
+                        await invalidate(added)
+            except Exception:
+                logger.exception("Syncing the transaction log failed")
+            await asyncio.sleep(TRANSACTIONS_SYNC_INTERVAL)
+
+
+transaction_log = TransactionLog()
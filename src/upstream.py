@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import enum
+import hashlib
+import logging
+import random
+import time
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+import httpx
+from decouple import config
+
+from src.client import get_client
+from src.metrics import UPSTREAM_RETRIES, UPSTREAM_SECONDS
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+# Requests per second allowed to each upstream host for each API key, and how many can
+# be made at once after a quiet spell.
+UPSTREAM_RATE: float = config("MFL_UPSTREAM_RATE", default=10.0, cast=float)
+UPSTREAM_BURST: int = config("MFL_UPSTREAM_BURST", default=20, cast=int)
+# Attempts made for an export before giving up, and the backoff between them.
+RETRY_ATTEMPTS: int = config("MFL_RETRY_ATTEMPTS", default=3, cast=int)
+RETRY_BASE_DELAY: float = config("MFL_RETRY_BASE_DELAY", default=0.25, cast=float)
+RETRY_MAX_DELAY: float = config("MFL_RETRY_MAX_DELAY", default=5.0, cast=float)
+# Consecutive failed calls after which a host is considered down, and how long it is
+# left alone before a single trial call is let through.
+BREAKER_THRESHOLD: int = config("MFL_BREAKER_THRESHOLD", default=5, cast=int)
+BREAKER_RESET: float = config("MFL_BREAKER_RESET", default=30.0, cast=float)
+
+RETRY_STATUSES = frozenset(
+    {
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.INTERNAL_SERVER_ERROR,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    },
+)
+
+
+class UpstreamError(Exception):
+    """MyFantasyLeague could not be reached, or kept failing."""
+
+    status_code = HTTPStatus.BAD_GATEWAY
+    retry_after: float | None = None
+
+
+class CircuitOpenError(UpstreamError):
+    """Calls to a host are suspended after too many failures."""
+
+    status_code = HTTPStatus.SERVICE_UNAVAILABLE
+
+    def __init__(self, host: str, retry_after: float) -> None:
+        super().__init__(f"{host} is failing, calls are suspended")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """A token bucket rate limiter that makes callers wait for their turn."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.waiting = 0
+        self.waited = 0.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Take a token, waiting until one is available."""
+        self.waiting += 1
+        try:
+            # The lock queues waiters up so tokens are handed out in arrival order.
+            async with self._lock:
+                self._refill()
+                if self.tokens < 1:
+                    delay = (1 - self.tokens) / self.rate
+                    self.waited += delay
+                    await asyncio.sleep(delay)
+                    self._refill()
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+
+    def stats(self) -> dict[str, Any]:
+        """Get the occupancy of the bucket."""
+        self._refill()
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "waiting": self.waiting,
+            "waited_s": round(self.waited, 3),
+        }
+
+
+class BreakerState(str, enum.Enum):
+    """States of a circuit breaker."""
+
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    """Stop calling a host that keeps failing, and try it again after a while.
+
+    After `threshold` consecutive failed calls (not attempts: a call only fails once
+    all its retries have) the breaker opens and calls fail straight away. Once `reset`
+    seconds have passed, one trial call is let through: if it succeeds the breaker
+    closes again, otherwise it stays open for another period.
+    """
+
+    def __init__(self, threshold: int, reset: float) -> None:
+        self.threshold = threshold
+        self.reset = reset
+        self.state = BreakerState.closed
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+
+    @property
+    def retry_after(self) -> float:
+        """Get the seconds left until a trial call is allowed."""
+        return max(self.opened_at + self.reset - time.monotonic(), 0)
+
+    def allow(self) -> bool:
+        """Check whether a call may go ahead."""
+        if self.state is BreakerState.closed:
+            return True
+        if self.state is BreakerState.open and self.retry_after == 0:
+            self.state = BreakerState.half_open
+            return True
+        # Only the one trial call goes through while half open.
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        self.state = BreakerState.closed
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the breaker if there were too many."""
+        self.failures += 1
+        if self.state is BreakerState.half_open or self.failures >= self.threshold:
+            if self.state is not BreakerState.open:
+                self.trips += 1
+            self.state = BreakerState.open
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict[str, Any]:
+        """Get the state of the breaker."""
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_after_s": round(self.retry_after, 3)
+            if self.state is BreakerState.open
+            else 0,
+        }
+
+
+def retry_delay(attempt: int, retry_after: float | None = None) -> float:
+    """Get the delay before a retry, with exponential backoff and full jitter.
+
+    A `Retry-After` from the server is honored, up to the maximum delay.
+    """
+    if retry_after is not None:
+        return min(retry_after, RETRY_MAX_DELAY)
+    ceiling = min(RETRY_BASE_DELAY * 2**attempt, RETRY_MAX_DELAY)
+    return random.uniform(0, ceiling)  # noqa: S311 jitter, not used for anything secret
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    try:
+        return float(resp.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _key_label(api_key: str) -> str:
+    # API keys are credentials, so only a short digest of them is ever shown.
+    return hashlib.blake2b(api_key.encode(), digest_size=4).hexdigest()
+
+
+class Upstream:
+    """Calls to the MyFantasyLeague export hosts, made politely.
+
+    Every call waits for the rate limiter of its host and API key and is refused while
+    the circuit breaker of its host is open. Exports are read only, so calls that time
+    out, are throttled or fail on the server are retried with jittered exponential
+    backoff.
+    """
+
+    def __init__(self) -> None:
+        self.limiters: dict[tuple[str, str], TokenBucket] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.retries = 0
+
+    def limiter(self, host: str, api_key: str) -> TokenBucket:
+        """Get the rate limiter for a host and API key."""
+        key = (host, _key_label(api_key))
+        if key not in self.limiters:
+            self.limiters[key] = TokenBucket(UPSTREAM_RATE, UPSTREAM_BURST)
+        return self.limiters[key]
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        """Get the circuit breaker for a host."""
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+        return self.breakers[host]
+
+    async def get(self, url: str, params: dict[str, Any]) -> httpx.Response:
+        """Fetch an export, retrying failures that are worth retrying."""
+        resp = await self._call(url, params)
+        if resp.is_error:
+            msg = f"{params.get('TYPE')} failed with {resp.status_code}"
+            raise UpstreamError(msg)
+        return resp
+
+    @contextlib.asynccontextmanager
+    async def stream(
+        self,
+        url: str,
+        params: dict[str, Any],
+    ) -> AsyncIterator[httpx.Response]:
+        """Open an export to read its body as it arrives, rather than all at once.
+
+        Opening it is retried like `get`, until a response starts. Once the body is
+        being read, a failure is the reader's to handle.
+        """
+        resp = await self._call(url, params, stream=True)
+        try:
+            if resp.is_error:
+                msg = f"{params.get('TYPE')} failed with {resp.status_code}"
+                raise UpstreamError(msg)
+            yield resp
+        finally:
+            await resp.aclose()
+
+    async def _call(
+        self,
+        url: str,
+        params: dict[str, Any],
+        *,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """Make a call with its retries, as a single outcome for the host's breaker.
+
+        A call that ends any other way than with a response, whatever the reason, is a
+        failure. Otherwise a trial call that never finishes would leave the breaker
+        half open, and the host refused, for good.
+        """
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(host, breaker.retry_after)
+        limiter = self.limiter(host, str(params.get("APIKEY", "")))
+        succeeded = False
+        try:
+            resp = await self._retry(url, params, limiter, stream=stream)
+            succeeded = True
+        finally:
+            if succeeded:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+        return resp
+
+    async def _retry(
+        self,
+        url: str,
+        params: dict[str, Any],
+        limiter: TokenBucket,
+        *,
+        stream: bool,
+    ) -> httpx.Response:
+        for attempt in range(RETRY_ATTEMPTS):
+            await limiter.acquire()
+            try:
+                return await self._attempt(url, params, stream=stream)
+            except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+                error = exc
+            if attempt + 1 < RETRY_ATTEMPTS:
+                await self._backoff(attempt, error, params)
+        msg = f"{params.get('TYPE')} failed after {RETRY_ATTEMPTS} attempts: {error}"
+        raise UpstreamError(msg) from error
+
+    @staticmethod
+    async def _attempt(
+        url: str,
+        params: dict[str, Any],
+        *,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """Make a single call. A streamed call is timed until its response starts."""
+        client = get_client()
+        started = time.perf_counter()
+        status = "error"
+        try:
+            request = client.build_request("GET", url, params=params)
+            resp = await client.send(request, stream=stream)
+            status = str(resp.status_code)
+        finally:
+            elapsed = time.perf_counter() - started
+            UPSTREAM_SECONDS.labels(params.get("TYPE"), status).observe(elapsed)
+        if resp.status_code in RETRY_STATUSES:
+            await resp.aclose()
+            msg = f"{resp.status_code} from {resp.url.host}"
+            raise httpx.HTTPStatusError(msg, request=resp.request, response=resp)
+        return resp
+
+    async def _backoff(
+        self,
+        attempt: int,
+        error: httpx.HTTPError,
+        params: dict[str, Any],
+    ) -> None:
+        retry_after = None
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = _retry_after(error.response)
+        delay = retry_delay(attempt, retry_after)
+        self.retries += 1
+        UPSTREAM_RETRIES.labels(params.get("TYPE")).inc()
+        logger.warning(
+            "%s for %s, retrying in %.2fs",
+            error or type(error).__name__,
+            params.get("TYPE"),
+            delay,
+        )
+        await asyncio.sleep(delay)
+
+    def stats(self) -> dict[str, Any]:
+        """Get the state of every rate limiter and circuit breaker."""
+        return {
+            "retries": self.retries,
+            "limiters": {
+                f"{host} key:{key}": limiter.stats()
+                for (host, key), limiter in self.limiters.items()
+            },
+            "breakers": {
+                host: breaker.stats() for host, breaker in self.breakers.items()
+            },
+        }
+
+
+upstream = Upstream()
@@ -1,16 +1,280 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import re
+import time
+from enum import Enum
 from functools import partial
-from typing import Any
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import requests
 from decouple import config
 
+from src.cache import (
+    CACHE_LEASE_TTL,
+    CACHE_STALE_TTL,
+    Document,
+    cache_key,
+    get_cache,
+    ttl_for,
+)
+from src.cassette import Cassette, CassetteMode
+from src.context import track_document, track_export
+from src.metrics import (
+    CACHE_LOOKUPS,
+    COALESCED_CALLS,
+    UPSTREAM_BYTES,
+    UPSTREAM_IN_FLIGHT,
+    timed,
+)
+from src.responses import DocumentResponse, precompress
+from src.singleflight import SingleFlight
+from src.upstream import UpstreamError, upstream
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
 API_KEY: str = config("MYFANTASYLEAGUE_API_KEY")
 LEAGUE_ID: int = config("MYFANTASYLEAGUE_LEAGUE_ID")
+# Where local state (the player database, for one) is kept between restarts.
+DATA_DIR: Path = config("MFL_DATA_DIR", default="data", cast=Path)
+# Whether upstream responses are recorded to, or replayed from, a cassette on disk
+# (see `src.cassette`).
+CASSETTE_MODE: CassetteMode = config(
+    "MFL_CASSETTE_MODE",
+    default="off",
+    cast=CassetteMode,
+)
+CASSETTE_DIR: Path = config(
+    "MFL_CASSETTE_DIR",
+    default=str(DATA_DIR / "cassette"),
+    cast=Path,
+)
+# Fraction of its TTL after which a warm document is refreshed in the background.
+REFRESH_AHEAD: float = config("MFL_REFRESH_AHEAD", default=0.8, cast=float)
+
+# How often a worker waiting on a document that another worker is fetching checks
+# whether it has arrived.
+LEASE_POLL_INTERVAL = 0.05
+
+LEAGUE_HOST: str = config(
+    "MFL_LEAGUE_HOST",
+    default="https://www44.myfantasyleague.com/2024/export",
+)
+NFL_HOST: str = config(
+    "MFL_NFL_HOST",
+    default="https://api.myfantasyleague.com/2024/export",
+)
+
+# MyFantasyLeague serves each season from its own path, `/<year>/export`.
+_SEASON_PATH = re.compile(r"/(\d{4})/export")
+_season = _SEASON_PATH.search(LEAGUE_HOST)
+CURRENT_SEASON: int = int(_season.group(1)) if _season else time.gmtime().tm_year
+
+# Concurrent requests for the same document share a single upstream call.
+upstream_calls: SingleFlight[Document] = SingleFlight()
+UPSTREAM_IN_FLIGHT.set_function(lambda: upstream_calls.in_flight)
+
+# Cache keys kept warm by the background refresher in `src.refresh`. These are always
+# answered from the last good document, and refreshed asynchronously when it is close
+# to expiring, so reading them never waits on MyFantasyLeague once they are loaded.
+warm_keys: set[str] = set()
+# Warm keys whose last refresh failed upstream. Only these are served as stale once
+# past their TTL; the others are simply waiting for their next refresh.
+failed_refreshes: set[str] = set()
+
+cassette = Cassette(CASSETTE_DIR, CASSETTE_MODE)
+
+
+def normalize_params(params: dict[str, Any]) -> dict[str, Any]:
+    """Drop unset parameters and unwrap enums before sending them upstream.
+
+    `None` is how the routers say "not specified", so those parameters are left out of
+    the query string entirely rather than being sent as empty values.
+    """
+    return {
+        key: value.value if isinstance(value, Enum) else value
+        for key, value in params.items()
+        if value is not None
+    }
+
+
+def season_host(host: str, season: int) -> str:
+    """Get the export host of one of the MyFantasyLeague hosts for another season."""
+    return _SEASON_PATH.sub(f"/{season}/export", host, count=1)
+
+
+def as_list(value: Any) -> list[Any]:  # noqa: ANN401 documents hold any JSON value
+    """Get a list of elements from a document.
+
+    MyFantasyLeague collapses lists with a single element into the element itself, and
+    leaves them out entirely when they are empty.
+    """
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+async def fetch_export(
+    host: str,
+    params: dict[str, Any],
+    *,
+    refresh: bool = False,
+) -> dict[str, Any]:
+    """Fetch an export from one of the MyFantasyLeague hosts, decoded."""
+    document = await fetch_document(host, params, refresh=refresh)
+    return document.data
+
+
+async def current_week() -> int:
+    """Get the current NFL week, from the NFL schedule."""
+    schedule = await fetch_export(NFL_HOST, {"JSON": 1, "TYPE": "nflSchedule"})
+    return int(schedule.get("nflSchedule", {}).get("week") or 1)
+
+
+async def fetch_document(
+    host: str,
+    params: dict[str, Any],
+    *,
+    refresh: bool = False,
+) -> Document:
+    """Fetch an export from one of the MyFantasyLeague hosts.
 
+    Documents are served from the cache while they are fresh according to the TTL
+    policy for their export TYPE. Everything else goes through the shared pooled
+    client so that connections are kept alive between requests instead of paying a
+    new handshake on every call, and identical requests that arrive while one is
+    already in flight wait on that one instead of making their own.
 
-def request_api_data(
+    When MyFantasyLeague cannot be reached, the last good copy of an expired document
+    is served instead, and recorded as stale for the response to say so.
+
+    When `refresh` is set the cache is skipped and a new copy is always fetched.
+    """
+    params = normalize_params(params)
+    started = time.perf_counter()
+    with timed("upstream"):
+        document, result = await _lookup(host, params, refresh=refresh)
+    CACHE_LOOKUPS.labels(params["TYPE"], result).inc()
+    track_document(document, stale=result == "stale")
+    track_export(params, result, time.perf_counter() - started)
+    return document
+
+
+async def _lookup(
+    host: str,
+    params: dict[str, Any],
+    *,
+    refresh: bool,
+) -> tuple[Document, str]:
+    """Get a document and how the cache answered for it (hit, miss, expired, stale)."""
+    ttl = ttl_for(params["TYPE"])
+    key = cache_key(host, params)
+    fetch = partial(_fetch_document, host, params, key, ttl)
+    document = None
+    if ttl > 0 and not refresh:
+        document = await get_cache().get(key)
+    if document is None:
+        return await _coalesced(key, fetch, params["TYPE"]), "miss"
+    if key in warm_keys:
+        if document.age >= ttl * REFRESH_AHEAD:
+            upstream_calls.start(key, fetch)
+        stale = document.age >= ttl and key in failed_refreshes
+        return document, "stale" if stale else "hit"
+    if document.age < ttl:
+        return document, "hit"
+    try:
+        return await _coalesced(key, fetch, params["TYPE"]), "expired"
+    except UpstreamError:
+        logger.warning("Serving a stale %s, upstream is failing", params["TYPE"])
+        return document, "stale"
+
+
+async def _coalesced(
+    key: str,
+    fetch: Callable[[], Awaitable[Document]],
+    request_type: str,
+) -> Document:
+    if key in upstream_calls:
+        COALESCED_CALLS.labels(request_type).inc()
+    return await upstream_calls.do(key, fetch)
+
+
+async def _fetch_document(
+    host: str,
+    params: dict[str, Any],
+    key: str,
+    ttl: float,
+) -> Document:
+    """Fetch a document upstream and cache it.
+
+    When the cache is shared with other workers, only the worker holding the lease on
+    a document fetches it, and the others wait for it to show up in the cache.
+    """
+    if ttl <= 0:
+        return await _fetch_upstream(host, params, key, ttl)
+    cache = get_cache()
+    if not await cache.lease(key, CACHE_LEASE_TTL):
+        document = await _fetched_elsewhere(key, time.time())
+        if document is not None:
+            return document
+    try:
+        return await _fetch_upstream(host, params, key, ttl)
+    finally:
+        await cache.release(key)
+
+
+async def _fetched_elsewhere(key: str, since: float) -> Document | None:
+    """Wait for the worker holding the lease on a document to fetch it.
+
+    Gives up, and returns None, once the lease is free again without a new document
+    having been cached (the fetch failed, or its result was not cacheable) or has run
+    out. The lease is then held by this worker.
+    """
+    cache = get_cache()
+    deadline = time.monotonic() + CACHE_LEASE_TTL
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LEASE_POLL_INTERVAL)
+        document = await cache.get(key)
+        if document is not None and document.fetched_at >= since:
+            return document
+        if await cache.lease(key, CACHE_LEASE_TTL):
+            return None
+    return None
+
+
+async def _fetch_upstream(
+    host: str,
+    params: dict[str, Any],
+    key: str,
+    ttl: float,
+) -> Document:
+    if cassette.mode is CassetteMode.replay:
+        document = await cassette.replay(host, params)
+    else:
+        try:
+            resp = await upstream.get(host, params)
+        except UpstreamError:
+            if key in warm_keys:
+                failed_refreshes.add(key)
+            raise
+        document = Document(request_type=params["TYPE"], body=resp.content)
+        UPSTREAM_BYTES.labels(params["TYPE"]).observe(len(resp.content))
+        if cassette.mode is CassetteMode.record:
+            await cassette.record(host, params, resp.content)
+    failed_refreshes.discard(key)
+    # MyFantasyLeague reports most errors with a 200 status and an error document,
+    # neither of which should stick around in the cache.
+    if ttl > 0 and "error" not in document.data:
+        precompress(document)
+        await get_cache().set(key, document, ttl + CACHE_STALE_TTL)
+    return document
+
+
+async def request_api_data(
     request_type: str,
     **kwargs: Any,  # noqa: ANN401 **kwargs can be of any type
 ) -> dict[str, Any]:
@@ -18,10 +282,32 @@ def request_api_data(
 
     For the purposes of this application, we will only make requests to the API via
     an APIKEY parameter for simplicity, and we will only ever want JSON back instead of
-    xml. This is a helper function to make those calls to the api. Eventually, to save
-    the number of API calls, this function will likely also wrap some caching
-    in an external store like redis.
+    xml. This is a helper function to make those calls to the api. To save on the
+    number of API calls, responses are cached per export TYPE (see `src.cache`), either
+    in process or in an external store like redis.
+    """
+    return await fetch_export(LEAGUE_HOST, api_params(request_type, **kwargs))
+
+
+async def api_response(
+    request_type: str,
+    **kwargs: Any,  # noqa: ANN401 **kwargs can be of any type
+) -> DocumentResponse:
+    """Make a request to the league api endpoint and pass the document straight on.
+
+    This is what routes that return an export unchanged use. The upstream bytes (or the
+    cached bytes) are sent to the client as they are, without being decoded and
+    encoded again on the way through.
     """
+    document = await fetch_document(LEAGUE_HOST, api_params(request_type, **kwargs))
+    return DocumentResponse(document)
+
+
+def api_params(
+    request_type: str,
+    **kwargs: Any,  # noqa: ANN401 **kwargs can be of any type
+) -> dict[str, Any]:
+    """Build the query parameters for a request to the league api endpoint."""
     params = {
         "APIKEY": API_KEY,
         "JSON": 1,
@@ -29,9 +315,7 @@ def request_api_data(
     }
     if kwargs:
         params.update(kwargs)
-    host = "https://www44.myfantasyleague.com/2024/export"
-    resp = requests.get(host, timeout=10, params=params)
-    return resp.json()
+    return params
 
 
 # This partial is to just reduce some of the redundancy with calls to the fantasy api,
@@ -42,3 +326,7 @@ request_api_with_league = partial(
     request_api_data,
     L=LEAGUE_ID,
 )
+api_response_with_league = partial(
+    api_response,
+    L=LEAGUE_ID,
+)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+from src.context import track_version
+from src.derived import api_export, fetch_documents, league_export
+from src.players import player_store
+from src.utils import as_list
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from src.cache import Document
+    from src.derived import Export
+
+# A field of the view: its name, and the attribute it is taken from and its type.
+Field = tuple[str, str, "Callable[[str], Any]"]
+
+# The exports joined onto the free agents: where their players are, and the fields
+# taken from them.
+COLUMNS: dict[str, tuple[tuple[str, ...], tuple[Field, ...]]] = {
+    "projectedScores": (
+        ("projectedScores", "playerScore"),
+        (("projected", "score", float),),
+    ),
+    "playerRanks": (("playerRanks", "player"), (("rank", "rank", int),)),
+    "adp": (("adp", "player"), (("adp", "averagePick", float),)),
+    "topAdds": (("topAdds", "player"), (("added", "percent", float),)),
+    "topOwns": (("topOwns", "player"), (("owned", "percent", float),)),
+}
+EXPORTS: dict[str, Export] = {
+    "freeAgents": league_export("freeAgents"),
+    "projectedScores": league_export("projectedScores"),
+    "playerRanks": api_export("playerRanks"),
+    "adp": api_export("adp"),
+    "topAdds": api_export("topAdds"),
+    "topOwns": api_export("topOwns"),
+}
+DETAILS = ("name", "position", "team")
+# The fields the view can be sorted by, and whether higher values come first.
+SORTS = {"projected": True, "rank": False, "adp": False, "added": True, "owned": True}
+
+
+def _records(content: dict[str, Any], path: tuple[str, ...]) -> list[dict[str, Any]]:
+    elements = as_list(content.get(path[0]))
+    for name in path[1:]:
+        elements = [
+            child for element in elements for child in as_list(element.get(name))
+        ]
+    return elements
+
+
+def _value(record: dict[str, Any], source: str, cast: Callable[[str], Any]) -> Any:  # noqa: ANN401 any field type
+    try:
+        return cast(record[source])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _column(name: str, content: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Get the fields a source gives the view, by player id."""
+    path, fields = COLUMNS[name]
+    return {
+        record["id"]: {
+            field: _value(record, source, cast) for field, source, cast in fields
+        }
+        for record in _records(content, path)
+    }
+
+
+class WaiverView:
+    """The league's free agents, joined with what is known about each of them.
+
+    Every free agent is a row, keyed by player id, with its name, position and NFL
+    team, its projected score, its expert rank, its ADP and how many leagues are adding
+    and own it. The view is kept rather than joined on every read: when one of the
+    exports behind it changes, only the fields that export gives are updated, and only
+    players who became or stopped being free agents are added or removed. Orderings
+    are kept as well until the next change, so a read only costs the rows it returns.
+    """
+
+    def __init__(self) -> None:
+        self.rows: dict[str, dict[str, Any]] = {}
+        self.columns: dict[str, dict[str, dict[str, Any]]] = {}
+        # The version of every export applied to the view, and of the player details.
+        self.versions: dict[str, str] = {}
+        self._orders: dict[tuple[str, str | None], list[dict[str, Any]]] = {}
+        self._player: Callable[[str], dict[str, Any] | None] = player_store.get
+        self._lock = asyncio.Lock()
+
+    def _details(self, player_id: str) -> dict[str, Any]:
+        player = self._player(player_id) or {}
+        return {field: player.get(field) for field in DETAILS}
+
+    def _row(self, player_id: str) -> dict[str, Any]:
+        row = {"id": player_id, **self._details(player_id)}
+        for name, (_, fields) in COLUMNS.items():
+            values = self.columns.get(name, {}).get(player_id, {})
+            row |= {field: values.get(field) for field, _, _ in fields}
+        return row
+
+    def _apply_free_agents(self, content: dict[str, Any]) -> None:
+        players = {
+            player["id"]
+            for player in _records(content, ("freeAgents", "leagueUnit", "player"))
+        }
+        for player_id in self.rows.keys() - players:
+            del self.rows[player_id]
+        for player_id in players - self.rows.keys():
+            self.rows[player_id] = self._row(player_id)
+
+    def _apply_column(self, name: str, content: dict[str, Any]) -> None:
+        _, fields = COLUMNS[name]
+        previous = self.columns.get(name, {})
+        column = self.columns[name] = _column(name, content)
+        for player_id in (previous.keys() | column.keys()) & self.rows.keys():
+            values = column.get(player_id, {})
+            self.rows[player_id] |= {field: values.get(field) for field, _, _ in fields}
+
+    def apply(
+        self,
+        documents: dict[str, Document],
+        details_version: str,
+        player: Callable[[str], dict[str, Any] | None],
+    ) -> bool:
+        """Bring the view up to date with new versions of its exports.
+
+        Player details are looked up with `player`, and only looked up again for every
+        row when `details_version` changes. Exports that MyFantasyLeague failed to give
+        are skipped, and the view keeps what it had from them. Returns whether anything
+        changed.
+        """
+        self._player = player
+        changed = self._apply_documents(documents)
+        if self.versions.get("details") != details_version:
+            for player_id in self.rows:
+                self.rows[player_id] |= self._details(player_id)
+            self.versions["details"] = details_version
+            changed = True
+        if changed:
+            self._orders.clear()
+        return changed
+
+    def _apply_documents(self, documents: dict[str, Document]) -> bool:
+        changed = False
+        for name, document in documents.items():
+            if name not in EXPORTS:
+                continue
+            if self.versions.get(name) == document.etag or "error" in document.data:
+                continue
+            if name == "freeAgents":
+                self._apply_free_agents(document.data)
+            else:
+                self._apply_column(name, document.data)
+            self.versions[name] = document.etag
+            changed = True
+        return changed
+
+    async def refresh(self) -> None:
+        """Bring the view up to date with the exports behind it.
+
+        Player details come from the local player database once it has been loaded,
+        and from the players export until then.
+        """
+        if player_store.loaded:
+            documents = await fetch_documents(EXPORTS)
+            details_version = f"players:{player_store.synced_at}"
+            track_version(details_version)
+            player = player_store.get
+        else:
+            documents = await fetch_documents(
+                {**EXPORTS, "players": league_export("players")},
+            )
+            details_version, player = documents["players"].etag, self._player
+            players = documents["players"].data.get("players", {})
+            if self.versions.get("details") != details_version and players:
+                by_id = {
+                    details["id"]: details for details in as_list(players.get("player"))
+                }
+                player = by_id.get
+            else:
+                details_version = self.versions.get("details", details_version)
+        async with self._lock:
+            self.apply(documents, details_version, player)
+
+    def targets(
+        self,
+        *,
+        position: str | None = None,
+        sort: str = "projected",
+        limit: int = 50,
+        offset: int = 0,
+    ) -> tuple[int, list[dict[str, Any]]]:
+        """Get a page of free agents, in a position or not, ordered by a field.
+
+        Players without a value for the field come last. Returns the number of
+        matching players as well.
+        """
+        key = (sort, position)
+        if key not in self._orders:
+            rows = [
+                row
+                for row in self.rows.values()
+                if position is None or row["position"] == position
+            ]
+            present = [row for row in rows if row[sort] is not None]
+            present.sort(key=lambda row: row[sort], reverse=SORTS[sort])
+            self._orders[key] = present + [row for row in rows if row[sort] is None]
+        order = self._orders[key]
+        return len(order), [dict(row) for row in order[offset : offset + limit]]
+
+
+waiver_view = WaiverView()
@@ -0,0 +1,58 @@
+"""Settings the app needs to be imported, and a stand-in for MyFantasyLeague."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any
+
+import httpx
+import orjson
+import pytest
+
+os.environ.setdefault("MYFANTASYLEAGUE_API_KEY", "test-key")
+os.environ.setdefault("MYFANTASYLEAGUE_LEAGUE_ID", "12345")
+
+from src import cache, client, upstream, utils  # noqa: E402 needs the settings above
+
+
+class FakeMFL:
+    """Answers export requests with canned documents, by TYPE, and counts them.
+
+    A document can also be a response to send as is, or an exception to raise.
+    """
+
+    def __init__(self) -> None:
+        self.documents: dict[str, Any] = {}
+        self.requests: list[httpx.Request] = []
+        self.delay = 0.0
+
+    def calls(self, request_type: str) -> int:
+        """Get the number of requests made for an export TYPE."""
+        return sum(
+            request.url.params.get("TYPE") == request_type for request in self.requests
+        )
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        """Answer a request with the document of its TYPE."""
+        self.requests.append(request)
+        await asyncio.sleep(self.delay)
+        document = self.documents.get(request.url.params.get("TYPE"), {})
+        if isinstance(document, Exception):
+            raise document
+        if isinstance(document, httpx.Response):
+            return document
+        return httpx.Response(200, content=orjson.dumps(document))
+
+
+@pytest.fixture()
+def fake_mfl(monkeypatch: pytest.MonkeyPatch) -> FakeMFL:
+    """Send upstream calls to a `FakeMFL`, with an empty cache and fresh breakers."""
+    fake = FakeMFL()
+    transport = httpx.MockTransport(fake.handle)
+    monkeypatch.setattr(client, "_client", httpx.AsyncClient(transport=transport))
+    monkeypatch.setattr(cache, "_cache", cache.MemoryBackend())
+    fresh = upstream.Upstream()
+    monkeypatch.setattr(upstream, "upstream", fresh)
+    monkeypatch.setattr(utils, "upstream", fresh)
+    return fake
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.routers import admin
+
+
+@pytest.fixture()
+def api() -> TestClient:
+    # Not entered, so nothing is started in the background.
+    return TestClient(app)
+
+
+def test_admin_routes_are_disabled_without_a_token(api: TestClient) -> None:
+    assert api.get("/admin/refresh").status_code == 403
+    assert api.post("/admin/profiler/start").status_code == 403
+
+
+def test_admin_routes_need_the_token(
+    api: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "s3cret")
+    assert api.get("/admin/refresh").status_code == 401
+    response = api.get("/admin/refresh", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+    response = api.get("/admin/refresh", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+
+if TYPE_CHECKING:
+    from .conftest import FakeMFL
+
+
+@pytest.fixture()
+def api(fake_mfl: FakeMFL) -> TestClient:
+    fake_mfl.documents["league"] = {"league": {"name": "Test League"}}
+    fake_mfl.documents["leagueStandings"] = {"leagueStandings": {"franchise": []}}
+    fake_mfl.documents["transactions"] = {"transactions": {"transaction": []}}
+    # Not entered, so nothing is started in the background.
+    return TestClient(app)
+
+
+def test_batch_runs_every_item(api: TestClient, fake_mfl: FakeMFL) -> None:
+    response = api.post(
+        "/batch",
+        json={
+            "requests": [
+                {"route": "league"},
+                {"route": "league_standings"},
+                {"route": "transactions", "params": {"transaction_type": "*"}},
+                {"route": "transactions", "id": "by_week", "params": {"week": 3}},
+                {"route": "admin/upstream"},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    responses = response.json()["responses"]
+    assert responses["league"]["data"] == fake_mfl.documents["league"]
+    assert responses["league_standings"]["status"] == 200
+    assert responses["transactions"]["data"] == fake_mfl.documents["transactions"]
+    assert responses["by_week"]["status"] == 422
+    assert responses["admin/upstream"]["status"] == 404
+
+
+def test_batch_tells_similar_paths_apart(api: TestClient) -> None:
+    response = api.post(
+        "/batch",
+        json={
+            "requests": [{"route": "transactions/log"}, {"route": "history/seasons"}],
+        },
+    )
+    responses = response.json()["responses"]
+    # Reached the transaction log rather than /transactions, and the history routes
+    # each by their own path.
+    assert responses["transactions/log"]["detail"] == (
+        "The transaction log is still loading"
+    )
+    assert responses["history/seasons"]["status"] == 200
+    assert responses["history/seasons"]["data"] == []
+
+
+def test_batch_refuses_streamed_responses(api: TestClient) -> None:
+    response = api.post(
+        "/batch",
+        json={
+            "requests": [
+                {"route": "transactions", "params": {"transaction_type": "*"}},
+                {
+                    "route": "transactions",
+                    "id": "streamed",
+                    "params": {"transaction_type": "*", "stream": True},
+                },
+                {"route": "live_scoring/stream"},
+            ],
+        },
+    )
+    responses = response.json()["responses"]
+    assert responses["transactions"]["status"] == 200
+    assert responses["streamed"]["status"] == 400
+    assert responses["live_scoring/stream"]["status"] == 404
+
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import fakeredis
+import pytest
+
+from src import cache
+from src.cache import (
+    CacheBackend,
+    Document,
+    MemoryBackend,
+    RedisBackend,
+    SQLiteBackend,
+    cache_key,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _document(body: bytes = b'{"league": {}}') -> Document:
+    return Document(request_type="league", body=body)
+
+
+@pytest.fixture(params=["memory", "redis", "sqlite"])
+def backend(request: pytest.FixtureRequest, tmp_path: Path) -> CacheBackend:
+    if request.param == "redis":
+        return RedisBackend(fakeredis.FakeAsyncRedis())
+    if request.param == "sqlite":
+        return SQLiteBackend(tmp_path / "cache.sqlite3")
+    return MemoryBackend()
+
+
+@pytest.fixture(params=["redis", "sqlite"])
+def shared_backends(
+    request: pytest.FixtureRequest,
+    tmp_path: Path,
+) -> tuple[CacheBackend, CacheBackend]:
+    """Two workers' backends, sharing the same store."""
+    if request.param == "redis":
+        server = fakeredis.FakeServer()
+        return (
+            RedisBackend(fakeredis.FakeAsyncRedis(server=server)),
+            RedisBackend(fakeredis.FakeAsyncRedis(server=server)),
+        )
+    path = tmp_path / "cache.sqlite3"
+    return SQLiteBackend(path), SQLiteBackend(path)
+
+
+def _as_worker(monkeypatch: pytest.MonkeyPatch, owner: str) -> None:
+    monkeypatch.setattr(cache, "lease_owner", lambda: owner)
+
+
+def test_set_and_get(backend: CacheBackend) -> None:
+    async def run() -> Document | None:
+        await backend.set("league|a", _document(), ttl=60)
+        return await backend.get("league|a")
+
+    document = asyncio.run(run())
+    assert document is not None
+    assert document.data == {"league": {}}
+
+
+def test_missing_and_expired(backend: CacheBackend) -> None:
+    async def run() -> tuple[Document | None, Document | None]:
+        await backend.set("league|a", _document(), ttl=0.01)
+        await asyncio.sleep(0.05)
+        return await backend.get("league|missing"), await backend.get("league|a")
+
+    assert asyncio.run(run()) == (None, None)
+
+
+def test_keys_delete_and_clear(backend: CacheBackend) -> None:
+    async def run() -> list[list[str]]:
+        for key in ("rosters|a", "rosters|b", "league|a"):
+            await backend.set(key, _document(), ttl=60)
+        found = [sorted(await backend.keys("rosters|"))]
+        await backend.delete("rosters|a")
+        found.append(sorted(await backend.keys("rosters|")))
+        await backend.clear()
+        found.append(await backend.keys(""))
+        return found
+
+    assert asyncio.run(run()) == [["rosters|a", "rosters|b"], ["rosters|b"], []]
+
+
+def test_variants_survive_serialization() -> None:
+    document = _document()
+    document.variants["gzip"] = b"compressed"
+    copy = Document.loads(document.dumps())
+    assert copy.body == document.body
+    assert copy.variants == {"gzip": b"compressed"}
+    assert copy.etag == document.etag
+
+
+def test_memory_evicts_least_recently_used() -> None:
+    backend = MemoryBackend(max_entries=2)
+
+    async def run() -> list[bool]:
+        await backend.set("a", _document(), ttl=60)
+        await backend.set("b", _document(), ttl=60)
+        await backend.get("a")
+        await backend.set("c", _document(), ttl=60)
+        return [await backend.get(key) is not None for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [True, False, True]
+
+
+def test_memory_is_bounded_by_size() -> None:
+    backend = MemoryBackend(max_bytes=25)
+
+    async def run() -> list[bool]:
+        await backend.set("a", _document(b"x" * 10), ttl=60)
+        await backend.set("b", _document(b"x" * 10), ttl=60)
+        await backend.set("c", _document(b"x" * 10), ttl=60)
+        await backend.set("huge", _document(b"x" * 100), ttl=60)
+        return [await backend.get(key) is not None for key in ("a", "b", "c", "huge")]
+
+    assert asyncio.run(run()) == [False, True, True, False]
+    assert backend.size == 20
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_a_document_replaced_by_an_oversized_one_is_dropped(
+    kind: str,
+    tmp_path: Path,
+) -> None:
+    # Room for the first version, with its header when it is serialized.
+    size = len(_document(b"x" * 10).dumps()) * 2
+    backend: CacheBackend = (
+        MemoryBackend(max_bytes=size)
+        if kind == "memory"
+        else SQLiteBackend(tmp_path / "cache.sqlite3", max_bytes=size)
+    )
+
+    async def run() -> tuple[Document | None, Document | None]:
+        await backend.set("a", _document(b"x" * 10), ttl=60)
+        first = await backend.get("a")
+        await backend.set("a", _document(b"x" * (size + 1)), ttl=60)
+        return first, await backend.get("a")
+
+    first, replaced = asyncio.run(run())
+    assert first is not None
+    assert replaced is None
+
+
+def test_cache_key_ignores_credentials_and_order() -> None:
+    params = {"TYPE": "league", "L": 1, "JSON": 1}
+    first = cache_key("https://h", {**params, "APIKEY": "a"})
+    second = cache_key("https://h", {"APIKEY": "b", **dict(reversed(params.items()))})
+    assert first == second
+    assert first.startswith("league|")
+
+
+def test_sqlite_evicts_closest_to_expiring(tmp_path: Path) -> None:
+    # Room for two documents, give or take the digits of their fetch times.
+    size = len(_document(b"x" * 10).dumps())
+    backend = SQLiteBackend(tmp_path / "cache.sqlite3", max_bytes=size * 5 // 2)
+
+    async def run() -> list[bool]:
+        await backend.set("soon", _document(b"x" * 10), ttl=10)
+        await backend.set("late", _document(b"x" * 10), ttl=60)
+        await backend.set("new", _document(b"x" * 10), ttl=30)
+        return [await backend.get(key) is not None for key in ("soon", "late", "new")]
+
+    assert asyncio.run(run()) == [False, True, True]
+
+
+def test_documents_are_shared_between_workers(
+    shared_backends: tuple[CacheBackend, CacheBackend],
+) -> None:
+    first, second = shared_backends
+
+    async def run() -> Document | None:
+        await first.set("league|a", _document(), ttl=60)
+        return await second.get("league|a")
+
+    document = asyncio.run(run())
+    assert document is not None
+    assert document.body == _document().body
+
+
+def test_a_lease_is_held_by_one_worker_at_a_time(
+    shared_backends: tuple[CacheBackend, CacheBackend],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    first, second = shared_backends
+
+    async def lease(backend: CacheBackend, owner: str) -> bool:
+        _as_worker(monkeypatch, owner)
+        return await backend.lease("refresh|league", ttl=60)
+
+    async def run() -> list[bool]:
+        granted = [await lease(first, "a"), await lease(second, "b")]
+        # The holder can renew its lease, and others get it once it is released.
+        granted.append(await lease(first, "a"))
+        await first.release("refresh|league")
+        granted.append(await lease(second, "b"))
+        return granted
+
+    assert asyncio.run(run()) == [True, False, True, True]
+
+
+def test_a_lease_runs_out(
+    shared_backends: tuple[CacheBackend, CacheBackend],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    first, second = shared_backends
+
+    async def run() -> list[bool]:
+        _as_worker(monkeypatch, "a")
+        granted = [await first.lease("refresh|league", ttl=0.01)]
+        await asyncio.sleep(0.05)
+        _as_worker(monkeypatch, "b")
+        granted.append(await second.lease("refresh|league", ttl=60))
+        # Only the holder can release it.
+        _as_worker(monkeypatch, "a")
+        await first.release("refresh|league")
+        _as_worker(monkeypatch, "c")
+        granted.append(await first.lease("refresh|league", ttl=60))
+        return granted
+
+    assert asyncio.run(run()) == [True, True, False]
+
+
+def test_memory_always_grants_leases() -> None:
+    backend = MemoryBackend()
+
+    async def run() -> list[bool]:
+        return [await backend.lease("refresh|league", ttl=60) for _ in range(2)]
+
+    assert asyncio.run(run()) == [True, True]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import cache
+from src.main import app
+
+if TYPE_CHECKING:
+    from .conftest import FakeMFL
+
+STANDINGS = {"leagueStandings": {"franchise": [{"id": "0001", "pf": "100"}]}}
+
+
+@pytest.fixture()
+def api(fake_mfl: FakeMFL) -> TestClient:
+    fake_mfl.documents["leagueStandings"] = STANDINGS
+    # Not entered, so nothing is started in the background.
+    return TestClient(app)
+
+
+def test_responses_carry_validators(api: TestClient) -> None:
+    response = api.get("/league_standings")
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('"')
+    assert response.headers["Cache-Control"].startswith("private, max-age=")
+
+
+def test_current_version_gets_a_304(api: TestClient) -> None:
+    first = api.get("/league_standings")
+    etag = first.headers["ETag"]
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = api.get(
+            "/league_standings",
+            headers={"If-None-Match": if_none_match},
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        assert response.headers["Vary"] == first.headers["Vary"]
+        assert response.headers["Cache-Control"].startswith("private, max-age=")
+
+
+def test_changed_data_gets_a_new_validator(
+    api: TestClient,
+    fake_mfl: FakeMFL,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    etag = api.get("/league_standings").headers["ETag"]
+    fake_mfl.documents["leagueStandings"] = {"leagueStandings": {"franchise": []}}
+    monkeypatch.setattr(cache, "_cache", cache.MemoryBackend())
+    response = api.get("/league_standings", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_validators_depend_on_the_format(api: TestClient) -> None:
+    json = api.get("/league_standings")
+    msgpack = api.get(
+        "/league_standings",
+        headers={"Accept": "application/msgpack"},
+    )
+    assert msgpack.headers["content-type"].startswith("application/msgpack")
+    assert json.headers["ETag"] != msgpack.headers["ETag"]
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+from src import cache
+from src.cache import Document, MemoryBackend
+from src.invalidation import invalidate
+
+if TYPE_CHECKING:
+    import pytest
+
+KEYS = (
+    "rosters|https://h?FRANCHISE=0001&TYPE=rosters",
+    "rosters|https://h?FRANCHISE=0003&TYPE=rosters",
+    "playerRosterStatus|https://h?P=10001&TYPE=playerRosterStatus",
+    "playerRosterStatus|https://h?P=20000&TYPE=playerRosterStatus",
+    "league|https://h?TYPE=league",
+)
+
+
+def test_only_exports_the_moves_change_are_dropped(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    backend = MemoryBackend()
+    monkeypatch.setattr(cache, "_cache", backend)
+    trade = {"type": "TRADE", "franchise": "0001", "franchise2": "0002"}
+
+    async def run() -> tuple[list[str], list[str]]:
+        for key in KEYS:
+            await backend.set(key, Document(request_type="x", body=b"{}"), ttl=60)
+        invalidated = await invalidate([{**trade, "franchise1_gave_up": "10001,"}])
+        return invalidated, sorted(await backend.keys(""))
+
+    invalidated, kept = asyncio.run(run())
+    assert sorted(invalidated) == sorted([KEYS[0], KEYS[2]])
+    assert kept == sorted([KEYS[1], KEYS[3], KEYS[4]])
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import pytest
+
+from src.lineups import optimal_lineup, optimal_lineups, requirements
+
+if TYPE_CHECKING:
+    from .conftest import FakeMFL
+
+LEAGUE = {
+    "starters": {
+        "count": "4",
+        "position": [
+            {"name": "QB", "limit": "1-2"},
+            {"name": "RB", "limit": "1-2"},
+            {"name": "WR", "limit": "1"},
+        ],
+    },
+}
+
+
+def test_requirements_read_position_ranges() -> None:
+    assert requirements(LEAGUE) == (4, {"QB": (1, 2), "RB": (1, 2), "WR": (1, 1)})
+
+
+def test_flex_slot_goes_to_the_best_player_left() -> None:
+    count, limits = requirements(LEAGUE)
+    candidates = [
+        ("qb1", "QB", 20.0),
+        ("qb2", "QB", 18.0),
+        ("rb1", "RB", 15.0),
+        ("rb2", "RB", 9.0),
+        ("wr1", "WR", 12.0),
+        ("wr2", "WR", 11.0),
+        ("k1", "K", 30.0),
+    ]
+    starters, unfilled = optimal_lineup(candidates, count, limits)
+    assert sorted(player_id for player_id, _, _ in starters) == [
+        "qb1",
+        "qb2",
+        "rb1",
+        "wr1",
+    ]
+    assert unfilled == {}
+
+
+def test_missing_players_leave_slots_unfilled() -> None:
+    count, limits = requirements(LEAGUE)
+    starters, unfilled = optimal_lineup([("qb1", "QB", 20.0)], count, limits)
+    assert starters == [("qb1", "QB", 20.0)]
+    assert unfilled == {"RB": 1, "WR": 1}
+
+
+@pytest.mark.parametrize(("week", "sent"), [(3, "3"), (None, None)])
+def test_lineups_read_the_rosters_and_injuries_of_the_week(
+    fake_mfl: FakeMFL,
+    week: int | None,
+    sent: str | None,
+) -> None:
+    fake_mfl.documents["league"] = {"league": LEAGUE}
+    asyncio.run(optimal_lineups(week))
+    weeks = {
+        request.url.params["TYPE"]: request.url.params.get("W")
+        for request in fake_mfl.requests
+    }
+    assert weeks["rosters"] == sent
+    assert weeks["injuries"] == sent
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from typing import TYPE_CHECKING
+
+import httpx
+import pytest
+
+from src import upstream, utils
+from src.cache import Document, cache_key, get_cache, ttl_for
+from src.context import open_context
+from src.upstream import UpstreamError
+
+if TYPE_CHECKING:
+    from .conftest import FakeMFL
+
+PARAMS = utils.normalize_params({"TYPE": "rosters", "L": "12345", "JSON": 1})
+KEY = cache_key(utils.LEAGUE_HOST, PARAMS)
+
+
+@pytest.fixture()
+def warm_rosters(monkeypatch: pytest.MonkeyPatch, fake_mfl: FakeMFL) -> FakeMFL:
+    """Keep rosters warm, with a cached copy that is past its TTL."""
+    monkeypatch.setattr(upstream, "retry_delay", lambda *_: 0)
+    monkeypatch.setattr(utils, "warm_keys", {KEY})
+    monkeypatch.setattr(utils, "failed_refreshes", set())
+    fake_mfl.documents["rosters"] = {"rosters": {"franchise": []}}
+    return fake_mfl
+
+
+async def _served_stale() -> bool:
+    ttl = ttl_for("rosters")
+    document = Document(
+        request_type="rosters",
+        body=b'{"rosters": {}}',
+        fetched_at=time.time() - ttl * 2,
+    )
+    await get_cache().set(KEY, document, ttl * 3)
+    context = open_context()
+    await utils.fetch_document(utils.LEAGUE_HOST, PARAMS)
+    # Let the background refresh the read started land.
+    await asyncio.sleep(0.05)
+    return bool(context.stale)
+
+
+@pytest.mark.usefixtures("warm_rosters")
+def test_warm_document_waiting_for_its_refresh_is_not_stale() -> None:
+    assert not asyncio.run(_served_stale())
+
+
+def test_warm_document_is_stale_once_its_refresh_failed(
+    warm_rosters: FakeMFL,
+) -> None:
+    warm_rosters.documents["rosters"] = httpx.Response(503)
+
+    async def run() -> bool:
+        with contextlib.suppress(UpstreamError):
+            await utils.fetch_document(utils.LEAGUE_HOST, PARAMS, refresh=True)
+        return await _served_stale()
+
+    assert asyncio.run(run())
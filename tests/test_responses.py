@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.responses import EncodedResponse
+
+if TYPE_CHECKING:
+    from .conftest import FakeMFL
+
+# Big enough to be kept precompressed in the cache.
+STANDINGS = {
+    "leagueStandings": {
+        "franchise": [{"id": f"{number:04}", "pf": "100"} for number in range(1, 100)],
+    },
+}
+
+
+def test_encoded_responses_say_how_to_convert() -> None:
+    with pytest.raises(TypeError):
+        EncodedResponse(b"{}")
+
+
+def test_converted_documents_are_compressed_anew(fake_mfl: FakeMFL) -> None:
+    fake_mfl.documents["leagueStandings"] = STANDINGS
+    response = TestClient(app).get(
+        "/league_standings",
+        headers={"Accept": "application/msgpack", "Accept-Encoding": "gzip"},
+    )
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["content-encoding"] == "gzip"
+    assert msgpack.unpackb(response.content) == STANDINGS
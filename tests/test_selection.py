@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import orjson
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.routers.fantasy_content import get_players
+from src.selection import RecordQuery, select
+
+if TYPE_CHECKING:
+    from .conftest import FakeMFL
+
+PLAYERS = {
+    "players": {
+        "timestamp": "1700000000",
+        "player": [
+            {"id": "1", "name": "Young, Bryce", "position": "QB", "team": "CAR"},
+            {"id": "2", "name": "Young, Chase", "position": "DE", "team": "NOS"},
+            {"id": "3", "name": "Allen, Josh", "position": "QB", "team": "BUF"},
+        ],
+    },
+}
+
+
+def test_select_filters_sorts_and_pages() -> None:
+    query = RecordQuery(position="QB", sort="-id", fields="id", limit=1)
+    selected = select(PLAYERS, "players", query)
+    assert selected["players"] == {"timestamp": "1700000000", "player": [{"id": "3"}]}
+    assert selected["total"] == 2
+
+
+def test_select_matches_either_form_of_a_name() -> None:
+    by_last = select(PLAYERS, "players", RecordQuery(name="young"))
+    by_first = select(PLAYERS, "players", RecordQuery(name="Josh A"))
+    assert [player["id"] for player in by_last["players"]["player"]] == ["1", "2"]
+    assert [player["id"] for player in by_first["players"]["player"]] == ["3"]
+
+
+def test_players_are_found_by_name_without_the_player_database(
+    fake_mfl: FakeMFL,
+) -> None:
+    fake_mfl.documents["players"] = PLAYERS
+    response = asyncio.run(
+        get_players(
+            details=False,
+            since=None,
+            player_id=None,
+            position=None,
+            team=None,
+            name="Young, C",
+            status=None,
+            fields=None,
+            sort=None,
+            limit=None,
+            offset=0,
+        ),
+    )
+    players = orjson.loads(response.body)["players"]["player"]
+    assert [player["id"] for player in players] == ["2"]
+
+
+def test_score_options_go_upstream_and_records_are_selected(
+    fake_mfl: FakeMFL,
+) -> None:
+    fake_mfl.documents["playerScores"] = {
+        "playerScores": {
+            "week": "5",
+            "playerScore": [
+                {"id": "1", "score": "12.5"},
+                {"id": "3", "score": "25.1"},
+                {"id": "4", "score": "3.0"},
+            ],
+        },
+    }
+    api = TestClient(app)
+    response = api.get(
+        "/player_scores",
+        params={
+            "week": 5,
+            "year": 2023,
+            "positions": "QB",
+            "status": "freeagent",
+            "min_score": 10,
+            "sort": "-score",
+        },
+    )
+    params = fake_mfl.requests[-1].url.params
+    assert (params["W"], params["YEAR"], params["POSITIONS"]) == ("5", "2023", "QB")
+    assert params["STATUS"] == "freeagent"
+    scores = response.json()["playerScores"]["playerScore"]
+    assert [score["id"] for score in scores] == ["3", "1"]
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import pytest
+
+from src.singleflight import SingleFlight
+from src.utils import LEAGUE_HOST, fetch_document
+
+if TYPE_CHECKING:
+    from .conftest import FakeMFL
+
+
+def test_concurrent_calls_share_one_execution() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+    executions = 0
+
+    async def compute() -> int:
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def run() -> list[int]:
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(10)))
+
+    assert asyncio.run(run()) == [42] * 10
+    assert executions == 1
+    assert flight.stats() == {
+        "calls": 10,
+        "executed": 1,
+        "deduplicated": 9,
+        "in_flight": 0,
+    }
+
+
+def test_errors_reach_every_caller_and_are_not_kept() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError
+
+    async def run() -> list[BaseException | int]:
+        return await asyncio.gather(
+            *(flight.do("key", fail) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
+    assert "key" not in flight
+
+
+def test_a_caller_going_away_does_not_cancel_the_call() -> None:
+    flight: SingleFlight[str] = SingleFlight()
+
+    async def compute() -> str:
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run() -> str:
+        impatient = asyncio.create_task(flight.do("key", compute))
+        patient = asyncio.create_task(flight.do("key", compute))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_identical_fetches_make_one_upstream_call(fake_mfl: FakeMFL) -> None:
+    fake_mfl.documents["rosters"] = {"rosters": {"franchise": []}}
+    fake_mfl.delay = 0.02
+    params = {"TYPE": "rosters", "L": 1, "JSON": 1}
+
+    async def run() -> list[bytes]:
+        documents = await asyncio.gather(
+            *(fetch_document(LEAGUE_HOST, params) for _ in range(5)),
+        )
+        return [document.body for document in documents]
+
+    bodies = asyncio.run(run())
+    assert len(set(bodies)) == 1
+    assert fake_mfl.calls("rosters") == 1
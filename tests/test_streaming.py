@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from src import streaming, utils
+from src.main import app
+from src.players import PlayerStore
+from src.streaming import parse_records, stream_records
+from src.upstream import UpstreamError
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+    from .conftest import FakeMFL
+
+PLAYERS = Path(__file__).parent.parent / "bench" / "fixtures" / "players.json"
+PLAYERS_BODY = PLAYERS.read_bytes()
+
+
+async def _chunks(body: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+def _parse(body: bytes, path: tuple[str, ...], size: int) -> list[dict[str, Any]]:
+    async def run() -> list[dict[str, Any]]:
+        return [record async for record in parse_records(_chunks(body, size), path)]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("size", [1, 7, 100, 4096, len(PLAYERS_BODY)])
+def test_records_are_decoded_whatever_the_chunks(size: int) -> None:
+    expected = orjson.loads(PLAYERS_BODY)["players"]["player"]
+    assert _parse(PLAYERS_BODY, ("players", "player"), size) == expected
+
+
+def test_a_single_record_is_not_in_a_list() -> None:
+    body = b'{"players": {"timestamp": "1", "player": {"id": "1", "name": "A, B"}}}'
+    assert _parse(body, ("players", "player"), 5) == [{"id": "1", "name": "A, B"}]
+
+
+def test_an_error_document_raises() -> None:
+    body = b'{"version": "1.0", "error": {"$t": "Invalid league ID"}}'
+    with pytest.raises(UpstreamError, match="Invalid league ID"):
+        _parse(body, ("players", "player"), 8)
+
+
+@pytest.fixture()
+def streamed(fake_mfl: FakeMFL, monkeypatch: pytest.MonkeyPatch) -> FakeMFL:
+    monkeypatch.setattr(streaming, "upstream", utils.upstream)
+    monkeypatch.setattr(streaming, "STREAM_CHUNK_SIZE", 256)
+    return fake_mfl
+
+
+def test_an_export_is_streamed_from_upstream(streamed: FakeMFL) -> None:
+    streamed.documents["players"] = orjson.loads(PLAYERS_BODY)
+
+    async def run() -> list[dict[str, Any]]:
+        records = stream_records(
+            utils.LEAGUE_HOST,
+            {"TYPE": "players", "JSON": 1},
+            ("players", "player"),
+        )
+        return [record async for record in records]
+
+    assert asyncio.run(run()) == orjson.loads(PLAYERS_BODY)["players"]["player"]
+
+
+def test_scores_are_streamed_as_ndjson(streamed: FakeMFL) -> None:
+    scores = [{"id": str(number), "score": str(number * 1.5)} for number in range(50)]
+    streamed.documents["playerScores"] = {
+        "playerScores": {"week": "5", "playerScore": scores},
+    }
+    response = TestClient(app).get(
+        "/player_scores",
+        params={"week": 5, "positions": "QB", "stream": True, "min_score": 60},
+    )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [orjson.loads(line) for line in response.text.splitlines()]
+    assert lines == [score for score in scores if float(score["score"]) >= 60]
+    assert streamed.requests[-1].url.params["POSITIONS"] == "QB"
+
+
+def test_the_player_database_is_loaded_from_a_stream(
+    streamed: FakeMFL,
+    tmp_path: Path,
+) -> None:
+    streamed.documents["players"] = orjson.loads(PLAYERS_BODY)
+    store = PlayerStore(tmp_path / "players.json.gz")
+    players = orjson.loads(PLAYERS_BODY)["players"]["player"]
+
+    assert asyncio.run(store.sync()) == len(players)
+    assert store.loaded
+    assert store.get(players[0]["id"])["name"] == players[0]["name"]
+    assert PlayerStore(tmp_path / "players.json.gz").load()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from src import transaction_log as transaction_log_module
+from src.transaction_log import TransactionLog
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _transaction(number: int, **fields: Any) -> dict[str, Any]:  # noqa: ANN401 transaction fields
+    return {
+        "type": "FREE_AGENT",
+        "franchise": "0001",
+        "timestamp": str(1_700_000_000 + number),
+        "transaction": f"{10_000 + number},|",
+        **fields,
+    }
+
+
+@pytest.fixture()
+def log(tmp_path: Path) -> TransactionLog:
+    log = TransactionLog(tmp_path / "transactions.sqlite3")
+    transactions = [_transaction(number) for number in range(1, 6)]
+    transactions.append(
+        _transaction(6, type="TRADE", franchise="0002", franchise2="0003"),
+    )
+
+    async def store() -> None:
+        await log.db.transact(lambda db: log._store(db, 1, transactions))  # noqa: SLF001 filling the log directly
+
+    asyncio.run(store())
+    return log
+
+
+def _seqs(transactions: list[dict[str, Any]]) -> list[int]:
+    return [transaction["seq"] for transaction in transactions]
+
+
+def test_pages_run_from_the_newest_back(log: TransactionLog) -> None:
+    first = asyncio.run(log.page(limit=4))
+    second = asyncio.run(log.page(cursor=first[-1]["seq"], limit=4))
+    assert _seqs(first) == [6, 5, 4, 3]
+    assert _seqs(second) == [2, 1]
+
+
+def test_newer_pages_tail_the_log(log: TransactionLog) -> None:
+    assert _seqs(asyncio.run(log.page(cursor=4, newer=True))) == [5, 6]
+    assert asyncio.run(log.page(cursor=6, newer=True)) == []
+
+
+def test_transactions_are_stored_once(log: TransactionLog) -> None:
+    added = asyncio.run(
+        log.db.transact(lambda db: log._store(db, 1, [_transaction(1)])),  # noqa: SLF001 filling the log directly
+    )
+    assert added == []
+    assert asyncio.run(log.latest()) == 6
+
+
+def test_pages_are_filtered(log: TransactionLog) -> None:
+    trades = asyncio.run(log.page(transaction_type="TRADE"))
+    by_player = asyncio.run(log.page(player_id="10003"))
+    by_franchise = asyncio.run(log.page(franchise_id="0001", cursor=3))
+    assert _seqs(trades) == [6]
+    assert _seqs(by_player) == [3]
+    assert _seqs(by_franchise) == [2, 1]
+    assert by_player[0]["transaction"] == "10003,|"
+
+
+def test_trades_are_found_from_either_side(log: TransactionLog) -> None:
+    for franchise_id in ("0002", "0003"):
+        assert _seqs(asyncio.run(log.page(franchise_id=franchise_id))) == [6]
+
+
+def test_logs_of_an_older_version_are_started_over(log: TransactionLog) -> None:
+    async def reload() -> int:
+        # Synced this season, but before the log had a version.
+        season = transaction_log_module.CURRENT_SEASON
+        await log.db.write([("INSERT INTO state VALUES (?, ?)", ("season", season))])
+        await log.load_state()
+        return await log.latest()
+
+    assert asyncio.run(reload()) == 0
+    assert not log.loaded
+
+
+def test_stream_reads_every_batch(
+    log: TransactionLog,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(transaction_log_module, "STREAM_BATCH", 2)
+
+    async def read(**kwargs: Any) -> list[int]:  # noqa: ANN401 stream options
+        return [transaction["seq"] async for transaction in log.stream(**kwargs)]
+
+    assert asyncio.run(read()) == [6, 5, 4, 3, 2, 1]
+    assert asyncio.run(read(cursor=2, newer=True)) == [3, 4, 5, 6]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import httpx
+import pytest
+
+from src import upstream, utils
+from src.upstream import BreakerState, CircuitBreaker, CircuitOpenError, UpstreamError
+
+if TYPE_CHECKING:
+    from .conftest import FakeMFL
+
+PARAMS = {"TYPE": "rosters", "L": 1, "JSON": 1}
+
+
+def test_breaker_opens_after_consecutive_failures() -> None:
+    breaker = CircuitBreaker(threshold=3, reset=60)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state is BreakerState.closed
+    breaker.record_failure()
+    assert breaker.state is BreakerState.open
+    assert not breaker.allow()
+    assert breaker.retry_after > 0
+    assert breaker.stats()["trips"] == 1
+
+
+def test_breaker_lets_one_trial_through_once_reset() -> None:
+    breaker = CircuitBreaker(threshold=1, reset=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.state is BreakerState.half_open
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state is BreakerState.closed
+    assert breaker.allow()
+
+
+def test_failed_trial_opens_the_breaker_again() -> None:
+    breaker = CircuitBreaker(threshold=5, reset=0)
+    for _ in range(5):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state is BreakerState.open
+    assert breaker.stats()["trips"] == 2
+
+
+@pytest.fixture()
+def _no_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(upstream, "retry_delay", lambda *_: 0)
+
+
+@pytest.mark.usefixtures("_no_backoff")
+def test_retried_call_counts_as_one_failure(fake_mfl: FakeMFL) -> None:
+    fake_mfl.documents["rosters"] = httpx.Response(503)
+    with pytest.raises(UpstreamError):
+        asyncio.run(utils.upstream.get(utils.LEAGUE_HOST, PARAMS))
+    breaker = utils.upstream.breaker(urlsplit(utils.LEAGUE_HOST).netloc)
+    assert fake_mfl.calls("rosters") == upstream.RETRY_ATTEMPTS
+    assert breaker.failures == 1
+    assert breaker.state is BreakerState.closed
+
+
+@pytest.mark.usefixtures("_no_backoff")
+def test_open_breaker_refuses_calls(fake_mfl: FakeMFL) -> None:
+    fake_mfl.documents["rosters"] = httpx.Response(503)
+    breaker = utils.upstream.breaker(urlsplit(utils.LEAGUE_HOST).netloc)
+    for _ in range(breaker.threshold):
+        with pytest.raises(UpstreamError):
+            asyncio.run(utils.upstream.get(utils.LEAGUE_HOST, PARAMS))
+    calls = fake_mfl.calls("rosters")
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(utils.upstream.get(utils.LEAGUE_HOST, PARAMS))
+    assert fake_mfl.calls("rosters") == calls
+
+
+@pytest.mark.parametrize(
+    "error",
+    [httpx.DecodingError("bad body"), httpx.TooManyRedirects("loop")],
+)
+def test_trial_ending_unexpectedly_reopens_the_breaker(
+    fake_mfl: FakeMFL,
+    error: Exception,
+) -> None:
+    breaker = utils.upstream.breaker(urlsplit(utils.LEAGUE_HOST).netloc)
+    breaker.reset = 0
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    fake_mfl.documents["rosters"] = error
+    with pytest.raises(type(error)):
+        asyncio.run(utils.upstream.get(utils.LEAGUE_HOST, PARAMS))
+    assert breaker.state is BreakerState.open
+    fake_mfl.documents["rosters"] = {"rosters": {}}
+    asyncio.run(utils.upstream.get(utils.LEAGUE_HOST, PARAMS))
+    assert breaker.state is BreakerState.closed
+
+
+def test_cancelled_trial_reopens_the_breaker(fake_mfl: FakeMFL) -> None:
+    breaker = utils.upstream.breaker(urlsplit(utils.LEAGUE_HOST).netloc)
+    breaker.reset = 0
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    fake_mfl.delay = 1
+
+    async def run() -> None:
+        trial = asyncio.create_task(utils.upstream.get(utils.LEAGUE_HOST, PARAMS))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    asyncio.run(run())
+    assert breaker.state is BreakerState.open
+    assert breaker.allow()
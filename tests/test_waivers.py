@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+
+from src.cache import Document
+from src.waivers import WaiverView
+
+PLAYERS = {
+    "1": {"name": "Young, Bryce", "position": "QB", "team": "CAR"},
+    "2": {"name": "Allen, Josh", "position": "QB", "team": "BUF"},
+    "3": {"name": "Hill, Tyreek", "position": "WR", "team": "MIA"},
+}
+
+
+def _document(request_type: str, content: dict[str, Any]) -> Document:
+    return Document(request_type=request_type, body=orjson.dumps(content))
+
+
+def _free_agents(*player_ids: str) -> Document:
+    players = [{"id": player_id} for player_id in player_ids]
+    return _document(
+        "freeAgents",
+        {"freeAgents": {"leagueUnit": {"player": players}}},
+    )
+
+
+def _projections(**scores: str) -> Document:
+    players = [{"id": player_id, "score": score} for player_id, score in scores.items()]
+    return _document("projectedScores", {"projectedScores": {"playerScore": players}})
+
+
+def _ids(rows: list[dict[str, Any]]) -> list[str]:
+    return [row["id"] for row in rows]
+
+
+def test_free_agents_are_joined_and_ranked() -> None:
+    view = WaiverView()
+    documents = {
+        "freeAgents": _free_agents("1", "2", "3"),
+        "projectedScores": _projections(**{"1": "14.5", "2": "22", "3": "x"}),
+    }
+    assert view.apply(documents, "v1", PLAYERS.get)
+    total, rows = view.targets()
+    assert total == 3
+    assert _ids(rows) == ["2", "1", "3"]
+    assert rows[0]["projected"] == 22.0
+    assert rows[0]["name"] == "Allen, Josh"
+    assert rows[2]["projected"] is None
+    assert _ids(view.targets(position="WR")[1]) == ["3"]
+
+
+def test_only_changes_are_applied() -> None:
+    view = WaiverView()
+    documents = {
+        "freeAgents": _free_agents("1", "2"),
+        "projectedScores": _projections(**{"1": "14.5", "2": "22"}),
+    }
+    view.apply(documents, "v1", PLAYERS.get)
+    assert not view.apply(documents, "v1", PLAYERS.get)
+
+    documents["freeAgents"] = _free_agents("1", "3")
+    documents["projectedScores"] = _projections(**{"1": "30", "3": "1"})
+    renamed = {**PLAYERS, "1": {**PLAYERS["1"], "team": "LAR"}}
+    assert view.apply(documents, "v2", renamed.get)
+    _, rows = view.targets()
+    assert _ids(rows) == ["1", "3"]
+    assert (rows[0]["projected"], rows[0]["team"]) == (30.0, "LAR")
+
+
+def test_failed_exports_are_skipped() -> None:
+    view = WaiverView()
+    view.apply({"freeAgents": _free_agents("1")}, "v1", PLAYERS.get)
+    error = _document("freeAgents", {"error": {"$t": "Busy"}})
+    assert not view.apply({"freeAgents": error}, "v1", PLAYERS.get)
+    assert _ids(view.targets()[1]) == ["1"]